@@ -1,22 +1,31 @@
 import streamlit as st
-import mysql.connector
-import pandas as pd
-import json
 import re
-from datetime import datetime, date, time as dt_time
-
-# -------------------------
-# DB connection
-# -------------------------
-def get_connection():
-    conn = mysql.connector.connect(
-        host=st.secrets["mysql"]["host"],
-        user=st.secrets["mysql"]["user"],
-        password=st.secrets["mysql"]["password"],
-        database=st.secrets["mysql"]["database"],
-        autocommit=True
-    )
-    return conn
+import calendar
+import os
+from datetime import datetime, date, timedelta, time
+
+from lazy_imports import LazyModule
+
+from db import get_connection, get_read_connection, replica_status, run_statement, VALIDATE_LOGIN, room_table, ROOM_TABLES, ROOM_NAMES, ARCHIVE_TABLE
+from bookings import load_my_bookings, display_rows, time_to_str, time_to_display
+import slow_queries
+import history_search
+from rooms import recommend_rooms, EQUIPMENT
+import closures
+import reassign
+import holds
+import idempotency
+import session_memory
+import audit_log
+import degraded
+import schedule_cache
+import slots
+import occupancy
+import profiling
+
+# Imported on first use: the login page doesn't need either (see lazy_imports.py)
+pd = LazyModule("pandas")
+mysql = LazyModule("mysql")
 
 
 # -------------------------
@@ -37,56 +46,25 @@ def room_name_to_number(room_name):
 # -------------------------
 def validate_login(username, password):
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = "SELECT id, username, first_name, last_name, role FROM login WHERE username=%s AND password=%s"
-    cursor.execute(query, (username, password))
-    user = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return user
+    try:
+        rows, _, _ = run_statement(conn, VALIDATE_LOGIN, (username, password))
+    finally:
+        conn.close()
+    return rows[0] if rows else None
 
 def is_admin():
     return st.session_state.user.get('role', 'user') == 'admin'
 
-# -------------------------
-# Clash checker
-# -------------------------
-def has_clash(day, start_24, end_24, room, exclude_id=None):
-    conn = get_connection()
-    cursor = conn.cursor()
-    #table = "meeting_room1_bookings" if room == 1 else "meeting_room2_bookings"
-    if room == 1:
-        table = "meeting_room1_bookings"
-    elif room == 2:
-        table = "meeting_room2_bookings"
-    elif room == 3:
-        table = "meeting_room3_bookings"
-    else:
-        raise ValueError("Invalid room number")
-    query = f"""
-        SELECT Id FROM {table}
-        WHERE Day = %s
-          AND NOT (EndTime <= %s OR StartTime >= %s)
-    """
-    params = (day, start_24, end_24)
-    if exclude_id:
-        query += " AND Id != %s"
-        params = (*params, exclude_id)
-    cursor.execute(query, params)
-    clash = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return clash is not None
-
 # -------------------------
 # Logging
 # -------------------------
-def log_action(username, user_id, action_type, meeting_id, room, old_data=None, new_data=None, reason=None):
+def log_action(username, user_id, action_type, meeting_id, room, old_data=None, new_data=None, reason=None, rooms=None):
+    """Write one audit row; old/new booking data is stored as a compact delta (see audit_log.py)."""
     conn = get_connection()
     cursor = conn.cursor()
     q = """
-        INSERT INTO meeting_logs (username, created_by_user_id, action_type, meeting_id, room, old_data, new_data, reason)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        INSERT INTO meeting_logs (username, created_by_user_id, action_type, meeting_id, room, delta, reason)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
     try:
         cursor.execute(q, (
@@ -95,8 +73,7 @@ def log_action(username, user_id, action_type, meeting_id, room, old_data=None,
             action_type,
             meeting_id if meeting_id is not None else 0,
             room,
-            json.dumps(serialize_row_for_log(old_data)) if old_data is not None else None,
-            json.dumps(serialize_row_for_log(new_data)) if new_data is not None else None,
+            audit_log.encode(old_data, new_data, rooms=rooms),
             reason
         ))
         conn.commit()  # Add this line
@@ -109,7 +86,14 @@ def log_action(username, user_id, action_type, meeting_id, room, old_data=None,
 # -------------------------
 # CRUD operations
 # -------------------------
-def insert_booking(day, start_24, end_24, agenda, person_name, room, username, user_id):
+def insert_booking(day, start_24, end_24, agenda, person_name, room, username, user_id, idempotency_key=None):
+    # A repeat of a submission that was already saved: nothing to check or write
+    if idempotency_key:
+        existing = idempotency.peek(idempotency_key)
+        if existing is not None:
+            st.info(f"Booking already saved (ID: {existing}).")
+            return existing
+
     # normalize to HH:MM:SS if HH:MM passed
     start_24 = normalize_time_3part(start_24)
     end_24   = normalize_time_3part(end_24)
@@ -143,33 +127,44 @@ def insert_booking(day, start_24, end_24, agenda, person_name, room, username, u
         st.error("Times must be between 09:00 and 20:59.")
         return None
 
-    # clash
+    # insert; an overlapping booking is rejected by booking_slots (see slots.py)
     room_number = room_name_to_number(room)
-    if has_clash(day, start_24, end_24, room_number):
-        st.error("Time clash detected — choose another slot.")
-        return None
-
-    # insert
     conn = get_connection()
-    cursor = conn.cursor()
-    if room_number == 1:
-        table = "meeting_room1_bookings"
-    elif room_number == 2:
-        table = "meeting_room2_bookings"
-    elif room_number == 3:
-        table = "meeting_room3_bookings"
-    else:
-        st.error("Invalid room.")
-        return None
-
-    q = f"""
-        INSERT INTO {table} (Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """
     try:
-        cursor.execute(q, (str(day), start_24, end_24, agenda, person_name, user_id))
+        # Pool connections are autocommit: the booking, its key and the hold release commit together
+        conn.start_transaction()
+        try:
+            _, _, new_id = run_statement(
+                conn, f"insert_booking/{room_number}",
+                (str(day), start_24, end_24, agenda, person_name, user_id)
+            )
+        except mysql.connector.Error as e:
+            if not slots.is_clash(e):
+                raise
+            conn.rollback()
+            # ...possibly with this very submission, saved by an earlier click
+            existing = idempotency.lookup(idempotency_key) if idempotency_key else None
+            if existing is not None:
+                st.info(f"Booking already saved (ID: {existing}).")
+                return existing
+            st.error("Time clash detected — choose another slot.")
+            return None
+        if slots.blocked(conn, room_number, day, start_24, end_24, st.session_state.get("hold_token", "")):
+            conn.rollback()
+            st.error("Time clash detected — choose another slot.")
+            return None
+        if new_id and idempotency_key:
+            existing = idempotency.record(conn, idempotency_key, room_number, new_id)
+            if existing is not None:
+                # Same submission saved concurrently: our insert was rolled back
+                st.info(f"Booking already saved (ID: {existing}).")
+                return existing
+        if new_id and "hold_token" in st.session_state:
+            # The booking takes over the slot hold, in the same transaction
+            holds.release_hold(st.session_state.hold_token, conn)
         conn.commit()
-        new_id = cursor.lastrowid
+        if new_id and idempotency_key:
+            idempotency.remember(idempotency_key, new_id)
         if new_id:
             st.success(f"Booking created (ID: {new_id}).")
             new_data = {
@@ -190,7 +185,6 @@ def insert_booking(day, start_24, end_24, agenda, person_name, room, username, u
         st.error(f"Failed to create booking: {e.msg}")
         return None
     finally:
-        cursor.close()
         conn.close()
 
 
@@ -206,50 +200,38 @@ def change_room(booking_id, old_room, new_room, day, start_24, end_24, agenda, p
     start_24 = normalize_time_3part(start_24)
     end_24 = normalize_time_3part(end_24)
     
-    # Check if target room has a clash
-    if has_clash(day, start_24, end_24, new_room_number):
-        return False, "Meeting is going on in that room, cannot change."
-    
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
     
     # Get table names
-    if old_room_number == 1:
-        old_table = "meeting_room1_bookings"
-    elif old_room_number == 2:
-        old_table = "meeting_room2_bookings"
-    elif old_room_number == 3:
-        old_table = "meeting_room3_bookings"
-    else:
-        return False, "Invalid old room."
-    
-    if new_room_number == 1:
-        new_table = "meeting_room1_bookings"
-    elif new_room_number == 2:
-        new_table = "meeting_room2_bookings"
-    elif new_room_number == 3:
-        new_table = "meeting_room3_bookings"
-    else:
-        return False, "Invalid new room."
+    old_table = room_table(old_room_number)
+    new_table = room_table(new_room_number)
     
     try:
+        # Delete and insert commit together; a clash in the target room undoes both
+        conn.start_transaction()
+
         # Get the old booking data
-        cursor.execute(f"SELECT * FROM {old_table} WHERE Id=%s", (booking_id,))
+        cursor.execute(f"SELECT * FROM {old_table} WHERE Id=%s AND deleted_at IS NULL", (booking_id,))
         old_row = cursor.fetchone()
         
         if not old_row:
+            conn.rollback()
             return False, "Booking not found."
         
         # Delete from old room
         cursor.execute(f"DELETE FROM {old_table} WHERE Id=%s", (booking_id,))
         
-        # Insert into new room
+        # Insert into new room (an overlap there is rejected by booking_slots)
         q = f"""
             INSERT INTO {new_table} (Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId)
             VALUES (%s, %s, %s, %s, %s, %s)
         """
         cursor.execute(q, (str(day), start_24, end_24, agenda, person_name, user_id))
         new_id = cursor.lastrowid
+        if slots.blocked(conn, new_room_number, day, start_24, end_24, st.session_state.get("hold_token", "")):
+            conn.rollback()
+            return False, "Meeting is going on in that room, cannot change."
         
         conn.commit()
         
@@ -260,14 +242,17 @@ def change_room(booking_id, old_room, new_room, day, start_24, end_24, agenda, p
             "EndTime": end_24,
             "Agenda": agenda,
             "PersonName": person_name,
-            "CreatedByUserId": user_id,
-            "RoomChanged": f"{old_room} -> {new_room}"
+            "CreatedByUserId": user_id
         }
         log_action(username, user_id, "UPDATE", new_id, new_room_number,
-                   old_data=old_row, new_data=new_data, reason=f"Room changed from {old_room} to {new_room}")
+                   old_data=old_row, new_data=new_data, reason=f"Room changed from {old_room} to {new_room}",
+                   rooms=(old_room_number, new_room_number))
         
         return True, None
     except mysql.connector.Error as e:
+        conn.rollback()
+        if slots.is_clash(e):
+            return False, "Meeting is going on in that room, cannot change."
         return False, f"Failed to change room: {e.msg}"
     finally:
         cursor.close()
@@ -278,30 +263,18 @@ def update_booking(booking_id, day, start_24, end_24, agenda, person_name, room,
     room_number = room_name_to_number(room)
 
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    # choose table
-    if room_number == 1:
-        table = "meeting_room1_bookings"
-    elif room_number == 2:
-        table = "meeting_room2_bookings"
-    elif room_number == 3:
-        table = "meeting_room3_bookings"
-    else:
-        st.error("Invalid room.")
-        return
 
     # old row
-    cursor.execute(f"SELECT * FROM {table} WHERE Id=%s", (booking_id,))
-    old_row = cursor.fetchone()
+    rows, _, _ = run_statement(conn, f"select_booking/{room_number}", (booking_id,))
+    old_row = rows[0] if rows else None
     if not old_row:
         st.error("Booking not found.")
-        cursor.close(); conn.close(); return
+        conn.close(); return
 
     # ownership
     if not is_admin() and user_id != old_row['CreatedByUserId']:
         st.error("You can only update your own bookings.")
-        cursor.close(); conn.close(); return
+        conn.close(); return
 
     # existing start/end -> HH:MM:SS
     old_start_ss = normalize_time_3part(convert_time_value_to_24_str(old_row.get("StartTime")))
@@ -315,7 +288,7 @@ def update_booking(booking_id, day, start_24, end_24, agenda, person_name, room,
 
     if end_dt <= now:
         st.error("Cannot update a meeting that already ended.")
-        cursor.close(); conn.close(); return
+        conn.close(); return
 
     # incoming -> HH:MM:SS
     start_24_ss = normalize_time_3part(start_24)
@@ -327,7 +300,7 @@ def update_booking(booking_id, day, start_24, end_24, agenda, person_name, room,
         new_end_obj   = datetime.strptime(end_24_ss,   "%H:%M:%S").time()
     except ValueError:
         st.error("Invalid time format for update.")
-        cursor.close(); conn.close(); return
+        conn.close(); return
 
     new_start_dt = datetime.combine(day, new_start_obj)
     new_end_dt   = datetime.combine(day, new_end_obj)
@@ -335,7 +308,7 @@ def update_booking(booking_id, day, start_24, end_24, agenda, person_name, room,
     # new end cannot be in past
     if new_end_dt <= now:
         st.error("Cannot update booking into the past. Choose a future time.")
-        cursor.close(); conn.close(); return
+        conn.close(); return
 
     # window 09:00–20:59
     def within_window(hhmmss: str) -> bool:
@@ -344,61 +317,60 @@ def update_booking(booking_id, day, start_24, end_24, agenda, person_name, room,
         return MIN_HOUR <= h <= MAX_HOUR
 
     is_ongoing = start_dt <= now <= end_dt
+    clash_message = "Time clash detected — choose another slot."
 
     try:
         if is_ongoing:
             # lock start/day
             if day != old_row["Day"] or start_24_ss != old_start_ss:
                 st.info("⚡ Ongoing meeting: to change day/start, delete & recreate.")
-                cursor.close(); conn.close(); return
+                return
 
             if not within_window(end_24_ss):
                 st.error("End time must be between 09:00 and 20:59.")
-                cursor.close(); conn.close(); return
+                return
 
             if datetime.strptime(end_24_ss, "%H:%M:%S") <= datetime.strptime(old_start_ss, "%H:%M:%S"):
                 st.error("End time must be after the start time.")
-                cursor.close(); conn.close(); return
-
-            if has_clash(day, old_start_ss, end_24_ss, room_number, exclude_id=booking_id):
-                st.error("Time clash detected — another meeting conflicts with the new time.")
-                cursor.close(); conn.close(); return
-
-            q = f"""
-                UPDATE {table}
-                SET EndTime=%s, Agenda=%s, PersonName=%s
-                WHERE Id=%s
-            """
-            cursor.execute(q, (end_24_ss, agenda, person_name, booking_id))
+                return
+
+            # An overlap with another booking is rejected by booking_slots (see slots.py)
+            clash_message = "Time clash detected — another meeting conflicts with the new time."
+            window = (old_start_ss, end_24_ss)
+            conn.start_transaction()
+            _, rowcount, _ = run_statement(
+                conn, f"update_booking_end/{room_number}",
+                (end_24_ss, agenda, person_name, booking_id)
+            )
 
         else:
             # block back-dating for future meetings
             if day < today or new_start_dt <= now:
                 st.error("Cannot update start time into the past for a meeting that hasn't started. Choose a future start time.")
-                cursor.close(); conn.close(); return
+                return
 
             if not within_window(start_24_ss) or not within_window(end_24_ss):
                 st.error("Times must be between 09:00 and 20:59.")
-                cursor.close(); conn.close(); return
+                return
 
             if new_end_dt <= new_start_dt:
                 st.error("End time must be after start time.")
-                cursor.close(); conn.close(); return
-
-            if has_clash(day, start_24_ss, end_24_ss, room_number, exclude_id=booking_id):
-                st.error("Time clash detected — choose another slot.")
-                cursor.close(); conn.close(); return
+                return
 
-            q = f"""
-                UPDATE {table}
-                SET Day=%s, StartTime=%s, EndTime=%s, Agenda=%s, PersonName=%s
-                WHERE Id=%s
-            """
-            cursor.execute(q, (str(day), start_24_ss, end_24_ss, agenda, person_name, booking_id))
+            window = (start_24_ss, end_24_ss)
+            conn.start_transaction()
+            _, rowcount, _ = run_statement(
+                conn, f"update_booking/{room_number}",
+                (str(day), start_24_ss, end_24_ss, agenda, person_name, booking_id)
+            )
 
+        if slots.blocked(conn, room_number, day, *window, st.session_state.get("hold_token", "")):
+            conn.rollback()
+            st.error(clash_message)
+            return
         conn.commit()
 
-        if cursor.rowcount > 0:
+        if rowcount > 0:
             st.success("Booking updated.")
             new_data = {
                 "Day": str(day),
@@ -415,194 +387,108 @@ def update_booking(booking_id, day, start_24, end_24, agenda, person_name, room,
             st.info("No changes applied. Booking may not exist or data is the same.")
 
     except mysql.connector.Error as e:
-        st.error(f"Update failed: {e.msg}")
+        conn.rollback()
+        if slots.is_clash(e):
+            st.error(clash_message)
+        else:
+            st.error(f"Update failed: {e.msg}")
     finally:
-        cursor.close(); conn.close()
+        conn.close()
 
 
 
-def delete_booking(booking_id, room, username, user_id, reason_text):
+def delete_booking(booking_id, room, username, user_id, reason_text, old_row=None):
+    """
+    Soft-delete a booking with a single UPDATE: the row stays in its room table
+    with deleted_at/deleted_by/delete_reason set and drops out of every live query.
+    Ownership (non-admins) and "not ended yet" are part of the WHERE clause, so the
+    row is only read again to explain a refusal or when the caller has no copy to log.
+    """
     room_number = room_name_to_number(room)
+    table = room_table(room_number)
+    now = datetime.now()
+
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
-    if room_number == 1:
-        table = "meeting_room1_bookings"
-    elif room_number == 2:
-        table = "meeting_room2_bookings"
-    elif room_number == 3:
-        table = "meeting_room3_bookings"
-    cursor.execute(f"SELECT * FROM {table} WHERE Id=%s", (booking_id,))
-    row = cursor.fetchone()
-    if not row:
-        st.error("Booking not found.")
-        cursor.close()
-        conn.close()
-        return
-
-    # Ownership check
-    if not is_admin() and user_id != row['CreatedByUserId']:
-        st.error("You can only delete your own bookings.")
-        cursor.close()
-        conn.close()
-        return
-
-    end_str = convert_time_value_to_24_str(row.get("EndTime"))
-    end_dt = datetime.combine(row["Day"], datetime.strptime(end_str, "%H:%M:%S").time())
-    if end_dt <= datetime.now():
-        st.error("Cannot delete a meeting that already ended.")
-        cursor.close()
-        conn.close()
-        return
+    params = (now, user_id, reason_text, booking_id, now)
+    if is_admin():
+        name = f"delete_booking/{room_number}"
+    else:
+        name = f"delete_own_booking/{room_number}"
+        params = (*params, user_id)
 
     try:
-        # Insert into deleted_meetings
-        cursor.execute(
-            """
-            INSERT INTO deleted_meetings 
-            (meeting_id, room, Day, StartTime, EndTime, Agenda, PersonName, deleted_by_user_id, reason)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                booking_id,
-                room_number,
-                row["Day"],
-                row["StartTime"],
-                row["EndTime"],
-                row["Agenda"],
-                row["PersonName"],
-                user_id,
-                reason_text
-            )
-        )
-        # Delete from bookings
-        cursor.execute(f"DELETE FROM {table} WHERE Id=%s", (booking_id,))
-        affected_rows = cursor.rowcount
-        conn.commit()
+        _, affected_rows, _ = run_statement(conn, name, params)
+
         if affected_rows > 0:
+            if old_row is None:
+                cursor.execute(
+                    f"SELECT Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId FROM {table} WHERE Id=%s",
+                    (booking_id,)
+                )
+                old_row = cursor.fetchone()
             st.success("Booking deleted.")
-            log_action(username, user_id, "DELETE", booking_id, room_number, old_data=row, new_data=None, reason=reason_text)
+            log_action(username, user_id, "DELETE", booking_id, room_number, old_data=old_row, new_data=None, reason=reason_text)
             st.session_state.data_updated = True
+            return True
+
+        # Nothing updated: find out why
+        cursor.execute(f"SELECT Day, EndTime, CreatedByUserId, deleted_at FROM {table} WHERE Id=%s", (booking_id,))
+        row = cursor.fetchone()
+        if not row or row["deleted_at"] is not None:
+            st.error("Booking not found.")
+        elif not is_admin() and user_id != row["CreatedByUserId"]:
+            st.error("You can only delete your own bookings.")
         else:
-            st.error("No rows deleted. Booking may not exist.")
+            st.error("Cannot delete a meeting that already ended.")
+        return False
     except mysql.connector.Error as e:
         st.error(f"DB error: {e.msg}")
+        return False
     finally:
         cursor.close()
         conn.close()
 
 # -------------------------
-# Load bookings
+# Load history (past meetings, month-wise)
 # -------------------------
-def load_bookings(selected_day=None):
+def load_history(year, month):
     """
-    Load future/ongoing bookings only:
-    - Past dates return empty DataFrames.
-    - Today's date returns only meetings whose combined Day+EndTime >= NOW().
-    - Future dates return all meetings.
+    Past meetings for one month, per room.
+    Rows moved out by archive_bookings.py are read back from the archive table,
+    so the History page sees the same data before and after archival.
+    Past data only, so it is served from the read replica when one is configured.
     """
-    conn = get_connection()
+    conn = get_read_connection()
     now = datetime.now()
-    now_dt_str = now.strftime("%Y-%m-%d %H:%M:%S")
-
-    # --- Decide filter clause and params ---
-    if selected_day:
-        if selected_day < now.date():
-            # Past date → no data
-            conn.close()
-            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-        elif selected_day == now.date():
-            # Today → restrict to Day = today AND EndTime >= now
-            filter_clause = "WHERE Day = %s AND CONCAT(Day,' ',EndTime) >= %s"
-            params = (selected_day.strftime("%Y-%m-%d"), now_dt_str)
-        else:  # Future date → restrict to Day exactly
-            filter_clause = "WHERE Day = %s"
-            params = (selected_day.strftime("%Y-%m-%d"),)
-    else:
-        # Default to "today ongoing/future"
-        filter_clause = "WHERE Day = %s AND CONCAT(Day,' ',EndTime) >= %s"
-        params = (now.date().strftime("%Y-%m-%d"), now_dt_str)
-
-    # --- Queries ---
-    q1 = f"""
-        SELECT Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId
-        FROM meeting_room1_bookings
-        {filter_clause}
-        ORDER BY StartTime
-    """
-    q2 = f"""
-        SELECT Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId
-        FROM meeting_room2_bookings
-        {filter_clause}
-        ORDER BY StartTime
-    """
-    q3 = f"""
-        SELECT Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId
-        FROM meeting_room3_bookings
-        {filter_clause}
-        ORDER BY StartTime
-    """
-
-    df1 = pd.read_sql(q1, conn, params=params)
-    df2 = pd.read_sql(q2, conn, params=params)
-    df3 = pd.read_sql(q3, conn, params=params)
-    conn.close()
 
-    # --- Add display columns ---
-    for df in (df1, df2, df3):
-        if not df.empty:
-            # Ensure Day is a date
-            df["Day"] = pd.to_datetime(df["Day"], errors="coerce").dt.date
-
-            # Extract time strings cleanly
-            df["StartTimeStr"] = df["StartTime"].apply(lambda x: str(x)[-8:] if pd.notna(x) else "00:00:00")
-            df["EndTimeStr"] = df["EndTime"].apply(lambda x: str(x)[-8:] if pd.notna(x) else "00:00:00")
-
-            # Convert to nice AM/PM
-            df["Start Display"] = pd.to_datetime(
-                df["StartTimeStr"], format="%H:%M:%S", errors="coerce"
-            ).dt.strftime("%I:%M %p")
-            df["End Display"] = pd.to_datetime(
-                df["EndTimeStr"], format="%H:%M:%S", errors="coerce"
-            ).dt.strftime("%I:%M %p")
-
-    return df1, df2, df3
-
-
-
-# -------------------------
-# Load history (past meetings, month-wise)
-# -------------------------
-def load_history(year, month):
-    conn = get_connection()
-    now = datetime.now()
+    # Day range instead of YEAR()/MONTH() so the Day index and archive partitions are used
+    month_start = date(year, month, 1)
+    next_month_start = date(year + month // 12, month % 12 + 1, 1)
+
+    def history_query(room_number):
+        return f"""
+            SELECT Id, Day, StartTime, EndTime, Agenda, PersonName
+            FROM {room_table(room_number)}
+            WHERE Day >= %s AND Day < %s AND deleted_at IS NULL
+              AND (Day < %s OR (Day = %s AND EndTime < %s))
+            UNION ALL
+            SELECT Id, Day, StartTime, EndTime, Agenda, PersonName
+            FROM {ARCHIVE_TABLE}
+            WHERE room = {room_number} AND Day >= %s AND Day < %s AND deleted_at IS NULL
+            ORDER BY Day, StartTime
+        """
 
-    q1 = """
-        SELECT Id, Day, StartTime, EndTime, Agenda, PersonName
-        FROM meeting_room1_bookings
-        WHERE YEAR(Day) = %s AND MONTH(Day) = %s
-          AND (Day < %s OR (Day = %s AND EndTime < %s))
-        ORDER BY Day, StartTime
-    """
-    q2 = """
-        SELECT Id, Day, StartTime, EndTime, Agenda, PersonName
-        FROM meeting_room2_bookings
-        WHERE YEAR(Day) = %s AND MONTH(Day) = %s
-          AND (Day < %s OR (Day = %s AND EndTime < %s))
-        ORDER BY Day, StartTime
-    """
-    q3 = """
-        SELECT Id, Day, StartTime, EndTime, Agenda, PersonName
-        FROM meeting_room3_bookings
-        WHERE YEAR(Day) = %s AND MONTH(Day) = %s
-          AND (Day < %s OR (Day = %s AND EndTime < %s))
-        ORDER BY Day, StartTime
-    """
+    q1 = history_query(1)
+    q2 = history_query(2)
+    q3 = history_query(3)
 
     params = (
-        year, month,
-        now.strftime("%Y-%m-%d"), 
-        now.strftime("%Y-%m-%d"), 
-        now.strftime("%H:%M:%S")
+        month_start, next_month_start,
+        now.strftime("%Y-%m-%d"),
+        now.strftime("%Y-%m-%d"),
+        now.strftime("%H:%M:%S"),
+        month_start, next_month_start
     )
 
     df1 = pd.read_sql(q1, conn, params=params)
@@ -624,6 +510,46 @@ def load_history(year, month):
 
     return df1, df2, df3
 
+# -------------------------
+# Load deleted meetings (month-wise)
+# -------------------------
+def load_deleted_meetings(year, month):
+    """Soft-deleted bookings of all rooms (live tables and archive) whose Day falls in the month."""
+    month_start = date(year, month, 1)
+    next_month_start = date(year + month // 12, month % 12 + 1, 1)
+
+    selects = [
+        f"""
+        SELECT b.Id AS meeting_id, {room_number} AS room, b.Day, b.StartTime, b.EndTime,
+               b.Agenda, b.PersonName, b.deleted_by AS deleted_by_user_id,
+               b.delete_reason AS reason, b.deleted_at
+        FROM {table} b
+        WHERE b.Day >= %s AND b.Day < %s AND b.deleted_at IS NOT NULL
+        """
+        for room_number, table in ROOM_TABLES.items()
+    ]
+    selects.append(
+        f"""
+        SELECT a.Id, a.room, a.Day, a.StartTime, a.EndTime,
+               a.Agenda, a.PersonName, a.deleted_by,
+               a.delete_reason, a.deleted_at
+        FROM {ARCHIVE_TABLE} a
+        WHERE a.Day >= %s AND a.Day < %s AND a.deleted_at IS NOT NULL
+        """
+    )
+    q = f"""
+        SELECT d.*, l.username
+        FROM ({" UNION ALL ".join(selects)}) d
+        LEFT JOIN login l ON l.id = d.deleted_by_user_id
+        ORDER BY d.deleted_at DESC
+    """
+    params = (month_start, next_month_start) * len(selects)
+
+    conn = get_read_connection()
+    deleted_df = pd.read_sql(q, conn, params=params)
+    conn.close()
+    return deleted_df
+
 # -------------------------
 # Helpers: time conversion & serialization
 # -------------------------
@@ -647,23 +573,6 @@ def convert_time_value_to_24_str(val):
             return str(val)[:5]
 
 
-def serialize_row_for_log(row_dict):
-    if row_dict is None:
-        return None
-    out = {}
-    for k, v in row_dict.items():
-        if isinstance(v, (datetime, date)):
-            out[k] = v.isoformat()
-        else:
-            try:
-                out[k] = str(v)
-            except Exception:
-                out[k] = None
-    return out
-
-from datetime import datetime, time
-import pandas as pd
-
 MIN_HOUR = 9
 MAX_HOUR = 20
 
@@ -786,23 +695,19 @@ def validate_time_input(time_str):
 
 
 # -------- Helper function for overlap check --------
-def check_overlap(df, day, start_time_str, end_time_str, exclude_id=None):
-    """Check if the new booking overlaps with existing bookings."""
-    # Convert input strings to datetime.time
-    start_time = datetime.strptime(start_time_str, "%H:%M:%S").time()
-    end_time = datetime.strptime(end_time_str, "%H:%M:%S").time()
-
-    for _, row in df.iterrows():
-        if exclude_id and row["Id"] == exclude_id:
+def check_overlap(bookings, day, start_time_str, end_time_str, exclude_id=None):
+    """Check if the new booking overlaps with existing bookings (Booking records of one room)."""
+    # 'HH:MM:SS' strings compare in time order
+    start_time = normalize_time_3part(start_time_str)
+    end_time = normalize_time_3part(end_time_str)
+
+    for b in bookings:
+        if exclude_id and b.id == exclude_id:
             continue
-        if row["Day"] != day:
+        if b.day != day:
             continue
-        # Convert existing start/end times to datetime.time
-        existing_start = datetime.strptime(str(row["StartTime"])[-8:], "%H:%M:%S").time()
-        existing_end = datetime.strptime(str(row["EndTime"])[-8:], "%H:%M:%S").time()
-        
         # Check overlap
-        if not (end_time <= existing_start or start_time >= existing_end):
+        if not (end_time <= b.start or start_time >= b.end):
             return True
     return False
 
@@ -848,8 +753,15 @@ def admin_rules_dialog():
 # -------------------------
 # Streamlit UI
 # -------------------------
+# An admin asked to profile this rerun (Profiles page or ?profile=1): the script runs again under cProfile
+if profiling.requested():
+    profiling.run_profiled(__file__)
+
 st.set_page_config(page_title="PFEPL", layout="wide")
 
+# Record statements slower than [slow_query].threshold_ms (once per process)
+slow_queries.install()
+
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 if "user" not in st.session_state:
@@ -875,9 +787,22 @@ if "show_admin_rules_popup" not in st.session_state:
 if "show_rules_popup" not in st.session_state:
     st.session_state.show_rules_popup = False
 
+# Footprint of this session, and eviction of idle sessions' cached frames (see session_memory.py)
+session_memory.track((st.session_state.user or {}).get("username", ""))
+
 # Auto-refresh mechanism
 if st.session_state.data_updated:
     st.session_state.data_updated = False
+    session_memory.invalidate()
+    # Pick up the write just made (by this or another replica) before the page reloads.
+    # While the database is down there is nothing to poll; the page serves the snapshot.
+    if not degraded.is_down():
+        try:
+            schedule_cache.poll(force=True)
+        except mysql.connector.Error as e:
+            if not degraded.unreachable(e):
+                raise
+            degraded.mark_down(e)
     st.rerun()
 
 if st.session_state.page == "Login" or not st.session_state.logged_in:
@@ -906,6 +831,10 @@ if st.session_state.page == "Login" or not st.session_state.logged_in:
                 st.error("Invalid credentials")
 
 else:
+    # Keep a local schedule snapshot for when the database is unreachable (once per process).
+    # Started after login: the refresher imports mysql.connector, which the login page doesn't need
+    degraded.install()
+
     # ---------------- Navigation bar (only visible after login) ----------------
     st.sidebar.markdown("## Navigation")
 
@@ -919,7 +848,13 @@ else:
     options = ["Home"]
     if st.session_state.is_admin:
         options.append("History")
+        options.append("Occupancy")
+        options.append("History Search")
+        options.append("Room Closures")
         options.append("User Details")
+        options.append("Slow Queries")
+        options.append("Sessions")
+        options.append("Profiles")
 
     nav = st.sidebar.radio(
         "Go to", options, index=options.index(st.session_state.nav_selection)
@@ -950,6 +885,8 @@ else:
                     "logged_in", "is_admin", "data_updated", "show_manage", 
                     "show_create","show_admin_rules_popup", "show_rules_popup", "show_passwords"
                 ] else ""
+            st.session_state.pop("my_bookings_pages", None)
+            session_memory.invalidate()
             st.session_state.page = "Login"
             st.session_state.last_nav = "Home"
             st.rerun()
@@ -958,7 +895,10 @@ else:
     with left_col:
 
         # ======================= HOME PAGE =======================
-        if st.session_state.page == "Home":
+        if st.session_state.page != "Home" and degraded.is_down():
+            st.warning("The database is unreachable. Only the Home page schedule is available until it is back.")
+
+        elif st.session_state.page == "Home":
             # Show rules popup only once per login for normal users 
             if st.session_state.is_admin and st.session_state.show_admin_rules_popup:
                 admin_rules_dialog()
@@ -997,43 +937,50 @@ else:
 
             st.session_state.selected_day = new_selected_day
 
-            # === Now load bookings for this day ===
-            df1, df2, df3 = load_bookings(new_selected_day)
+            # === Now load bookings for this day (from the local snapshot if the database is down) ===
+            try:
+                schedule, snapshot_at = degraded.load_bookings(new_selected_day)
+            except degraded.SnapshotUnavailable:
+                st.error("The database is unreachable and there is no local copy of this day's schedule.")
+                st.stop()
+            offline = snapshot_at is not None
+            if offline:
+                st.warning(
+                    f"The database is unreachable. Showing the schedule as of {snapshot_at:%d-%m-%Y %H:%M} (read-only). "
+                    "New bookings are queued and saved, after a fresh clash check, once it is back."
+                )
 
-            # === Display bookings ===
-            st.markdown("### Small Conference")
-            if df1.empty:
-                st.info("No bookings for Small Conference on this date.")
-            else:
-                disp1 = df1[["Start Display", "End Display", "Agenda", "PersonName"]].copy()
-                disp1.columns = ["Start", "End", "Agenda", "Person"]
-                st.dataframe(disp1, use_container_width=True)
+            queued = degraded.pending(st.session_state.user['id'])
+            if queued:
+                st.caption(f"{len(queued)} of your bookings are queued and will be saved once the database is back.")
+            for r in degraded.outcomes(st.session_state.user['id']):
+                if r["at"] >= (datetime.now() - timedelta(days=1)).isoformat():
+                    when = f"{date.fromisoformat(r['day']):%d-%m-%Y} {r['start'][:5]}-{r['end'][:5]}"
+                    if r["outcome"] == "saved":
+                        st.caption(f"Queued booking {when} ({r['agenda']}) was saved (ID: {r['detail']}).")
+                    else:
+                        st.warning(f"Queued booking {when} ({r['agenda']}) was not saved: {r['detail']}.")
 
-            st.markdown("### Big Conference")
-            if df2.empty:
-                st.info("No bookings for Big Conference on this date.")
-            else:
-                disp2 = df2[["Start Display", "End Display", "Agenda", "PersonName"]].copy()
-                disp2.columns = ["Start", "End", "Agenda", "Person"]
-                st.dataframe(disp2, use_container_width=True)
-            
-            st.markdown("### 7th Floor Conference")
-            if df3.empty:
-                st.info("No bookings for 7th Floor Conference on this date.")
-            else:
-                disp3 = df3[["Start Display", "End Display", "Agenda", "PersonName"]].copy()
-                disp3.columns = ["Start", "End", "Agenda", "Person"]
-                st.dataframe(disp3, use_container_width=True)
+            # === Display bookings ===
+            for room_number, room_label in ROOM_NAMES.items():
+                st.markdown(f"### {room_label}")
+                if not schedule.rooms[room_number]:
+                    st.info(f"No bookings for {room_label} on this date.")
+                else:
+                    st.dataframe(display_rows(schedule.rooms[room_number]), use_container_width=True)
 
 
             # ---------------- Create Booking ----------------
-            # Put this AFTER you've displayed df1, df2, df3 (i.e., outside their if/else blocks)
+            # Put this AFTER the room tables (i.e., outside their if/else blocks)
             st.markdown("---")
             if st.button("Create Booking", key="toggle_create"):
                 # Flip the flag
                 st.session_state.show_create = not st.session_state.get("show_create", False)
                 st.session_state.show_manage = False   # always close manage if toggling create
                 st.session_state.pop("booking_msg", None)
+                st.session_state.pop("c_suggestions", None)
+                if st.session_state.pop("c_hold", None):
+                    holds.release_hold(holds.session_token())
 
             # now render form based on flag (not button return)
             if st.session_state.get("show_create", False):
@@ -1053,12 +1000,73 @@ else:
                 c_agenda      = st.text_input("Agenda", key="c_agenda")
                 st.text(f"Person: {person_name}")
 
+                # ---- Slot hold: keep the slot for this session while the form is filled in ----
+                if not offline and validate_time_input(c_start_input) and validate_time_input(c_end_input):
+                    h_start, h_end, h_err = smart_24_hour(c_start_input, c_end_input)
+                    if not h_err and c_day >= date.today() and h_end > h_start:
+                        wanted = (room_name_to_number(c_room), c_day,
+                                  h_start.strftime("%H:%M:%S"), h_end.strftime("%H:%M:%S"))
+                        held = st.session_state.get("c_hold")
+                        # Ask again when the slot changes, shortly before the hold expires,
+                        # or (if it was refused) after a short wait
+                        if held is None or held["slot"] != wanted or held["recheck_at"] <= datetime.now():
+                            ok, info = holds.place_hold(*wanted, holds.session_token(), st.session_state.user['id'])
+                            held = {
+                                "slot": wanted, "ok": ok, "info": info,
+                                "recheck_at": info - timedelta(seconds=30) if ok else datetime.now() + timedelta(seconds=15),
+                            }
+                            st.session_state.c_hold = held
+                        if held["ok"]:
+                            st.caption(f"This slot is held for you until {held['info']:%H:%M}.")
+                        else:
+                            st.warning(held["info"])
+
+                # ---- Room suggestion: smallest free room that seats everyone ----
+                s_col1, s_col2 = st.columns([1, 2])
+                with s_col1:
+                    c_attendees = st.number_input("Attendees", min_value=1, max_value=200, value=2, key="c_attendees")
+                with s_col2:
+                    c_equipment = st.multiselect("Equipment needed", list(EQUIPMENT), key="c_equipment")
+
+                if st.button("Suggest a room", key="suggest_room"):
+                    st.session_state.pop("c_suggestions", None)
+                    if offline:
+                        st.error("Room suggestions need the database, which is unreachable right now.")
+                    elif not (validate_time_input(c_start_input) and validate_time_input(c_end_input)):
+                        st.error("Enter valid start and end times first.")
+                    else:
+                        s_start, s_end, err = smart_24_hour(c_start_input, c_end_input)
+                        if err:
+                            st.error(err)
+                        else:
+                            st.session_state.c_suggestions = [
+                                (r.name, r.label) for r in recommend_rooms(
+                                    c_attendees, c_day, s_start.strftime("%H:%M:%S"),
+                                    s_end.strftime("%H:%M:%S"), c_equipment,
+                                )
+                            ]
+
+                if "c_suggestions" in st.session_state:
+                    if not st.session_state.c_suggestions:
+                        st.warning("No free room fits this group and time. Try another time.")
+                    for i, (name, label) in enumerate(st.session_state.c_suggestions):
+                        st.button(
+                            ("Best fit: " if i == 0 else "Use: ") + label,
+                            key=f"use_room_{i}",
+                            on_click=lambda name=name: st.session_state.update({"c_room": name}),
+                        )
+
                 col1, col2 = st.columns([1, 1])
 
                 with col1:
                     if st.button("Save Booking", key="save_create"):
+                        # A second click / rerun of a submission that was already saved stops here
+                        c_key = idempotency.form_key("create")
+                        saved_id = idempotency.cached(c_key)
                         # Validation happens only when Save is clicked
-                        if not c_start_input or not c_end_input:
+                        if saved_id is not None:
+                            st.info(f"Booking already saved (ID: {saved_id}).")
+                        elif not c_start_input or not c_end_input:
                             st.error("Please enter both start and end times.")
                         elif not validate_time_input(c_start_input):
                             st.error("Invalid start time! Use HH.MM with 2-digit minutes (e.g., 11.30).")
@@ -1074,25 +1082,38 @@ else:
                                 if new_end_dt <= new_start_dt:
                                     st.error("End time must be after start time.")
                                 else:
-                                    # Choose the room dataframe for overlap check
-                                    if c_room == "Small Conference":
-                                        df_room = df1
-                                    elif c_room == "Big Conference":
-                                        df_room = df2
-                                    elif c_room == "7th Floor Conference":
-                                        df_room = df3
-                                    else:
-                                        raise ValueError("Invalid room")
-
-                                    if check_overlap(
-                                        df_room,
+                                    # The booking day's schedule for the overlap check: while offline the queue has only the
+                                    # snapshot to go by; online, booking_slots rejects any clash this check misses
+                                    day_schedule = degraded.snapshot_schedule(c_day) if offline else schedule
+                                    if day_schedule is None:
+                                        st.error("The database is unreachable and there is no local copy of that day's schedule. "
+                                                 "Try again once it is back.")
+                                    elif check_overlap(
+                                        day_schedule.rooms[room_name_to_number(c_room)],
                                         c_day,
                                         new_start_time.strftime("%H:%M:%S"),
                                         new_end_time.strftime("%H:%M:%S")
                                     ):
-                                        st.error("This time slot is already booked in the selected room. Choose another.")
+                                        # The clash may be this submission, saved by another app process (the database
+                                        # is only asked while it is up; the cache was checked above)
+                                        saved_id = None if offline else idempotency.lookup(c_key)
+                                        if saved_id is not None:
+                                            st.info(f"Booking already saved (ID: {saved_id}).")
+                                        else:
+                                            st.error("This time slot is already booked in the selected room. Choose another.")
+                                    elif offline:
+                                        # Saved by the replay once the database is back (clash checked again there)
+                                        degraded.enqueue(
+                                            c_key, room_name_to_number(c_room), c_day,
+                                            new_start_time.strftime("%H:%M:%S"), new_end_time.strftime("%H:%M:%S"),
+                                            c_agenda, person_name,
+                                            st.session_state.user['username'], st.session_state.user['id']
+                                        )
+                                        idempotency.new_form_key("create")
+                                        st.session_state.show_create = False
+                                        st.rerun()
                                     else:
-                                        insert_booking(
+                                        new_id = insert_booking(
                                             c_day,
                                             new_start_time.strftime("%H:%M:%S"),
                                             new_end_time.strftime("%H:%M:%S"),
@@ -1100,15 +1121,27 @@ else:
                                             person_name,
                                             c_room,
                                             st.session_state.user['username'],
-                                            st.session_state.user['id']
+                                            st.session_state.user['id'],
+                                            idempotency_key=c_key
                                         )
                                         # st.success("Booking created successfully.")
+                                        if new_id:
+                                            idempotency.new_form_key("create")
+                                            st.session_state.pop("c_hold", None)  # released by insert_booking
+                                        elif st.session_state.pop("c_hold", None):
+                                            # Not saved (clash, closure or database error): free the slot for others now, not at expiry
+                                            try:
+                                                holds.release_hold(holds.session_token())
+                                            except mysql.connector.Error:
+                                                pass  # it expires after [holds].ttl_seconds anyway
                                         st.session_state.show_create = False
                                         st.rerun()
 
                 with col2:
                     if st.button("Close Create", key="cancel_create"):
                         st.session_state.show_create = False  # just close the section
+                        if st.session_state.pop("c_hold", None):
+                            holds.release_hold(holds.session_token())
                         st.rerun()
 
 
@@ -1119,293 +1152,258 @@ else:
                 st.session_state.show_create = False   # always close create if toggling manage
                 st.session_state.pop("booking_msg", None)  # clear old messages
 
-            if st.session_state.get("show_manage", False):
+            if st.session_state.get("show_manage", False) and offline:
+                st.info("Bookings can't be changed while the database is unreachable.")
+            elif st.session_state.get("show_manage", False):
                 st.subheader("Manage Bookings" + (" (Admin)" if st.session_state.is_admin else " (Your Bookings)"))
 
-                room_choice = st.selectbox(
-                    "Room to manage",
-                    ["Small Conference", "Big Conference", "7th Floor Conference"],
-                    key="manage_room"
-                )
+                sel = None
+                if st.session_state.is_admin:
+                    room_choice = st.selectbox(
+                        "Room to manage",
+                        ["Small Conference", "Big Conference", "7th Floor Conference"],
+                        key="manage_room"
+                    )
+
+                    # Choose room bookings
+                    rn = room_name_to_number(room_choice)
+                    room_bookings = schedule.rooms[rn]
 
-                # Choose room df
-                rn = room_name_to_number(room_choice)
-                if rn == 1:
-                    df_sel = df1
-                elif rn == 2:
-                    df_sel = df2
+                    if not room_bookings:
+                        st.info(f"No bookings for {room_choice} on this date.")
+                    else:
+                        booking_id = st.selectbox(
+                            "Select booking",
+                            [None] + [b.id for b in room_bookings],
+                            format_func=lambda i: "Select a booking" if i is None else schedule.get(rn, i).label,
+                            key="pick_booking",
+                        )
+                        if booking_id is not None:
+                            sel = schedule.get(rn, booking_id)
                 else:
-                    df_sel = df3
+                    # Non-admin users manage their own upcoming bookings on any date,
+                    # one keyset page at a time (see load_my_bookings)
+                    page_keys = st.session_state.setdefault("my_bookings_pages", [None])
+                    my_bookings, has_more = load_my_bookings(st.session_state.user['id'], after=page_keys[-1])
 
-                # Non-admin users see only their own bookings
-                if not st.session_state.is_admin and not df_sel.empty:
-                    df_sel = df_sel[df_sel['CreatedByUserId'] == st.session_state.user['id']]
+                    if not my_bookings:
+                        st.info("You have no upcoming bookings.")
+                    else:
+                        my_by_key = {(b.room, b.id): b for b in my_bookings}
+                        pick = st.selectbox(
+                            "Select booking",
+                            [None] + list(my_by_key),
+                            format_func=lambda k: "Select a booking" if k is None else my_by_key[k].dated_label,
+                            key="pick_my_booking",
+                        )
+                        sel = my_by_key.get(pick)
 
-                if df_sel.empty:
-                    st.info(f"No bookings for {room_choice} on this date."
-                            + (" (or none you own)" if not st.session_state.is_admin else ""))
-                else:
-                    df_sel = df_sel.copy()
-                    df_sel["label"] = df_sel.apply(
-                        lambda r: f"{r['Id']} | {r['Start Display']} - {r['End Display']} | {r['PersonName']} | {r['Agenda']}",
-                        axis=1,
-                    )
-                    pick = st.selectbox(
-                        "Select booking",
-                        ["Select a booking"] + df_sel["label"].tolist(),
-                        key="pick_booking",
-                    )
+                    prev_col, next_col = st.columns([1, 1])
+                    with prev_col:
+                        if len(page_keys) > 1 and st.button("Previous page", key="my_bookings_prev"):
+                            page_keys.pop()
+                            st.session_state.pop("pick_my_booking", None)
+                            st.rerun()
+                    with next_col:
+                        if has_more and st.button("Next page", key="my_bookings_next"):
+                            page_keys.append(my_bookings[-1].page_key)
+                            st.session_state.pop("pick_my_booking", None)
+                            st.rerun()
 
-                    if pick != "Select a booking":
-                        booking_id = int(pick.split("|")[0].strip())
-                        sel_row = df_sel[df_sel["Id"] == booking_id].iloc[0]
+                    if sel is not None:
+                        room_choice = ROOM_NAMES[sel.room]
+                        room_bookings = [b for b in my_bookings if b.room == sel.room]
+                        booking_id = sel.id
 
-                        cur_start_24 = convert_time_value_to_24_str(sel_row["StartTime"])
-                        cur_end_24   = convert_time_value_to_24_str(sel_row["EndTime"])
+                if sel is not None:
+                    cur_start_24 = convert_time_value_to_24_str(sel.start)
+                    cur_end_24   = convert_time_value_to_24_str(sel.end)
 
-                        start_time = datetime.strptime(cur_start_24, "%H:%M").time()
-                        end_time   = datetime.strptime(cur_end_24,   "%H:%M").time()
+                    start_time = datetime.strptime(cur_start_24, "%H:%M").time()
+                    end_time   = datetime.strptime(cur_end_24,   "%H:%M").time()
 
-                        meeting_start_dt = datetime.combine(sel_row["Day"], start_time)
-                        meeting_end_dt   = datetime.combine(sel_row["Day"], end_time)
-                        now = datetime.now()
+                    meeting_start_dt = datetime.combine(sel.day, start_time)
+                    meeting_end_dt   = datetime.combine(sel.day, end_time)
+                    now = datetime.now()
 
-                        if now >= meeting_end_dt:
-                            st.warning("This meeting has already ended — update/delete not allowed.")
-                        else:
-                            is_ongoing = meeting_start_dt <= now <= meeting_end_dt
-                            if is_ongoing:
-                                st.info("⚡ This meeting is currently ongoing.")
-
-                            action = st.radio("Action", ["None", "Update", "Delete"], key="admin_action")
-
-                            if action == "Update":
-                                with st.expander("Update Booking", expanded=True):
-                                    with st.form(f"update_form_{booking_id}"):
-
-                                        # Room selection - available for all meetings
-                                        all_rooms = ["Small Conference", "Big Conference", "7th Floor Conference"]
-                                        current_room_idx = all_rooms.index(room_choice)
-                                        u_room = st.selectbox(
-                                            "Room",
-                                            all_rooms,
-                                            index=current_room_idx,
-                                            key=f"u_room_{booking_id}"
+                    if now >= meeting_end_dt:
+                        st.warning("This meeting has already ended — update/delete not allowed.")
+                    else:
+                        is_ongoing = meeting_start_dt <= now <= meeting_end_dt
+                        if is_ongoing:
+                            st.info("⚡ This meeting is currently ongoing.")
+
+                        action = st.radio("Action", ["None", "Update", "Delete"], key="admin_action")
+
+                        if action == "Update":
+                            with st.expander("Update Booking", expanded=True):
+                                with st.form(f"update_form_{booking_id}"):
+
+                                    # Room selection - available for all meetings
+                                    all_rooms = ["Small Conference", "Big Conference", "7th Floor Conference"]
+                                    current_room_idx = all_rooms.index(room_choice)
+                                    u_room = st.selectbox(
+                                        "Room",
+                                        all_rooms,
+                                        index=current_room_idx,
+                                        key=f"u_room_{booking_id}"
+                                    )
+
+                                    # Show inputs in HH.MM (12-hour number only)
+                                    if is_ongoing:
+                                        st.text(f"Day (locked): {sel.day}")
+                                        u_day = sel.day
+                                        st.text(f"Start Time (locked): {format_24_to_12dot_no_ampm(cur_start_24)}")
+                                    else:
+                                        u_day = st.date_input("Day", value=sel.day, key=f"u_day_{booking_id}")
+                                        u_start = st.text_input(
+                                            "Start Time (HH.MM)",
+                                            value=format_24_to_12dot_no_ampm(cur_start_24),
+                                            key=f"u_start_{booking_id}"
                                         )
 
-                                        # Show inputs in HH.MM (12-hour number only)
-                                        if is_ongoing:
-                                            st.text(f"Day (locked): {sel_row['Day']}")
-                                            u_day = sel_row["Day"]
-                                            st.text(f"Start Time (locked): {format_24_to_12dot_no_ampm(cur_start_24)}")
-                                        else:
-                                            u_day = st.date_input("Day", value=sel_row["Day"], key=f"u_day_{booking_id}")
-                                            u_start = st.text_input(
-                                                "Start Time (HH.MM)",
-                                                value=format_24_to_12dot_no_ampm(cur_start_24),
-                                                key=f"u_start_{booking_id}"
-                                            )
-
-                                        u_end = st.text_input(
-                                            "End Time (HH.MM)",
-                                            value=format_24_to_12dot_no_ampm(cur_end_24),
-                                            key=f"u_end_{booking_id}"
-                                        )
+                                    u_end = st.text_input(
+                                        "End Time (HH.MM)",
+                                        value=format_24_to_12dot_no_ampm(cur_end_24),
+                                        key=f"u_end_{booking_id}"
+                                    )
 
-                                        u_agenda = st.text_input(
-                                            "Agenda",
-                                            value=sel_row["Agenda"],
-                                            key=f"u_agenda_{booking_id}"
-                                        )
+                                    u_agenda = st.text_input(
+                                        "Agenda",
+                                        value=sel.agenda,
+                                        key=f"u_agenda_{booking_id}"
+                                    )
 
-                                        submitted = st.form_submit_button("Apply Update")
-                                        if submitted:
-                                            if is_ongoing:
-                                                # Ongoing meetings: can update end time, agenda, and room
-                                                cur_start_24 = convert_time_value_to_24_str(sel_row["StartTime"])   # 'HH:MM'
-                                                u_day = sel_row["Day"]
-
-                                                try:
-                                                    new_start_24 = normalize_time_3part(cur_start_24)  # 'HH:MM:SS'
-                                                    new_end_24   = parse_12dot_window_to_24(u_end)     # 'HH:MM:SS'
-                                                except ValueError as e:
-                                                    st.error(str(e)); st.stop()
-
-                                                sh, sm, _ = normalize_time_3part(new_start_24).split(":")
-                                                eh, em, _ = normalize_time_3part(new_end_24).split(":")
-                                                if (int(eh), int(em)) <= (int(sh), int(sm)):
-                                                    st.error("End time must be after the start time."); st.stop()
-
-                                                # Check if room is being changed
-                                                if u_room != room_choice:
-                                                    # Room change requested for ongoing meeting
-                                                    success, error_msg = change_room(
-                                                        booking_id,
-                                                        room_choice,  # old room
-                                                        u_room,       # new room
-                                                        u_day,
-                                                        new_start_24,
-                                                        new_end_24,
-                                                        u_agenda,
-                                                        person_name,
-                                                        st.session_state.user['id'],
-                                                        st.session_state.user['username']
-                                                    )
-                                                    if success:
-                                                        st.success(f"Booking updated. Room changed from {room_choice} to {u_room}.")
-                                                        st.session_state.data_updated = True
-                                                        st.rerun()
-                                                    else:
-                                                        st.error(error_msg)
-                                                        st.stop()
-                                                else:
-                                                    # No room change, just update end time and agenda
-                                                    if check_overlap(df_sel, u_day, new_start_24, new_end_24, exclude_id=booking_id):
-                                                        st.error("This time slot is already booked. Choose another."); st.stop()
-
-                                                    update_booking(
-                                                        booking_id,
-                                                        u_day,
-                                                        new_start_24,
-                                                        new_end_24,
-                                                        u_agenda,
-                                                        person_name,
-                                                        room_choice,
-                                                        st.session_state.user['username'],
-                                                        st.session_state.user['id']
-                                                    )
+                                    submitted = st.form_submit_button("Apply Update")
+                                    if submitted:
+                                        if is_ongoing:
+                                            # Ongoing meetings: can update end time, agenda, and room
+                                            cur_start_24 = convert_time_value_to_24_str(sel.start)   # 'HH:MM'
+                                            u_day = sel.day
+
+                                            try:
+                                                new_start_24 = normalize_time_3part(cur_start_24)  # 'HH:MM:SS'
+                                                new_end_24   = parse_12dot_window_to_24(u_end)     # 'HH:MM:SS'
+                                            except ValueError as e:
+                                                st.error(str(e)); st.stop()
+
+                                            sh, sm, _ = normalize_time_3part(new_start_24).split(":")
+                                            eh, em, _ = normalize_time_3part(new_end_24).split(":")
+                                            if (int(eh), int(em)) <= (int(sh), int(sm)):
+                                                st.error("End time must be after the start time."); st.stop()
+
+                                            # Check if room is being changed
+                                            if u_room != room_choice:
+                                                # Room change requested for ongoing meeting
+                                                success, error_msg = change_room(
+                                                    booking_id,
+                                                    room_choice,  # old room
+                                                    u_room,       # new room
+                                                    u_day,
+                                                    new_start_24,
+                                                    new_end_24,
+                                                    u_agenda,
+                                                    person_name,
+                                                    st.session_state.user['id'],
+                                                    st.session_state.user['username']
+                                                )
+                                                if success:
+                                                    st.success(f"Booking updated. Room changed from {room_choice} to {u_room}.")
+                                                    st.session_state.data_updated = True
                                                     st.rerun()
-
-                                            else:
-                                                # Future meetings: can update everything including room
-                                                try:
-                                                    new_start_24 = parse_12dot_window_to_24(u_start)  # 'HH:MM:SS'
-                                                    new_end_24   = parse_12dot_window_to_24(u_end)    # 'HH:MM:SS'
-                                                except ValueError as e:
-                                                    st.error(str(e)); st.stop()
-
-                                                sh, sm, _ = normalize_time_3part(new_start_24).split(":")
-                                                eh, em, _ = normalize_time_3part(new_end_24).split(":")
-                                                if (int(eh), int(em)) <= (int(sh), int(sm)):
-                                                    st.error("End time must be after the start time."); st.stop()
-
-                                                # Check if room is being changed
-                                                if u_room != room_choice:
-                                                    # Room change requested
-                                                    success, error_msg = change_room(
-                                                        booking_id,
-                                                        room_choice,  # old room
-                                                        u_room,       # new room
-                                                        u_day,
-                                                        new_start_24,
-                                                        new_end_24,
-                                                        u_agenda,
-                                                        person_name,
-                                                        st.session_state.user['id'],
-                                                        st.session_state.user['username']
-                                                    )
-                                                    if success:
-                                                        st.success(f"Booking updated. Room changed from {room_choice} to {u_room}.")
-                                                        st.session_state.data_updated = True
-                                                        st.rerun()
-                                                    else:
-                                                        st.error(error_msg)
-                                                        st.stop()
                                                 else:
-                                                    # No room change, just regular update
-                                                    if check_overlap(df_sel, u_day, new_start_24, new_end_24, exclude_id=booking_id):
-                                                        st.error("This time slot is already booked. Choose another."); st.stop()
-
-                                                    update_booking(
-                                                        booking_id,
-                                                        u_day,
-                                                        new_start_24,
-                                                        new_end_24,
-                                                        u_agenda,
-                                                        person_name,
-                                                        room_choice,
-                                                        st.session_state.user['username'],
-                                                        st.session_state.user['id']
-                                                    )
-                                                    st.rerun()
+                                                    st.error(error_msg)
+                                                    st.stop()
+                                            else:
+                                                # No room change, just update end time and agenda
+                                                if check_overlap(room_bookings, u_day, new_start_24, new_end_24, exclude_id=booking_id):
+                                                    st.error("This time slot is already booked. Choose another."); st.stop()
 
-                            elif action == "Delete":
-                                with st.expander("Delete Booking", expanded=True):
-                                    st.error("⚠️ Deleting a booking is permanent!")
-                                    st.markdown(f"**Booking Info:**\n- {sel_row['PersonName']} | {sel_row['Agenda']}")
-                                    
-                                    reason = st.text_area("Reason for deletion (required)", key=f"del_reason_{booking_id}")
+                                                update_booking(
+                                                    booking_id,
+                                                    u_day,
+                                                    new_start_24,
+                                                    new_end_24,
+                                                    u_agenda,
+                                                    person_name,
+                                                    room_choice,
+                                                    st.session_state.user['username'],
+                                                    st.session_state.user['id']
+                                                )
+                                                st.rerun()
 
-                                    if st.button("Confirm Delete", key=f"del_btn_{booking_id}"):
-                                        if not reason.strip():
-                                            st.error("Please provide a reason for deletion.")
                                         else:
-                                            # Log old booking data
-                                            old_data = {
-                                                "Day": str(sel_row["Day"]),
-                                                "Start": str(sel_row["StartTime"]),
-                                                "End": str(sel_row["EndTime"]),
-                                                "Agenda": sel_row["Agenda"],
-                                                "Person": sel_row["PersonName"]
-                                            }
-
-                                            conn = get_connection()
-                                            cur = conn.cursor()
-
-                                            # Delete booking
-                                            #table = "meeting_room1_bookings" if room_name_to_number(room_choice) == 1 else "meeting_room2_bookings"
-                                            if room_name_to_number(room_choice) == 1:
-                                                table = "meeting_room1_bookings"
-                                            elif room_name_to_number(room_choice) == 2:
-                                                table = "meeting_room2_bookings"
-                                            elif room_name_to_number(room_choice) == 3:
-                                                table = "meeting_room3_bookings"
-                                            else:
-                                                raise ValueError("Invalid room")
-
-                                            # ✅ Insert into deleted_meetings BEFORE deleting
-                                            cur.execute(
-                                                """
-                                                INSERT INTO deleted_meetings 
-                                                (meeting_id, room, Day, StartTime, EndTime, Agenda, PersonName, deleted_by_user_id, reason)
-                                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                                """,
-                                                (
+                                            # Future meetings: can update everything including room
+                                            try:
+                                                new_start_24 = parse_12dot_window_to_24(u_start)  # 'HH:MM:SS'
+                                                new_end_24   = parse_12dot_window_to_24(u_end)    # 'HH:MM:SS'
+                                            except ValueError as e:
+                                                st.error(str(e)); st.stop()
+
+                                            sh, sm, _ = normalize_time_3part(new_start_24).split(":")
+                                            eh, em, _ = normalize_time_3part(new_end_24).split(":")
+                                            if (int(eh), int(em)) <= (int(sh), int(sm)):
+                                                st.error("End time must be after the start time."); st.stop()
+
+                                            # Check if room is being changed
+                                            if u_room != room_choice:
+                                                # Room change requested
+                                                success, error_msg = change_room(
                                                     booking_id,
-                                                    room_name_to_number(room_choice),
-                                                    sel_row["Day"],
-                                                    sel_row["StartTime"],
-                                                    sel_row["EndTime"],
-                                                    sel_row["Agenda"],
-                                                    sel_row["PersonName"],
+                                                    room_choice,  # old room
+                                                    u_room,       # new room
+                                                    u_day,
+                                                    new_start_24,
+                                                    new_end_24,
+                                                    u_agenda,
+                                                    person_name,
                                                     st.session_state.user['id'],
-                                                    reason.strip()
+                                                    st.session_state.user['username']
                                                 )
-                                            )
-                                            
-                                            cur.execute(f"DELETE FROM {table} WHERE Id=%s", (booking_id,))
-
-
-                                            # Insert log
-                                            cur.execute(
-                                                """
-                                                INSERT INTO meeting_logs (username, created_by_user_id, action_type, meeting_id, room, old_data, new_data, reason)
-                                                VALUES (%s, %s, 'DELETE', %s, %s, %s, NULL, %s)
-                                                """,
-                                                (
-                                                    st.session_state.user['username'],
-                                                    st.session_state.user['id'],
+                                                if success:
+                                                    st.success(f"Booking updated. Room changed from {room_choice} to {u_room}.")
+                                                    st.session_state.data_updated = True
+                                                    st.rerun()
+                                                else:
+                                                    st.error(error_msg)
+                                                    st.stop()
+                                            else:
+                                                # No room change, just regular update
+                                                if check_overlap(room_bookings, u_day, new_start_24, new_end_24, exclude_id=booking_id):
+                                                    st.error("This time slot is already booked. Choose another."); st.stop()
+
+                                                update_booking(
                                                     booking_id,
-                                                    room_name_to_number(room_choice),
-                                                    str(old_data),
-                                                    reason.strip()
+                                                    u_day,
+                                                    new_start_24,
+                                                    new_end_24,
+                                                    u_agenda,
+                                                    person_name,
+                                                    room_choice,
+                                                    st.session_state.user['username'],
+                                                    st.session_state.user['id']
                                                 )
-                                            )
-
-                                            conn.commit()
-                                            conn.close()
-
-                                            #st.success("Booking deleted and logged successfully.")
+                                                st.rerun()
+
+                        elif action == "Delete":
+                            with st.expander("Delete Booking", expanded=True):
+                                st.error("⚠️ Deleting a booking is permanent!")
+                                st.markdown(f"**Booking Info:**\n- {sel.person} | {sel.agenda}")
+                                
+                                reason = st.text_area("Reason for deletion (required)", key=f"del_reason_{booking_id}")
+
+                                if st.button("Confirm Delete", key=f"del_btn_{booking_id}"):
+                                    if not reason.strip():
+                                        st.error("Please provide a reason for deletion.")
+                                    else:
+                                        if delete_booking(
+                                            booking_id,
+                                            room_choice,
+                                            st.session_state.user['username'],
+                                            st.session_state.user['id'],
+                                            reason.strip(),
+                                            old_row=sel.as_row()
+                                        ):
                                             st.rerun()
 
 
@@ -1423,8 +1421,18 @@ else:
                 "Month", list(range(12)), index=now.month - 1, format_func=lambda x: month_names[x]
             )
 
+            # A month that has ended no longer changes: keep its frames in this session's cache
+            # (rebuilt on demand if evicted, see session_memory.py)
+            if (year, month_idx + 1) < (now.year, now.month):
+                df1, df2, df3, deleted_month_df = session_memory.cached(
+                    f"history/{year}-{month_idx + 1:02d}",
+                    lambda: (*load_history(year, month_idx + 1), load_deleted_meetings(year, month_idx + 1))
+                )
+            else:
+                df1, df2, df3 = load_history(year, month_idx + 1)
+                deleted_month_df = load_deleted_meetings(year, month_idx + 1)
+
             # ---------------- SMALL CONFERENCE ----------------
-            df1, df2, df3 = load_history(year, month_idx + 1)
 
             st.markdown(f"### Small Conference - {month_names[month_idx]} {year}")
             if df1.empty:
@@ -1461,19 +1469,7 @@ else:
             
             # ======================= DELETED MEETINGS =======================
             st.markdown(f"### Deleted Meetings - {month_names[month_idx]} {year}")
-            conn = get_connection()
-            deleted_df = pd.read_sql(
-                f"""
-                SELECT 
-                    meeting_id, room, Day, StartTime, EndTime, Agenda, PersonName, 
-                    deleted_by_user_id, username, reason, deleted_at
-                FROM deleted_meetings
-                WHERE YEAR(Day) = {year} AND MONTH(Day) = {month_idx + 1}
-                ORDER BY deleted_at DESC
-                """,
-                conn
-            )
-            conn.close()
+            deleted_df = deleted_month_df.copy()  # formatted in place below
 
             if deleted_df.empty:
                 st.info(f"No deleted meetings found for {month_names[month_idx]} {year}.")
@@ -1490,8 +1486,7 @@ else:
                 )
 
                 # Map room numbers to names
-                room_map = {1: "Small Conference", 2: "Big Conference", 3: "7th Floor Conference"}
-                deleted_df["room"] = deleted_df["room"].map(room_map)
+                deleted_df["room"] = deleted_df["room"].map(ROOM_NAMES)
 
                 # Reorder & rename columns
                 deleted_df = deleted_df[
@@ -1520,12 +1515,30 @@ else:
                 st.dataframe(deleted_df, use_container_width=True)
 
 
-        
+        # ======================= OCCUPANCY PAGE (Admin Only) =======================
+        elif st.session_state.page == "Occupancy" and st.session_state.is_admin:
+            st.subheader("Room Occupancy")
+            now = datetime.now()
+            occ_col1, occ_col2 = st.columns(2)
+            occ_year = occ_col1.selectbox("Year", list(range(now.year - 5, now.year + 2)), index=5, key="occ_year")
+            occ_month = occ_col2.selectbox(
+                "Month", list(range(1, 13)), index=now.month - 1,
+                format_func=lambda m: calendar.month_name[m], key="occ_month"
+            )
+
+            occ = occupancy.load_month(occ_year, occ_month, MIN_HOUR, MAX_HOUR)
+            st.caption(
+                f"Share of the {MIN_HOUR:02d}:00–{MAX_HOUR + 1:02d}:00 window booked, per room and day "
+                f"({calendar.month_name[occ_month]} {occ_year}). Hover a cell for the booked minutes."
+            )
+            st.altair_chart(occ.chart(), use_container_width=True)
+            st.dataframe(occ.summary(), use_container_width=True, hide_index=True)
+
         # ======================= USER MANAGEMENT PAGE (Admin Only) =======================
         elif st.session_state.page == "User Details" and st.session_state.is_admin:
             st.subheader("Manage Users")
 
-            conn = get_connection()
+            conn = get_read_connection()
             users_df = pd.read_sql("SELECT id, username, first_name, last_name, password FROM login ORDER BY id", conn)
             conn.close()
 
@@ -1672,7 +1685,7 @@ else:
             st.markdown("---")
             if st.checkbox("Delete a User"):
                 try:
-                    conn = get_connection()
+                    conn = get_read_connection()
                     users_no_admin_df = pd.read_sql(
                         "SELECT id, first_name, last_name FROM login WHERE role != 'admin' ORDER BY id",
                         conn
@@ -1686,10 +1699,15 @@ else:
                 if users_no_admin_df.empty:
                     st.info("No users available for deletion.")
                 else:
+                    # Labels built once: a .loc scan per option made every render quadratic in the users
+                    user_labels = {
+                        u.id: f"{u.id} - {u.first_name} {u.last_name}"
+                        for u in users_no_admin_df.itertuples(index=False)
+                    }
                     selected_id = st.selectbox(
                         "Select User to Delete",
-                        options=users_no_admin_df["id"].tolist(),
-                        format_func=lambda x: f"{x} - {users_no_admin_df.loc[users_no_admin_df['id'] == x, 'first_name'].values[0]} {users_no_admin_df.loc[users_no_admin_df['id'] == x, 'last_name'].values[0]}"
+                        options=list(user_labels),
+                        format_func=user_labels.__getitem__
                     )
 
                     if st.button("Confirm Delete", type="primary"):
@@ -1713,3 +1731,353 @@ else:
                             except Exception:
                                 pass
 
+
+        # ======================= ROOM CLOSURES PAGE (Admin Only) =======================
+        elif st.session_state.page == "Room Closures" and st.session_state.is_admin:
+            st.subheader("Room Closures")
+            st.caption("Close a room for renovation or maintenance. Bookings inside the closure are cancelled "
+                       "and audited in one transaction, and the room cannot be booked for that time.")
+
+            with st.form("closure_form"):
+                cl_room = st.selectbox("Room", list(ROOM_NAMES), format_func=ROOM_NAMES.get, key="cl_room")
+                d1, d2 = st.columns(2)
+                with d1:
+                    cl_from = st.date_input("From", date.today(), key="cl_from")
+                with d2:
+                    cl_to = st.date_input("To (inclusive)", date.today(), key="cl_to")
+                cl_whole_day = st.checkbox("Whole days", value=True, key="cl_whole_day")
+                t1, t2 = st.columns(2)
+                with t1:
+                    cl_start = st.text_input("Start Time (HH or HH.MM)", key="cl_start")
+                with t2:
+                    cl_end = st.text_input("End Time (HH or HH.MM)", key="cl_end")
+                cl_reason = st.text_input("Reason", key="cl_reason")
+                cl_move = st.checkbox("Move bookings to another free room where possible", value=True, key="cl_move")
+
+                if st.form_submit_button("Preview"):
+                    st.session_state.pop("closure_plan", None)
+                    st.session_state.pop("closure_result", None)
+                    window, err = (None, None), None
+                    if not cl_whole_day:
+                        if not (validate_time_input(cl_start) and validate_time_input(cl_end)):
+                            err = "Enter valid start and end times, or tick 'Whole days'."
+                        else:
+                            c_start, c_end, err = smart_24_hour(cl_start, cl_end)
+                            if not err:
+                                window = (c_start.strftime("%H:%M:%S"), c_end.strftime("%H:%M:%S"))
+                    if err:
+                        st.error(err)
+                    elif cl_from > cl_to:
+                        st.error("'From' must be on or before 'To'.")
+                    elif not cl_reason.strip():
+                        st.error("Please give a reason for the closure.")
+                    else:
+                        st.session_state.closure_plan = {
+                            "room": cl_room, "day_from": cl_from, "day_to": cl_to,
+                            "start_time": window[0], "end_time": window[1], "reason": cl_reason.strip(),
+                            "move": cl_move,
+                        }
+
+            plan = st.session_state.get("closure_plan")
+            if plan:
+                when = "whole days" if plan["start_time"] is None else f"{plan['start_time'][:5]}-{plan['end_time'][:5]}"
+                where = f"**{ROOM_NAMES[plan['room']]}**, {plan['day_from']:%d-%m-%Y} to {plan['day_to']:%d-%m-%Y} ({when})"
+                moves = None
+                if plan["move"]:
+                    # Same day and times in another room, planned for all meetings at once
+                    moves = reassign.plan_reassignment(
+                        plan["room"], plan["day_from"], plan["day_to"], plan["start_time"], plan["end_time"]
+                    )
+                    st.markdown(
+                        f"{where}: {len(moves.moves)} booking(s) will be moved, "
+                        f"{len(moves.unplaced)} cancelled (no free room)."
+                    )
+                    if moves.moves or moves.unplaced:
+                        st.dataframe(moves.rows(), use_container_width=True)
+                else:
+                    owners = closures.preview_closure(
+                        plan["room"], plan["day_from"], plan["day_to"], plan["start_time"], plan["end_time"]
+                    )
+                    st.markdown(
+                        f"{where}: {sum(o['meetings'] for o in owners)} booking(s) of {len(owners)} user(s) will be cancelled."
+                    )
+                    if owners:
+                        st.dataframe(owners, use_container_width=True)
+
+                if st.button("Confirm closure", key="confirm_closure"):
+                    username, user_id = st.session_state.user["username"], st.session_state.user["id"]
+                    if moves is not None:
+                        # Moves and closure in one transaction: either both happen or neither
+                        result, err = reassign.move_and_close(
+                            moves, plan["reason"], username, user_id, plan["start_time"], plan["end_time"]
+                        )
+                    else:
+                        try:
+                            result, err = closures.close_room(
+                                plan["room"], plan["day_from"], plan["day_to"], plan["reason"],
+                                username, user_id, plan["start_time"], plan["end_time"],
+                            ), None
+                            result["moved"] = 0
+                        except mysql.connector.Error as e:
+                            result, err = None, f"Failed to close the room (nothing was cancelled): {e.msg}"
+                    if err:
+                        st.error(err)
+                    else:
+                        st.session_state.closure_result = result
+                        st.session_state.pop("closure_plan", None)
+                        st.session_state.data_updated = True
+                        st.rerun()
+
+            result = st.session_state.get("closure_result")
+            if result:
+                st.success(
+                    f"Closure #{result['closure_id']} saved; {result['moved']} booking(s) moved, "
+                    f"{result['cancelled']} cancelled."
+                )
+                if result["owners"]:
+                    st.write("Let these users know:")
+                    st.dataframe(result["owners"], use_container_width=True)
+
+            st.markdown("### Upcoming closures")
+            upcoming = closures.upcoming_closures()
+            if not upcoming:
+                st.info("No upcoming closures.")
+            else:
+                for c in upcoming:
+                    c["room"] = ROOM_NAMES.get(c["room"], c["room"])
+                    c["start_time"] = str(c["start_time"] or "")
+                    c["end_time"] = str(c["end_time"] or "")
+                st.dataframe(upcoming, use_container_width=True)
+
+        # ======================= HISTORY SEARCH PAGE (Admin Only) =======================
+        elif st.session_state.page == "History Search" and st.session_state.is_admin:
+            st.subheader("History Search")
+            today = date.today()
+
+            with st.form("history_search_form"):
+                c1, c2 = st.columns(2)
+                with c1:
+                    hs_from = st.date_input("From", today - timedelta(days=548), key="hs_from")
+                    hs_room = st.selectbox("Room", [None] + list(ROOM_NAMES),
+                                           format_func=lambda n: "All rooms" if n is None else ROOM_NAMES[n],
+                                           key="hs_room")
+                    hs_person = st.text_input("Person (name starts with)", key="hs_person")
+                with c2:
+                    hs_to = st.date_input("To", today, key="hs_to")
+                    hs_status = st.selectbox("Status", list(history_search.STATUSES),
+                                             format_func=str.capitalize, key="hs_status")
+                    hs_agenda = st.text_input("Agenda words", key="hs_agenda")
+                if st.form_submit_button("Search"):
+                    if hs_from > hs_to:
+                        st.error("'From' must be on or before 'To'.")
+                    else:
+                        st.session_state.hs_query = {
+                            "day_from": hs_from, "day_to": hs_to, "room": hs_room,
+                            "person": hs_person, "agenda": hs_agenda, "status": hs_status,
+                        }
+                        # Cursor of each page shown so far; None is the first page
+                        st.session_state.hs_pages = [None]
+
+            query = st.session_state.get("hs_query")
+            if query:
+                hs_pages = st.session_state.hs_pages
+                rows, next_after = history_search.search_history(**query, after=hs_pages[-1])
+
+                if not rows:
+                    st.info("No meetings match this search.")
+                else:
+                    st.caption(f"Page {len(hs_pages)} · {len(rows)} meetings")
+                    st.dataframe(
+                        [
+                            {
+                                "Id": r["Id"],
+                                "Date": r["Day"].strftime("%d-%m-%Y"),
+                                "Room": ROOM_NAMES[r["room"]],
+                                "Start": time_to_display(time_to_str(r["StartTime"])),
+                                "End": time_to_display(time_to_str(r["EndTime"])),
+                                "Agenda": r["Agenda"],
+                                "Person": r["PersonName"],
+                                "Deleted At": r["deleted_at"],
+                                "Delete Reason": r["delete_reason"],
+                            }
+                            for r in rows
+                        ],
+                        use_container_width=True
+                    )
+
+                prev_col, next_col = st.columns([1, 1])
+                with prev_col:
+                    if len(hs_pages) > 1 and st.button("Previous page", key="hs_prev"):
+                        hs_pages.pop()
+                        st.rerun()
+                with next_col:
+                    if next_after is not None and st.button("Next page", key="hs_next"):
+                        hs_pages.append(next_after)
+                        st.rerun()
+
+            # ---------------- Audit trail of one meeting ----------------
+            st.markdown("---")
+            st.markdown("**Audit trail**")
+            with st.form("audit_trail_form"):
+                a1, a2 = st.columns(2)
+                with a1:
+                    at_room = st.selectbox("Room", list(ROOM_NAMES), format_func=ROOM_NAMES.get, key="at_room")
+                with a2:
+                    at_id = st.number_input("Meeting Id", min_value=1, step=1, key="at_id")
+                show_trail = st.form_submit_button("Show audit trail")
+
+            if show_trail:
+                trail = audit_log.meeting_history(at_room, int(at_id))
+
+                def describe(state):
+                    return " | ".join(f"{k}: {v}" for k, v in (state or {}).items())
+
+                if not trail:
+                    st.info("No audit records for this meeting.")
+                else:
+                    st.dataframe(
+                        [
+                            {
+                                "Log Id": row["id"],
+                                "Action": row["action_type"],
+                                "By": row["username"],
+                                "Reason": row["reason"],
+                                "Before": describe(before),
+                                "After": describe(after),
+                            }
+                            for row, before, after in trail
+                        ],
+                        use_container_width=True
+                    )
+
+        # ======================= SLOW QUERIES PAGE (Admin Only) =======================
+        elif st.session_state.page == "Slow Queries" and st.session_state.is_admin:
+            st.subheader("Slow Queries")
+            observer = slow_queries.install()
+            st.caption(
+                f"Statements slower than {observer.threshold_ms} ms, grouped by normalized statement. "
+                f"EXPLAIN is captured for about {observer.sample_rate:.0%} of slow SELECTs."
+            )
+            if "mysql_replica" in st.secrets:
+                # History, Deleted Meetings and the user lists read from the replica while it is healthy
+                replica = replica_status()
+                if replica["checked_ago"] is None:
+                    st.caption("Read replica: not checked yet by this app process.")
+                elif replica["healthy"]:
+                    st.caption(f"Read replica: in use, {replica['lag']} s behind the primary "
+                               f"(checked {replica['checked_ago']:.0f} s ago).")
+                else:
+                    behind = "unreachable or not replicating" if replica["lag"] is None else f"{replica['lag']} s behind"
+                    st.warning(f"Read replica: not in use, {behind}; reads go to the primary "
+                               f"(checked {replica['checked_ago']:.0f} s ago).")
+
+            offenders = slow_queries.top_offenders(slow_queries.read_entries(), limit=25)
+            if not offenders:
+                st.info("No slow queries recorded yet.")
+            else:
+                st.dataframe(
+                    [
+                        {
+                            "Statement": g["statement"],
+                            "Count": g["count"],
+                            "Total ms": round(g["total_ms"], 1),
+                            "Avg ms": round(g["avg_ms"], 1),
+                            "Max ms": round(g["max_ms"], 1),
+                            "Avg rows": round(g["avg_rows"], 1),
+                            "Last seen": g["last_seen"],
+                        }
+                        for g in offenders
+                    ],
+                    use_container_width=True
+                )
+
+                for g in offenders:
+                    with st.expander(f"{g['count']}× {g['statement'][:100]}"):
+                        st.code(g["example"], language="sql")
+                        if g["explain"]:
+                            st.markdown("**EXPLAIN (latest sample)**")
+                            if isinstance(g["explain"], str):
+                                st.text(g["explain"])
+                            else:
+                                st.dataframe(g["explain"], use_container_width=True)
+                        else:
+                            st.caption("No EXPLAIN sampled for this statement yet.")
+
+        # ======================= SESSIONS PAGE (Admin Only) =======================
+        elif st.session_state.page == "Sessions" and st.session_state.is_admin:
+            st.subheader("Sessions")
+            st.caption(
+                "Approximate memory held by each open session in this app process: its session state, "
+                "plus cached frames that are dropped once the session is idle and rebuilt when it comes back."
+            )
+
+            if st.button("Evict idle sessions' caches now"):
+                freed = session_memory.evict_idle()
+                st.success(f"Freed about {freed / 1024:,.0f} KB.")
+
+            rows, total_sessions = session_memory.report(limit=20)
+            mem = session_memory.stats
+            st.caption(
+                f"{total_sessions} sessions tracked. Since start: {mem['evictions']} caches evicted "
+                f"(about {mem['evicted_bytes'] / 1024:,.0f} KB), {mem['rebuilds']} cached frames built."
+            )
+            if not rows:
+                st.info("No sessions tracked yet.")
+            else:
+                st.dataframe(
+                    [
+                        {
+                            "Session": r["session"],
+                            "User": r["user"],
+                            "Idle (min)": round(r["idle_seconds"] / 60, 1),
+                            "Total KB": round(r["total_bytes"] / 1024, 1),
+                            "State KB": round(r["state_bytes"] / 1024, 1),
+                            "Cache KB": round(r["cache_bytes"] / 1024, 1),
+                            "Largest keys": ", ".join(f"{k} ({b / 1024:,.1f} KB)" for k, b in r["largest"]),
+                        }
+                        for r in rows
+                    ],
+                    use_container_width=True
+                )
+
+        # ======================= PROFILES PAGE (Admin Only) =======================
+        elif st.session_state.page == "Profiles" and st.session_state.is_admin:
+            st.subheader("Profiles")
+            st.caption(
+                "cProfile of this session's reruns, to see which functions a slow page spends its time in. "
+                "Ask for the next reruns here, or open the app with ?profile=1 to profile every rerun of that tab."
+            )
+
+            prof_col1, prof_col2 = st.columns([1, 3])
+            profile_next = prof_col1.number_input("Reruns", min_value=1, max_value=20, value=3, key="profile_next")
+            if prof_col2.button("Profile my next reruns"):
+                st.session_state.profile_runs = int(profile_next)
+            if st.session_state.get("profile_runs", 0) > 0:
+                st.info(f"The next {st.session_state.profile_runs} reruns of this session will be profiled. "
+                        "Go to the page you want to profile and use it as usual.")
+
+            stored = profiling.list_profiles()
+            if not stored:
+                st.info("No profiles stored yet.")
+            else:
+                picked = st.selectbox(
+                    "Profile", range(len(stored)), key="profile_pick",
+                    format_func=lambda i: (
+                        f"{stored[i]['at']}  {stored[i]['page']}  ({stored[i]['outcome']}, "
+                        f"{stored[i]['duration_ms'] or 0:,.0f} ms, {stored[i]['user'] or '-'})"
+                    )
+                )
+                chosen = stored[picked]
+                sort = st.radio("Sort by", list(profiling.SORTS), horizontal=True, key="profile_sort")
+                top, total = profiling.top_functions(chosen["path"], sort=sort, limit=50)
+                st.caption(f"{total * 1000:,.0f} ms profiled; top 50 functions. Click a column to re-sort.")
+                st.dataframe(top, use_container_width=True, hide_index=True)
+
+                with st.expander("Call tree (calls over 1% of the run)"):
+                    st.code("\n".join(profiling.call_tree(chosen["path"])) or "(empty)", language=None)
+
+                with open(chosen["path"], "rb") as f:
+                    st.download_button(
+                        "Download .prof", f.read(), file_name=os.path.basename(chosen["path"]),
+                        mime="application/octet-stream"
+                    )
@@ -0,0 +1,205 @@
+"""
+Move past bookings out of the live room tables into meeting_bookings_archive.
+
+Run once a month (e.g. from cron on the 1st):
+
+    python archive_bookings.py
+    python archive_bookings.py --cutoff 2025-06-01 --batch-size 1000
+
+Every booking with Day before the cutoff is copied into the month-partitioned
+archive and removed from its live table. The cutoff defaults to, and may not be
+later than, the first day of the current month. Each batch is one transaction
+(INSERT IGNORE + DELETE), so the job can be stopped at any point and re-run:
+rows already moved are gone from the live table and rows copied twice are
+ignored by the archive primary key.
+"""
+import argparse
+from datetime import date, datetime
+
+from db import get_connection, ROOM_TABLES, ARCHIVE_TABLE
+
+DEFAULT_BATCH_SIZE = 500
+
+
+# -------------------------
+# Month helpers
+# -------------------------
+def month_start(d):
+    return d.replace(day=1)
+
+
+def next_month(d):
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+# -------------------------
+# Partition management
+# -------------------------
+def existing_partition_bounds(cursor):
+    """Upper bounds (as dates) of the monthly partitions already on the archive table."""
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """,
+        (ARCHIVE_TABLE,)
+    )
+    bounds = []
+    for (name,) in cursor.fetchall():
+        if name and name != "pmax":
+            bounds.append(next_month(datetime.strptime(name[1:], "%Y%m").date()))
+    return bounds
+
+
+def ensure_partition(cursor, month):
+    """
+    Split pmax so `month` gets its own partition.
+    Months older than the newest existing partition already fall inside it,
+    so they are left alone (range partitions can only be appended in order).
+    """
+    upper = next_month(month)
+    bounds = existing_partition_bounds(cursor)
+    if bounds and upper <= max(bounds):
+        return False
+    cursor.execute(
+        f"""
+        ALTER TABLE {ARCHIVE_TABLE} REORGANIZE PARTITION pmax INTO (
+            PARTITION {partition_name(month)} VALUES LESS THAN ('{upper:%Y-%m-%d}'),
+            PARTITION pmax VALUES LESS THAN (MAXVALUE)
+        )
+        """
+    )
+    return True
+
+
+# -------------------------
+# Moving rows
+# -------------------------
+def oldest_live_day(cursor, cutoff):
+    oldest = None
+    for table in ROOM_TABLES.values():
+        cursor.execute(f"SELECT MIN(Day) FROM {table} WHERE Day < %s", (cutoff,))
+        (day,) = cursor.fetchone()
+        if day and (oldest is None or day < oldest):
+            oldest = day
+    return oldest
+
+
+def archive_batch(conn, room_number, day_from, day_to, batch_size):
+    """Move up to batch_size bookings of one room with day_from <= Day < day_to. Returns rows moved."""
+    table = ROOM_TABLES[room_number]
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(
+            f"SELECT Id FROM {table} WHERE Day >= %s AND Day < %s ORDER BY Id LIMIT %s FOR UPDATE",
+            (day_from, day_to, batch_size)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            conn.rollback()
+            return 0
+
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(
+            f"""
+            INSERT IGNORE INTO {ARCHIVE_TABLE}
+                (room, Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId,
+                 deleted_at, deleted_by, delete_reason)
+            SELECT %s, Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId,
+                   deleted_at, deleted_by, delete_reason
+            FROM {table} WHERE Id IN ({placeholders})
+            """,
+            (room_number, *ids)
+        )
+        cursor.execute(f"DELETE FROM {table} WHERE Id IN ({placeholders})", ids)
+        conn.commit()
+        return len(ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def archive_month(conn, month, cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """Archive every room's bookings for one month (bounded by cutoff). Returns {room: rows moved}."""
+    day_to = min(next_month(month), cutoff)
+    cursor = conn.cursor()
+    try:
+        ensure_partition(cursor, month)
+    finally:
+        cursor.close()
+
+    moved = {}
+    for room_number in ROOM_TABLES:
+        total = 0
+        while True:
+            n = archive_batch(conn, room_number, month, day_to, batch_size)
+            total += n
+            if n < batch_size:
+                break
+        moved[room_number] = total
+    return moved
+
+
+def run_archival(cutoff=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Archive all live bookings before cutoff, oldest month first. Returns {month: {room: rows}}."""
+    latest = month_start(date.today())
+    cutoff = cutoff or latest
+    if cutoff > latest:
+        # Home and Manage read only the live tables: this month's and upcoming bookings must stay there
+        raise ValueError(f"cutoff must be on or before {latest:%Y-%m-%d}")
+    conn = get_connection()
+    cursor = conn.cursor()
+    summary = {}
+    try:
+        oldest = oldest_live_day(cursor, cutoff)
+        if oldest is None:
+            return summary
+
+        month = month_start(oldest)
+        while month < cutoff:
+            if dry_run:
+                counts = {}
+                for room_number, table in ROOM_TABLES.items():
+                    cursor.execute(
+                        f"SELECT COUNT(*) FROM {table} WHERE Day >= %s AND Day < %s",
+                        (month, min(next_month(month), cutoff))
+                    )
+                    counts[room_number] = cursor.fetchone()[0]
+                summary[month] = counts
+            else:
+                summary[month] = archive_month(conn, month, cutoff, batch_size)
+            month = next_month(month)
+        return summary
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move past bookings into the monthly archive.")
+    parser.add_argument("--cutoff", type=date.fromisoformat, default=None,
+                        help="Archive bookings with Day before this date (default: first of current month).")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Only count rows that would be moved.")
+    args = parser.parse_args()
+    if args.cutoff and args.cutoff > month_start(date.today()):
+        parser.error(f"--cutoff must be on or before {month_start(date.today()):%Y-%m-%d}")
+
+    summary = run_archival(args.cutoff, args.batch_size, args.dry_run)
+    if not summary:
+        print("Nothing to archive.")
+    for month, counts in summary.items():
+        verb = "would move" if args.dry_run else "moved"
+        per_room = ", ".join(f"room {r}: {n}" for r, n in counts.items())
+        print(f"{month:%Y-%m} {verb} {sum(counts.values())} rows ({per_room})")
+
+
+if __name__ == "__main__":
+    main()
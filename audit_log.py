@@ -0,0 +1,272 @@
+"""
+Compact, delta-encoded audit records for meeting_logs.
+
+Rows used to carry the full old and new booking as JSON with every value
+stringified, so an UPDATE that only moved the end time stored the whole
+booking twice. Each row now has one `delta` column (migrations/009_audit_delta.sql)
+holding typed values under one-letter field codes:
+
+    CREATE   the new booking            {"d":20240,"s":36000,"e":39600,"a":"Sync","p":"A B","u":7}
+    DELETE   the deleted booking        (same shape)
+    UPDATE   only the changed fields    {"e":[39600,41400]}  as [old, new]
+             plus "b", the full before state, when the meeting's own log has
+             nothing to rebuild it from (a room change starts a new Id), and
+             "r": [old room, new room] for room changes
+
+Days are days since 1970-01-01 and times are seconds since midnight, so
+they compare as numbers and take a few digits instead of a quoted string.
+
+replay() rebuilds the full before/after state of every row of one
+meeting's log. It starts from a full state (CREATE, or an UPDATE that
+carries "b") and applies the changes in order. meeting_history() loads and
+replays one meeting for the audit trail view, archived months included
+(only those it can have rows in).
+Rows written before the migration (old_data/new_data, including the odd
+Python repr) are decoded too, so the view works before, during and after
+migrate_audit_log.py.
+"""
+import ast
+import json
+from datetime import date, datetime, timedelta
+
+import log_retention
+from db import get_read_connection, room_table, ROOM_NAMES, ARCHIVE_TABLE
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _day_in(v):
+    if isinstance(v, datetime):
+        v = v.date()
+    if not isinstance(v, date):
+        v = date.fromisoformat(str(v)[:10])
+    return (v - _EPOCH).days
+
+
+def _day_out(n):
+    return _EPOCH + timedelta(days=n)
+
+
+def _time_in(v):
+    if hasattr(v, "total_seconds"):  # MySQL TIME comes back as timedelta
+        return int(v.total_seconds())
+    t = str(v).strip().split()[-1]  # "0 days 09:30:00" -> "09:30:00"
+    parts = [int(float(p)) for p in t.split(":")] + [0, 0]
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def _time_out(n):
+    return f"{n // 3600:02d}:{n % 3600 // 60:02d}:{n % 60:02d}"
+
+
+def _int_in(v):
+    return int(v) if v not in (None, "", "None") else None
+
+
+def _str_in(v):
+    return None if v is None else str(v)
+
+
+def _same(v):
+    return v
+
+
+# (booking column, code, to stored value, from stored value)
+FIELDS = (
+    ("Day", "d", _day_in, _day_out),
+    ("StartTime", "s", _time_in, _time_out),
+    ("EndTime", "e", _time_in, _time_out),
+    ("Agenda", "a", _str_in, _same),
+    ("PersonName", "p", _str_in, _same),
+    ("CreatedByUserId", "u", _int_in, _same),
+)
+_BY_CODE = {code: (column, out) for column, code, _, out in FIELDS}
+
+
+# -------------------------
+# Encoding
+# -------------------------
+def _typed(row):
+    """{code: typed value} for the booking columns present in row."""
+    out = {}
+    for column, code, to_stored, _ in FIELDS:
+        if column in row:
+            v = row[column]
+            try:
+                out[code] = None if v in (None, "None") else to_stored(v)
+            except (TypeError, ValueError):  # a malformed legacy value is kept as it was
+                out[code] = str(v)
+    return out
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode(old=None, new=None, rooms=None, base=False):
+    """
+    The delta for one audit row. old/new are booking rows (dicts keyed by
+    column name, values as read from MySQL or as strings); pass only new
+    for a CREATE and only old for a DELETE. rooms=(old, new) marks a room
+    change. base=True stores the full before state with an UPDATE (implied
+    by a room change, since the moved booking starts a new log under its new Id).
+    Columns missing from new are unchanged.
+    """
+    if old is None and new is None:
+        return None
+    if old is None:
+        return _dumps(_typed(new))
+    if new is None:
+        return _dumps(_typed(old))
+
+    before, after = _typed(old), _typed(new)
+    delta = {code: [before.get(code), v] for code, v in after.items() if before.get(code) != v}
+    if rooms is not None and rooms[0] != rooms[1]:
+        delta["r"] = [rooms[0], rooms[1]]
+        base = True
+    if base:
+        delta["b"] = before
+    return _dumps(delta)
+
+
+def room_change(new_data, reason):
+    """(old, new) room numbers of a legacy room-change row, or None."""
+    text = (new_data or {}).get("RoomChanged") or ""
+    if " -> " not in text and reason and reason.startswith("Room changed from "):
+        text = reason[len("Room changed from "):].replace(" to ", " -> ", 1)
+    names = {name: n for n, name in ROOM_NAMES.items()}
+    old, _, new = text.partition(" -> ")
+    if old in names and new in names:
+        return names[old], names[new]
+    return None
+
+
+# -------------------------
+# Decoding
+# -------------------------
+def parse_legacy(text):
+    """A pre-delta old_data/new_data value: JSON, or the Python repr some rows hold."""
+    if text is None:
+        return None
+    if isinstance(text, (bytes, bytearray)):
+        text = text.decode("utf-8")
+    try:
+        value = json.loads(text)
+    except ValueError:
+        try:
+            value = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return {"raw": text}
+    if value is None:
+        return None
+    # A booking is always an object: anything else (a list, a bare string) is kept as it was
+    return value if isinstance(value, dict) else {"raw": text}
+
+
+def _columns(typed):
+    """{code: typed value} -> {column: display value}."""
+    out = {}
+    for code, v in typed.items():
+        if code in _BY_CODE:
+            column, from_stored = _BY_CODE[code]
+            out[column] = from_stored(v) if isinstance(v, int) else v
+    return out
+
+
+def decode(action_type, delta=None, old_data=None, new_data=None):
+    """
+    (before, after, full, rooms) for one row. before/after hold what the row
+    itself records, as {column: value}. full is True when they are complete
+    states; for an UPDATE without a base they hold only the changed fields.
+    rooms is (old, new) for a room change.
+    """
+    if delta is None:
+        # Written before migration 009: full rows with stringified values
+        old, new = parse_legacy(old_data), parse_legacy(new_data)
+        before = _columns(_typed(old)) if old else None
+        after = _columns(_typed(new)) if new else None
+        return before, after, True, None
+
+    d = json.loads(delta)
+    if action_type == "CREATE":
+        return None, _columns(d), True, None
+    if action_type == "DELETE":
+        return _columns(d), None, True, None
+
+    rooms = tuple(d["r"]) if "r" in d else None
+    base = d.get("b")
+    changes = {code: pair for code, pair in d.items() if code in _BY_CODE}
+    before = dict(base) if base is not None else {}
+    before.update({code: pair[0] for code, pair in changes.items()})
+    after = dict(before)
+    after.update({code: pair[1] for code, pair in changes.items()})
+    return _columns(before), _columns(after), base is not None, rooms
+
+
+def replay(rows):
+    """
+    Full before/after states for one meeting's log rows (oldest first).
+    rows need action_type and delta (or old_data/new_data). Returns a list
+    of (row, before, after); fields that no earlier row recorded are left out.
+    """
+    state = None
+    out = []
+    for row in rows:
+        before, after, full, _ = decode(row["action_type"], row.get("delta"),
+                                        row.get("old_data"), row.get("new_data"))
+        if not full and state is not None:
+            # Unchanged fields come from the state the previous row left
+            merged_before = dict(state)
+            merged_before.update(before)
+            merged_after = dict(state)
+            merged_after.update(after)
+            before, after = merged_before, merged_after
+        out.append((row, before, after))
+        state = after if after is not None else before
+    return out
+
+
+def _starts_history(row):
+    """True if the meeting has no log rows before `row`: its CREATE, or the room change that gave it its Id."""
+    if row["action_type"] == "CREATE":
+        return True
+    return row["action_type"] == "UPDATE" and decode("UPDATE", row.get("delta"))[3] is not None
+
+
+def _meeting_day(cursor, room, meeting_id):
+    """The meeting's day, live (soft-deleted too) or archived; None if it is gone."""
+    cursor.execute(f"SELECT Day FROM {room_table(room)} WHERE Id = %s", (meeting_id,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(f"SELECT Day FROM {ARCHIVE_TABLE} WHERE room = %s AND Id = %s", (room, meeting_id))
+        row = cursor.fetchone()
+    return row["Day"] if row else None
+
+
+def meeting_history(room, meeting_id):
+    """
+    The audit rows of one meeting (oldest first), replayed: a list of (row, before, after).
+    Rows older than the retention window come from the monthly archive (log_retention.py).
+    The archive is only opened when the meeting's first row isn't in meeting_logs any more,
+    and then only up to the month of its day: meetings are only booked, changed or
+    cancelled before they end, so no row of theirs is logged later.
+    """
+    room_table(room)  # validates the room number
+    conn = get_read_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT * FROM meeting_logs WHERE room = %s AND meeting_id = %s ORDER BY id",
+            (room, meeting_id)
+        )
+        rows = cursor.fetchall()
+        complete = bool(rows) and _starts_history(rows[0])
+        day = None if complete else _meeting_day(cursor, room, meeting_id)
+    finally:
+        cursor.close()
+        conn.close()
+    if complete:
+        return replay(rows)
+    archived = log_retention.read_archive(room=room, meeting_id=meeting_id, month_to=day)
+    archived_ids = {r["id"] for r in archived}
+    return replay(archived + [r for r in rows if r["id"] not in archived_ids])
@@ -0,0 +1,127 @@
+"""
+Audit record size and speed: full old/new JSON rows vs audit_log deltas.
+
+Builds a synthetic meeting_logs history (--meetings meetings, each created,
+updated 0-3 times and sometimes deleted) and writes it both ways: the old
+format (every value stringified, full old and new row) and the delta
+encoding. Prints the stored bytes, encode time, and two scans over all rows:
+"which updates moved the end time" and a full before/after replay. The
+replayed states are checked against the original rows. No database needed.
+
+    python benchmarks/bench_audit_encoding.py --meetings 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audit_log  # noqa: E402
+
+AGENDAS = ["Weekly sync", "Quarterly planning review", "Interview", "Vendor call", "Design review of the new line"]
+PEOPLE = ["Asha Rao", "Vikram Patil", "Meera Iyer", "John Dsouza", "Priya Nair"]
+
+
+def legacy_json(row):
+    """What log_action stored before: every value stringified."""
+    if row is None:
+        return None
+    return json.dumps({k: v.isoformat() if isinstance(v, (datetime, date)) else str(v) for k, v in row.items()})
+
+
+def synthetic(rng, meetings):
+    """[(action_type, old_row, new_row)] in log order, meetings interleaved."""
+    events = []
+    day0 = date.today()
+    for i in range(meetings):
+        start = rng.randrange(9, 19)
+        row = {
+            "Id": i + 1, "Day": day0 + timedelta(days=rng.randrange(60)),
+            "StartTime": timedelta(hours=start), "EndTime": timedelta(hours=start + 1),
+            "Agenda": rng.choice(AGENDAS), "PersonName": rng.choice(PEOPLE), "CreatedByUserId": rng.randrange(1, 200),
+        }
+        history = [("CREATE", None, dict(row))]
+        for _ in range(rng.randrange(4)):
+            old = dict(row)
+            field = rng.choice(["EndTime", "Agenda", "Day"])
+            if field == "EndTime":
+                row["EndTime"] = row["EndTime"] + timedelta(minutes=30)
+            elif field == "Agenda":
+                row["Agenda"] = rng.choice(AGENDAS)
+            else:
+                row["Day"] = row["Day"] + timedelta(days=1)
+            history.append(("UPDATE", old, dict(row)))
+        if rng.random() < 0.3:
+            history.append(("DELETE", dict(row), None))
+        events.append(history)
+    # Interleave meetings the way a real log does
+    log = []
+    while events:
+        h = events[rng.randrange(len(events))]
+        log.append(h.pop(0))
+        if not h:
+            events.remove(h)
+    return log
+
+
+def normalized(row):
+    return audit_log._columns(audit_log._typed(row)) if row is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit record size and speed, full rows vs deltas.")
+    parser.add_argument("--meetings", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    log = synthetic(random.Random(args.seed), args.meetings)
+    meeting_of = [(old or new)["Id"] for _, old, new in log]
+
+    t0 = time.perf_counter()
+    legacy = [(a, legacy_json(old), legacy_json(new)) for a, old, new in log]
+    t_legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    deltas = [(a, audit_log.encode(old, new)) for a, old, new in log]
+    t_delta = time.perf_counter() - t0
+
+    legacy_bytes = sum(len((o or "").encode()) + len((n or "").encode()) for _, o, n in legacy)
+    delta_bytes = sum(len(d.encode()) for _, d in deltas)
+
+    # Scan 1: updates that moved the end time
+    t0 = time.perf_counter()
+    hits_legacy = sum(1 for a, o, n in legacy
+                      if a == "UPDATE" and json.loads(o)["EndTime"] != json.loads(n)["EndTime"])
+    s_legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    hits_delta = sum(1 for a, d in deltas if a == "UPDATE" and "e" in json.loads(d))
+    s_delta = time.perf_counter() - t0
+    assert hits_legacy == hits_delta, (hits_legacy, hits_delta)
+
+    # Scan 2: full before/after replay per meeting, checked against the source rows
+    by_meeting = {}
+    for i, (a, d) in enumerate(deltas):
+        by_meeting.setdefault(meeting_of[i], []).append((i, {"action_type": a, "delta": d}))
+    t0 = time.perf_counter()
+    replayed = {}
+    for rows in by_meeting.values():
+        for (i, _), (_, before, after) in zip(rows, audit_log.replay([r for _, r in rows])):
+            replayed[i] = (before, after)
+    r_delta = time.perf_counter() - t0
+    for i, (_, old, new) in enumerate(log):
+        assert replayed[i] == (normalized(old), normalized(new)), i
+
+    n = len(log)
+    print(f"{n} audit rows for {args.meetings} meetings")
+    print(f"stored bytes   full rows {legacy_bytes / 1024:10,.0f} KB   delta {delta_bytes / 1024:10,.0f} KB   "
+          f"({delta_bytes / legacy_bytes:.0%})")
+    print(f"encode us/row  full rows {t_legacy / n * 1e6:10.2f}      delta {t_delta / n * 1e6:10.2f}")
+    print(f"scan ms        full rows {s_legacy * 1e3:10.1f}      delta {s_delta * 1e3:10.1f}   (updates that moved EndTime: {hits_delta})")
+    print(f"replay ms      delta {r_delta * 1e3:.1f} (full before/after of every row, checked)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Cold-start budget for the login page.
+
+Starts a fresh Python process per sample, the way a new container does,
+imports Streamlit and runs app.py once headless (AppTest), which renders the
+login page. Reports the time to import Streamlit, the time of that first run
+(importing the app's own modules included), and which heavy modules the
+login page pulled in. Exits with status 1 if the first run is over
+--budget-ms or any of the heavy modules was imported, so it can guard the
+budget in CI.
+
+    python benchmarks/bench_cold_start.py --samples 5 --budget-ms 700
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# Not needed to show the login form; each one costs tens to hundreds of ms to import
+HEAVY = ("pandas", "numpy", "pyarrow", "mysql.connector")
+
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=60)
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({{
+    "streamlit_ms": (t1 - t0) * 1000,
+    "first_run_ms": (t2 - t1) * 1000,
+    "exception": [e.message for e in at.exception],
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def sample():
+    code = CHILD.format(app=APP_PATH, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time and imports of the login page.")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=700, help="Budget for the first run of app.py.")
+    args = parser.parse_args()
+
+    samples = [sample() for _ in range(args.samples)]
+    if samples[0]["exception"]:
+        print(f"app.py raised: {samples[0]['exception']}")
+        sys.exit(1)
+
+    st_ms = statistics.median(s["streamlit_ms"] for s in samples)
+    run_ms = statistics.median(s["first_run_ms"] for s in samples)
+    heavy = sorted({m for s in samples for m in s["heavy"]})
+    print(f"{args.samples} cold starts (median)")
+    print(f"import streamlit          {st_ms:8.1f} ms")
+    print(f"first run (login page)    {run_ms:8.1f} ms   budget {args.budget_ms:.0f} ms")
+    print(f"heavy modules imported    {', '.join(heavy) or 'none'}")
+
+    failed = run_ms > args.budget_ms or heavy
+    print("FAIL" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Live-table query latency before and after archival.
+
+Runs the same three per-room queries the Home page issues through
+load_bookings() for today, reports row counts and latency, then (with
+--archive) runs archive_bookings.run_archival() and measures again.
+
+    python benchmarks/bench_live_tables.py --iterations 200
+    python benchmarks/bench_live_tables.py --archive --cutoff 2025-06-01
+
+Run from the repo root so .streamlit/secrets.toml is found.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import get_connection, ROOM_TABLES  # noqa: E402
+import archive_bookings  # noqa: E402
+
+
+def table_sizes(cursor):
+    sizes = {}
+    for table in ROOM_TABLES.values():
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        sizes[table] = cursor.fetchone()[0]
+    return sizes
+
+
+def measure(iterations):
+    """Latency (ms) of one load_bookings()-style round over all rooms, per iteration."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    now = datetime.now()
+    params = (now.strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d %H:%M:%S"))
+    samples = []
+    try:
+        sizes = table_sizes(cursor)
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            for table in ROOM_TABLES.values():
+                cursor.execute(
+                    f"""
+                    SELECT Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId
+                    FROM {table}
+                    WHERE Day = %s AND CONCAT(Day,' ',EndTime) >= %s
+                    ORDER BY StartTime
+                    """,
+                    params
+                )
+                cursor.fetchall()
+            samples.append((time.perf_counter() - t0) * 1000)
+    finally:
+        cursor.close()
+        conn.close()
+    return sizes, samples
+
+
+def report(label, sizes, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+    print(f"== {label} ==")
+    for table, n in sizes.items():
+        print(f"  {table:<26} {n:>10} rows")
+    print(f"  mean {statistics.mean(samples):8.3f} ms   p50 {statistics.median(samples):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--archive", action="store_true", help="Run the archival job and measure again.")
+    parser.add_argument("--cutoff", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    before = measure(args.iterations)
+    report("before", *before)
+
+    if args.archive:
+        t0 = time.perf_counter()
+        summary = archive_bookings.run_archival(args.cutoff)
+        moved = sum(sum(c.values()) for c in summary.values())
+        print(f"archived {moved} rows across {len(summary)} months in {time.perf_counter() - t0:.2f} s")
+
+        after = measure(args.iterations)
+        report("after", *after)
+        speedup = statistics.median(before[1]) / max(statistics.median(after[1]), 1e-9)
+        print(f"p50 speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
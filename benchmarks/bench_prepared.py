@@ -0,0 +1,96 @@
+"""
+Parse overhead saved by the prepared-statement registry.
+
+Executes the statements of one Home page rerun (load_bookings for a future
+day: one query per room) plus one has_clash check, first the old way (text
+protocol, SQL re-sent and re-parsed on every call) and then through
+db.run_statement (prepared once on the connection, executed with binary
+parameters). Prints the mean cost per statement and per rerun for both, and
+the server's prepare/execute counters for the prepared run.
+
+    python benchmarks/bench_prepared.py --reruns 500
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from db import get_connection, run_statement, STATEMENTS, ROOM_TABLES  # noqa: E402
+
+
+def rerun_statements(day):
+    """(name, params) executed by one Home page rerun plus a clash check."""
+    stmts = [(f"load_bookings_day/{n}", (day,)) for n in ROOM_TABLES]
+    stmts.append(("has_clash/1", (day, "10:00:00", "11:00:00", 0, day, day, "10:00:00", "11:00:00",
+                                  day, "10:00:00", "11:00:00", "")))
+    return stmts
+
+
+def run_text(conn, stmts, reruns):
+    cursor = conn.cursor()
+    t0 = time.perf_counter()
+    for _ in range(reruns):
+        for name, params in stmts:
+            cursor.execute(STATEMENTS[name], params)
+            cursor.fetchall()
+    elapsed = time.perf_counter() - t0
+    cursor.close()
+    return elapsed
+
+
+def run_prepared(conn, stmts, reruns):
+    t0 = time.perf_counter()
+    for _ in range(reruns):
+        for name, params in stmts:
+            run_statement(conn, name, params)
+    return time.perf_counter() - t0
+
+
+def server_counters(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        "SHOW SESSION STATUS WHERE Variable_name IN ('Com_stmt_prepare', 'Com_stmt_execute', 'Com_select')"
+    )
+    counters = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text protocol vs prepared statements for hot queries.")
+    parser.add_argument("--reruns", type=int, default=300)
+    args = parser.parse_args()
+
+    day = (date.today() + timedelta(days=1)).isoformat()
+    stmts = rerun_statements(day)
+    n_stmts = args.reruns * len(stmts)
+
+    conn = get_connection()
+    try:
+        # Warm up both paths (buffer pool, first prepare)
+        run_text(conn, stmts, 5)
+        run_prepared(conn, stmts, 5)
+
+        text = run_text(conn, stmts, args.reruns)
+        before = server_counters(conn)
+        prepared = run_prepared(conn, stmts, args.reruns)
+        after = server_counters(conn)
+    finally:
+        conn.close()
+
+    print(f"{args.reruns} reruns x {len(stmts)} statements")
+    print(f"{'':<10}{'per stmt us':>14}{'per rerun ms':>14}")
+    print(f"{'text':<10}{text / n_stmts * 1e6:>14.1f}{text / args.reruns * 1e3:>14.3f}")
+    print(f"{'prepared':<10}{prepared / n_stmts * 1e6:>14.1f}{prepared / args.reruns * 1e3:>14.3f}")
+    print(f"saved per rerun: {(text - prepared) / args.reruns * 1e3:.3f} ms")
+    print("server during prepared run: "
+          + ", ".join(f"{k} +{after[k] - before[k]}" for k in sorted(after)))
+    print(f"registry: {db.statement_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Speed of the reassignment solver (reassign.solve) on synthetic schedules.
+
+Builds --meetings displaced meetings of room 1 spread over --days days
+(non-overlapping, 09:00-21:00 on the half hour), gives each other room
+--busy-per-day existing bookings per day, and times planning all moves in
+one pass. Every plan is checked for double bookings. No database needed.
+
+    python benchmarks/bench_reassign.py --meetings 500 --days 60 --busy-per-day 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bookings import Booking  # noqa: E402
+from reassign import solve  # noqa: E402
+
+SLOTS = [f"{h:02d}:{m:02d}:00" for h in range(9, 21) for m in (0, 30)] + ["21:00:00"]
+
+
+def day_schedule(rng, k):
+    """k non-overlapping meetings on one day: 2k distinct, sorted slot boundaries taken in pairs."""
+    points = sorted(rng.sample(range(len(SLOTS)), 2 * k))
+    return [(SLOTS[points[i]], SLOTS[points[i + 1]]) for i in range(0, 2 * k, 2)]
+
+
+def synthetic(rng, meetings, days, busy_per_day, targets):
+    day0 = date.today() + timedelta(days=1)
+    displaced = []
+    for d in range(days):
+        day = day0 + timedelta(days=d)
+        k = meetings // days + (1 if d < meetings % days else 0)
+        for start, end in day_schedule(rng, k):
+            displaced.append(Booking(len(displaced) + 1, 1, day, start, end, "meeting", "Someone", 1))
+
+    busy = {
+        (room, day0 + timedelta(days=d)): day_schedule(rng, busy_per_day)
+        for room in targets for d in range(days)
+    }
+    return displaced, busy
+
+
+def check(moves, busy_before):
+    """No move overlaps an existing booking or another move in the same room."""
+    placed = {}
+    for b, room in moves:
+        placed.setdefault((room, b.day), []).append((b.start, b.end))
+    for key, intervals in placed.items():
+        allv = sorted(intervals + busy_before.get(key, []))
+        for (s1, e1), (s2, e2) in zip(allv, allv[1:]):
+            if s2 < e1:
+                raise AssertionError(f"overlap in {key}: {s1}-{e1} and {s2}-{e2}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reassignment solver speed on synthetic schedules.")
+    parser.add_argument("--meetings", type=int, default=500)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--busy-per-day", type=int, default=4, help="Existing bookings per other room and day.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if -(-args.meetings // args.days) > len(SLOTS) // 2 or args.busy_per_day > len(SLOTS) // 2:
+        parser.error(f"at most {len(SLOTS) // 2} meetings per room and day")
+
+    targets = [3, 2]
+    timings = []
+    for r in range(args.repeat):
+        rng = random.Random(args.seed + r)
+        displaced, busy = synthetic(rng, args.meetings, args.days, args.busy_per_day, targets)
+        busy_before = {k: list(v) for k, v in busy.items()}
+        t0 = time.perf_counter()
+        moves, unplaced = solve(displaced, busy, targets)
+        timings.append(time.perf_counter() - t0)
+        check(moves, busy_before)
+
+    print(f"{len(displaced)} meetings over {args.days} days, {args.busy_per_day} bookings/day in each other room")
+    print(f"last run: moved {len(moves)}, unplaced {len(unplaced)}")
+    print(f"solve ms: best {min(timings) * 1e3:.2f}   worst {max(timings) * 1e3:.2f}   ({args.repeat} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Cache coherence across replicas (schedule_cache.py), with real processes.
+
+Starts --replicas reader processes. Each has its own in-process schedule
+cache and keeps calling schedule_cache.load_bookings() for a test day, like a
+replica serving the Home page. This process then inserts, moves and deletes
+test bookings with plain SQL. It knows nothing about the cache: the triggers
+from migrations/011_booking_changes.sql append the change. For every write
+it measures how long each replica took to serve the new schedule, and fails
+if one is still stale after --max-staleness-ms. Test rows are deleted at the
+end.
+
+Use a test database: the test bookings are real rows for a few seconds.
+
+    python benchmarks/cache_coherence.py --replicas 4 --writes 30
+
+Run from the repo root so .streamlit/secrets.toml is found.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MARK = "cache-coherence-test"
+ROOM = 1
+
+
+def reader(replica, day, out, stop):
+    """One replica: report (replica, time, {id: start}) of the test bookings whenever what it serves changes."""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import schedule_cache
+
+    last = None
+    while not stop.is_set():
+        schedule = schedule_cache.load_bookings(day)
+        seen = {b.id: b.start for b in schedule.rooms[ROOM] if b.agenda == MARK}
+        if seen != last:
+            out.put((replica, time.time(), seen))
+            last = seen
+        time.sleep(0.02)
+    out.put((replica, None, dict(schedule_cache.stats)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-replica cache invalidation latency.")
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=30)
+    parser.add_argument("--max-staleness-ms", type=float, default=3000)
+    args = parser.parse_args()
+
+    from db import get_connection, room_table
+
+    day = date.today() + timedelta(days=30)
+    ctx = mp.get_context("spawn")
+    out, stop = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=reader, args=(r, day, out, stop), daemon=True) for r in range(args.replicas)]
+    for p in procs:
+        p.start()
+
+    latest = {}
+
+    def drain(timeout):
+        try:
+            replica, at, seen = out.get(timeout=timeout)
+        except queue.Empty:
+            return
+        if at is not None:
+            latest[replica] = (at, seen)
+
+    # Wait until every replica serves the (empty) starting state
+    deadline = time.time() + 30
+    while len(latest) < args.replicas and time.time() < deadline:
+        drain(0.5)
+    if len(latest) < args.replicas:
+        sys.exit("Replicas did not start (is the database reachable and migrated?)")
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    table = room_table(ROOM)
+    expected, created, staleness, failures = {}, [], [], 0
+    try:
+        for i in range(args.writes):
+            # Cycle: insert a booking, move it 30 minutes later, delete it
+            step = i % 3
+            if step == 0:
+                start = f"{9 + (i // 3) % 10:02d}:00:00"
+                cursor.execute(
+                    f"INSERT INTO {table} (Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId) "
+                    f"VALUES (%s, %s, ADDTIME(%s, '00:30:00'), %s, 'Coherence Test', 0)",
+                    (day, start, start, MARK)
+                )
+                booking_id = cursor.lastrowid
+                created.append(booking_id)
+                expected[booking_id] = start
+            elif step == 1:
+                start = f"{9 + (i // 3) % 10:02d}:30:00"
+                cursor.execute(
+                    f"UPDATE {table} SET StartTime = %s, EndTime = ADDTIME(%s, '00:30:00') WHERE Id = %s",
+                    (start, start, booking_id)
+                )
+                expected[booking_id] = start
+            else:
+                cursor.execute(f"DELETE FROM {table} WHERE Id = %s", (booking_id,))
+                del expected[booking_id]
+            conn.commit()
+            committed = time.time()
+
+            deadline = committed + args.max_staleness_ms / 1000
+            while time.time() < deadline and any(seen != expected for _, seen in latest.values()):
+                drain(0.05)
+            for replica, (at, seen) in sorted(latest.items()):
+                if seen != expected:
+                    failures += 1
+                    print(f"write {i}: replica {replica} still stale after {args.max_staleness_ms:.0f} ms")
+                else:
+                    staleness.append(max(0.0, at - committed) * 1000)
+    finally:
+        if created:
+            cursor.execute(f"DELETE FROM {table} WHERE Id IN ({', '.join(['%s'] * len(created))})", created)
+            conn.commit()
+        cursor.close()
+        conn.close()
+        stop.set()
+
+    replica_stats = []
+    deadline = time.time() + 10
+    while len(replica_stats) < args.replicas and time.time() < deadline:
+        try:
+            replica, at, payload = out.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if at is None:
+            replica_stats.append(payload)
+    for p in procs:
+        p.join(timeout=5)
+
+    print(f"{args.replicas} replicas, {args.writes} writes (insert / move / delete)")
+    if staleness:
+        staleness.sort()
+        print(f"time to fresh schedule ms: median {statistics.median(staleness):.0f}   "
+              f"p95 {staleness[int(len(staleness) * 0.95) - 1]:.0f}   max {staleness[-1]:.0f}")
+    if replica_stats:
+        hits = sum(s["hits"] for s in replica_stats)
+        misses = sum(s["misses"] for s in replica_stats)
+        print(f"replica cache: {hits} hits, {misses} misses, "
+              f"{sum(s['evictions'] for s in replica_stats)} evictions, {sum(s['polls'] for s in replica_stats)} polls")
+    if failures:
+        sys.exit(f"{failures} stale reads past the limit")
+
+
+if __name__ == "__main__":
+    main()
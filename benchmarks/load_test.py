@@ -0,0 +1,242 @@
+"""
+Concurrent-user load test for app.py.
+
+Drives the real script through Streamlit's headless AppTest API: every
+virtual user is its own AppTest session (like a browser tab), running on its
+own thread inside this one process, the way the Streamlit server runs
+sessions. Each user loops through:
+
+    login -> switch dates -> create a booking -> open it in Manage Bookings -> delete it
+
+and every script run ("rerun") is timed. At the end the tool prints
+throughput, p50/p99 rerun latency per step, DB connections and statements
+the server saw (from SHOW GLOBAL STATUS), and process RSS.
+
+Point .streamlit/secrets.toml at a local test database first; bookings are
+created on days far in the future and deleted again by each user.
+
+    python benchmarks/load_test.py --users 20 --iterations 5 --username loadtest --password secret
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import tomllib
+from collections import defaultdict
+from datetime import date, timedelta
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db import get_connection  # noqa: E402
+import idempotency  # noqa: E402  (same process as the AppTest sessions)
+
+APP_PATH = os.path.join(ROOT, "app.py")
+SECRETS_PATH = os.path.join(ROOT, ".streamlit", "secrets.toml")
+
+
+# -------------------------
+# Measurements
+# -------------------------
+def rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def server_counters():
+    """Connections opened and statements executed on the MySQL server so far."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN ('Connections', 'Questions')")
+        return {name: int(value) for name, value in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+# -------------------------
+# Virtual user
+# -------------------------
+class VirtualUser:
+    def __init__(self, index, args, secrets, timings, errors):
+        self.index = index
+        self.args = args
+        self.timings = timings
+        self.errors = errors
+        self.at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        self.at.secrets.update(secrets)
+
+    def step(self, name, action=None):
+        t0 = time.perf_counter()
+        if action is not None:
+            action()
+        self.at.run()
+        self.timings[name].append((time.perf_counter() - t0) * 1000)
+        if self.at.exception:
+            raise RuntimeError(f"{name}: {self.at.exception[0].message}")
+
+    def login(self):
+        self.step("open")
+        self.at.text_input[0].input(self.args.username)
+        self.at.text_input[1].input(self.args.password)
+        self.step("login", self.at.form_submit_button[0].click)
+        self.step("home")  # the rerun requested by the login handler
+        if not self.at.session_state["logged_in"]:
+            raise RuntimeError("login failed (check --username/--password)")
+
+    def booking_day(self, iteration):
+        # Spread users over distinct far-future days so they never clash with each other
+        return date.today() + timedelta(days=self.args.day_offset + self.index * self.args.iterations + iteration)
+
+    def iteration(self, i):
+        today = date.today()
+        for k in range(self.args.date_switches):
+            self.step("switch_date", lambda k=k: self.at.date_input(key="view_date").set_value(today + timedelta(days=k + 1)))
+
+        day = self.booking_day(i)
+        self.step("switch_date", lambda: self.at.date_input(key="view_date").set_value(day))
+
+        # Create
+        self.step("open_create", lambda: self.at.button(key="toggle_create").click())
+
+        def fill_create():
+            self.at.date_input(key="c_day").set_value(day)
+            self.at.text_input(key="c_start_input").input("10.00")
+            self.at.text_input(key="c_end_input").input("11.00")
+            self.at.text_input(key="c_agenda").input(f"load test u{self.index} i{i}")
+            self.at.button(key="save_create").click()
+        self.step("create", fill_create)
+
+        # Manage: pick the booking just created and delete it
+        if not self.at.session_state["show_manage"]:
+            self.step("open_manage", lambda: self.at.button(key="toggle_manage").click())
+        # Admins pick from the day's room schedule, other users from their own paged list
+        picker_key = "pick_booking" if self.at.session_state["is_admin"] else "pick_my_booking"
+        label = f"load test u{self.index} i{i}"
+        while True:
+            picker = self.at.selectbox(key=picker_key)
+            mine = [o for o in picker.options if label in o]
+            if mine or "my_bookings_next" not in [b.key for b in self.at.button]:
+                break
+            self.step("next_page", lambda: self.at.button(key="my_bookings_next").click())
+        if not mine:
+            raise RuntimeError("created booking not listed in Manage Bookings")
+        booking_id = int(mine[0].split("|")[0].strip())
+        index = picker.options.index(mine[0])
+        self.step("pick_booking", lambda: picker.select_index(index))
+        self.step("choose_delete", lambda: self.at.radio(key="admin_action").set_value("Delete"))
+
+        def confirm_delete():
+            self.at.text_area(key=f"del_reason_{booking_id}").input("load test cleanup")
+            self.at.button(key=f"del_btn_{booking_id}").click()
+        self.step("delete", confirm_delete)
+
+    def run(self):
+        try:
+            self.login()
+            for i in range(self.args.iterations):
+                self.iteration(i)
+        except Exception as e:
+            self.errors.append(f"user {self.index}: {e}")
+
+
+# -------------------------
+# Driver
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for app.py.")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent sessions.")
+    parser.add_argument("--iterations", type=int, default=3, help="Create/manage cycles per user.")
+    parser.add_argument("--date-switches", type=int, default=3, help="Date changes per cycle.")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--day-offset", type=int, default=400, help="First booking day, in days from today.")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-rerun timeout in seconds.")
+    args = parser.parse_args()
+
+    with open(SECRETS_PATH, "rb") as f:
+        secrets = tomllib.load(f)
+
+    timings = defaultdict(list)
+    errors = []
+    users = [VirtualUser(i, args, secrets, timings, errors) for i in range(args.users)]
+
+    counters_before = server_counters()
+    rss_before = rss_mb()
+    sampler = RssSampler()
+    sampler.start()
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=u.run) for u in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    sampler.stop()
+    counters_after = server_counters()
+
+    all_runs = [ms for samples in timings.values() for ms in samples]
+    print(f"users {args.users}   iterations {args.iterations}   wall {wall:.2f} s")
+    if all_runs:
+        print(f"reruns {len(all_runs)}   throughput {len(all_runs) / wall:.1f} reruns/s")
+        print(f"{'step':<14}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, samples in list(timings.items()) + [("ALL", all_runs)]:
+            print(f"{name:<14}{len(samples):>6}{statistics.median(samples):>10.1f}"
+                  f"{percentile(samples, 99):>10.1f}{max(samples):>10.1f}")
+
+    # The two counter queries themselves account for one connection and one statement each
+    connections = counters_after["Connections"] - counters_before["Connections"] - 1
+    questions = counters_after["Questions"] - counters_before["Questions"] - 1
+    print(f"DB connections opened {connections}   statements {questions}"
+          + (f"   per rerun {connections / len(all_runs):.2f} / {questions / len(all_runs):.2f}" if all_runs else ""))
+    print(f"RSS start {rss_before:.0f} MB   peak {sampler.peak:.0f} MB   end {rss_mb():.0f} MB")
+    dedup = idempotency.stats
+    print(f"bookings saved {dedup['saved']}   idempotency hits/lookups "
+          f"cache {dedup['cache_hits']}/{dedup['cache_lookups']}   db key {dedup['db_hits']}/{dedup['db_lookups']}")
+
+    if errors:
+        print(f"{len(errors)} user(s) failed:")
+        for e in errors:
+            print(f"  {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
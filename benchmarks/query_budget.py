@@ -0,0 +1,217 @@
+"""
+Query budgets per page: fail when a change makes a rerun talk to the database more.
+
+Drives app.py through Streamlit's headless AppTest API (like load_test.py):
+Login, Home, Create Booking, Manage Bookings, History and User Details, one
+rerun per step. Every statement and every connection checkout is counted
+through the DB layer's observer hook: db.add_query_observer wraps
+connections in the counting ObservedCursor, and on_connection() sees each
+checkout. Each step is checked against BUDGETS below: statements,
+connections, and rows fetched by SELECTs (None = not checked, for pages whose
+rows grow with the data).
+
+Each step runs with a cold schedule cache polled on every load, i.e. the
+worst case. Statements from the background snapshot refresher, and the
+periodic prune of booking_changes, are not counted.
+
+When a budget is exceeded, the run fails and prints the budget and actual
+values of the step, followed by its statements (normalized as on the Slow
+Queries page) with their counts. Statements run more than once in one rerun
+are marked as N+1 suspects. With --save FILE the statements of every step are
+written out. A later run with --compare FILE prints a unified diff against
+them for the steps over budget.
+
+Point .streamlit/secrets.toml at a local test database and use an admin
+account:
+
+    python benchmarks/query_budget.py --username admin --password secret
+    python benchmarks/query_budget.py --username admin --password secret --save budgets.json
+    python benchmarks/query_budget.py --username admin --password secret --compare budgets.json
+"""
+import argparse
+import difflib
+import json
+import os
+import sys
+import threading
+import time
+import tomllib
+from collections import Counter
+from datetime import date, timedelta
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import schedule_cache  # noqa: E402  (same process as the AppTest session)
+from slow_queries import normalize_sql  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+SECRETS_PATH = os.path.join(ROOT, ".streamlit", "secrets.toml")
+
+# Per rerun: (statements, connections, rows fetched). Raise a budget only with a reason.
+# A schedule is the change poll plus one load per room on one connection; rows are bounded
+# by one day's bookings. History and User Details grow with the data, so rows aren't checked.
+BUDGETS = {
+    "Login": (0, 0, 0),
+    "Login submit": (5, 2, 200),
+    "Home": (4, 1, 200),
+    "Home, other day": (4, 1, 200),
+    "Create Booking": (4, 1, 200),
+    "Create Booking, times": (9, 2, 220),
+    "Manage Bookings": (4, 1, 200),
+    "History": (4, 2, None),
+    "User Details": (1, 1, None),
+    "User Details, delete list": (2, 2, None),
+}
+
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class Counting:
+    """Query observer counting this process's statements, connections and rows (refresher thread excluded)."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.statements = []
+        self.connections = 0
+        self.rows = 0
+
+    @staticmethod
+    def _counted():
+        return threading.current_thread().name != "pfepl-snapshot"
+
+    def on_connection(self):
+        if self._counted():
+            self.connections += 1
+
+    def __call__(self, sql, params, duration_ms, rows):
+        if not self._counted():
+            return
+        normalized = normalize_sql(sql)
+        self.statements.append(normalized)
+        if not normalized.upper().startswith(_WRITES):
+            self.rows += rows
+
+
+def steps(at, username, password):
+    """(name, action) in the order a user would go; action=None just reruns."""
+    tomorrow = date.today() + timedelta(days=1)
+
+    def login():
+        at.text_input[0].input(username)
+        at.text_input[1].input(password)
+        at.form_submit_button[0].click()
+
+    def times():
+        at.date_input(key="c_day").set_value(tomorrow)
+        at.text_input(key="c_start_input").input("10.00")
+        at.text_input(key="c_end_input").input("11.00")
+
+    def nav(page):
+        # The sidebar radio has no key, so its identity changes with the page; go via its state
+        return lambda: at.session_state.__setitem__("nav_selection", page)
+
+    def delete_list():
+        box = next((c for c in at.checkbox if c.label == "Delete a User"), None)
+        if box is None:
+            sys.exit("User Details shows no users: the test database needs some")
+        box.check()
+
+    return [
+        ("Login", None),
+        ("Login submit", login),
+        ("Home", None),  # login submit already includes the first Home run (st.rerun)
+        ("Home, other day", lambda: at.date_input(key="view_date").set_value(tomorrow)),
+        ("Create Booking", lambda: at.button(key="toggle_create").click()),
+        ("Create Booking, times", times),
+        ("Manage Bookings", lambda: at.button(key="toggle_manage").click()),
+        ("History", nav("History")),
+        ("User Details", nav("User Details")),
+        ("User Details, delete list", delete_list),
+    ]
+
+
+def report(name, counter, budget):
+    """Lines describing an over-budget step: the numbers, then its statements."""
+    actual = (len(counter.statements), counter.connections, counter.rows)
+    lines = [f"{name}: over budget"]
+    for label, limit, value in zip(("statements", "connections", "rows fetched"), budget, actual):
+        if limit is not None:
+            mark = f"  +{value - limit}" if value > limit else ""
+            lines.append(f"    {label:<13} budget {limit:>5}   actual {value:>5}{mark}")
+    lines.append("    statements this rerun:")
+    for sql, n in Counter(counter.statements).most_common():
+        lines.append(f"    {n:>4} x  {sql[:150]}" + ("   <- repeated: N+1?" if n > 1 else ""))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page query budgets for app.py.")
+    parser.add_argument("--username", required=True, help="An admin account of the test database.")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--save", help="Write every step's statements to this JSON file.")
+    parser.add_argument("--compare", help="Diff over-budget steps against statements saved with --save.")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-rerun timeout in seconds.")
+    args = parser.parse_args()
+
+    with open(SECRETS_PATH, "rb") as f:
+        secrets = tomllib.load(f)
+    # Worst case every time: no cached schedules, and the change sequence read on every load
+    secrets["schedule_cache"] = dict(secrets.get("schedule_cache", {}), poll_seconds=0)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    counter = Counting()
+    db.add_query_observer(counter)
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    at.secrets.update(secrets)
+
+    seen, failures = {}, []
+    print(f"{'step':<28}{'statements':>11}{'connections':>12}{'rows':>8}{'ms':>8}")
+    for name, action in steps(at, args.username, args.password):
+        schedule_cache.flush()
+        # The change-log prune runs every PRUNE_EVERY_SECONDS from whichever poll comes first: not page work
+        schedule_cache._tail["pruned_at"] = time.monotonic()
+        if action is not None:
+            action()
+        counter.reset()
+        t0 = time.perf_counter()
+        at.run()
+        ms = (time.perf_counter() - t0) * 1000
+        if at.exception:
+            sys.exit(f"{name}: {at.exception[0].message}")
+
+        budget = BUDGETS[name]
+        actual = (len(counter.statements), counter.connections, counter.rows)
+        over = any(limit is not None and value > limit for limit, value in zip(budget, actual))
+        print(f"{name:<28}{actual[0]:>11}{actual[1]:>12}{actual[2]:>8}{ms:>8.0f}" + ("   OVER" if over else ""))
+        seen[name] = counter.statements
+        if over:
+            lines = report(name, counter, budget)
+            if name in baseline:
+                lines.append("    diff against --compare:")
+                lines += ["      " + line.rstrip("\n") for line in difflib.unified_diff(
+                    sorted(baseline[name]), sorted(counter.statements), "saved", "now", lineterm="", n=0)]
+            failures.append("\n".join(lines))
+
+    db.remove_query_observer(counter)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(seen, f, indent=1)
+    if failures:
+        print()
+        print("\n\n".join(failures))
+        sys.exit(f"{len(failures)} step(s) over their query budget")
+    print("All steps within budget.")
+
+
+if __name__ == "__main__":
+    main()
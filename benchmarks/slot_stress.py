@@ -0,0 +1,147 @@
+"""
+Concurrency stress test of database-enforced non-overlap (slots.py).
+
+--workers threads, each with its own connection, try to book random windows
+(--minutes long, on the 5-minute grid between 09:00 and 21:00) in one room on
+a test day, the way insert_booking does: one transaction with the INSERT and
+the closure/hold check, no clash query and no lock before it. Most attempts
+collide on purpose. Afterwards the test day is checked for overlapping
+bookings with a self-join, and for bookings that don't hold all their
+minutes. Either one fails the run. Test rows are deleted at the end.
+
+Use a test database with migrations/012_booking_slots.sql applied.
+
+    python benchmarks/slot_stress.py --workers 16 --attempts 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import get_connection, run_statement, room_table  # noqa: E402
+import slots  # noqa: E402
+
+MARK = "slot-stress-test"
+STARTS = [h * 60 + m for h in range(9, 21) for m in range(0, 60, 5)]
+
+
+def _hhmmss(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}:00"
+
+
+def worker(room, day, attempts, minutes, seed, results):
+    rng = random.Random(seed)
+    conn = get_connection()
+    try:
+        for _ in range(attempts):
+            start = rng.choice(STARTS)
+            end = min(start + minutes, 21 * 60)
+            t0 = time.perf_counter()
+            conn.start_transaction()
+            try:
+                _, _, new_id = run_statement(
+                    conn, f"insert_booking/{room}",
+                    (str(day), _hhmmss(start), _hhmmss(end), MARK, "Stress Test", 0)
+                )
+                if slots.blocked(conn, room, day, _hhmmss(start), _hhmmss(end)):
+                    conn.rollback()
+                    outcome = "blocked"
+                else:
+                    conn.commit()
+                    outcome = "saved"
+            except Exception as e:
+                conn.rollback()
+                if not slots.is_clash(e):
+                    raise
+                outcome = "clash"
+            results.append((outcome, (time.perf_counter() - t0) * 1000))
+    finally:
+        conn.close()
+
+
+def check(room, day):
+    """(overlapping pairs, bookings missing minutes) among the test bookings."""
+    table = room_table(room)
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"""
+            SELECT COUNT(*) FROM {table} a JOIN {table} b
+              ON a.Day = b.Day AND a.Id < b.Id AND a.StartTime < b.EndTime AND b.StartTime < a.EndTime
+            WHERE a.Day = %s AND a.deleted_at IS NULL AND b.deleted_at IS NULL
+            """,
+            (day,)
+        )
+        (overlaps,) = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    missing = [c for c in slots.conflicts(day) if c["room"] == room and c["Day"] == day]
+    return overlaps, missing
+
+
+def cleanup(room, day):
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DELETE FROM {room_table(room)} WHERE Day = %s AND Agenda = %s", (day, MARK))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent overlapping bookings against booking_slots.")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=200, help="Attempts per worker.")
+    parser.add_argument("--minutes", type=int, default=45, help="Length of each booking.")
+    parser.add_argument("--room", type=int, default=1)
+    parser.add_argument("--days-ahead", type=int, default=60, help="Test day, counted from today.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    day = date.today() + timedelta(days=args.days_ahead)
+    cleanup(args.room, day)
+
+    results = []
+    threads = [
+        threading.Thread(target=worker, args=(args.room, day, args.attempts, args.minutes, args.seed + i, results))
+        for i in range(args.workers)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    try:
+        overlaps, missing = check(args.room, day)
+    finally:
+        removed = cleanup(args.room, day)
+
+    counts = {o: sum(1 for r, _ in results if r == o) for o in ("saved", "clash", "blocked")}
+    latencies = sorted(ms for _, ms in results)
+    print(f"{args.workers} workers x {args.attempts} attempts on {day} room {args.room}: "
+          f"{len(results) / elapsed:,.0f} writes/s")
+    print(f"saved {counts['saved']}   rejected by booking_slots {counts['clash']}   "
+          f"closed/held {counts['blocked']}   (removed {removed} test rows)")
+    if latencies:
+        print(f"write ms: median {statistics.median(latencies):.1f}   "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f}   max {latencies[-1]:.1f}")
+    print(f"overlapping pairs: {overlaps}   bookings missing minutes: {len(missing)}")
+    if overlaps or missing or len(results) != args.workers * args.attempts:
+        sys.exit("FAILED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+
+from db import get_connection, run_statement, ROOM_TABLES, ROOM_NAMES, MY_BOOKINGS
+
+
+# -------------------------
+# Booking records
+# -------------------------
+def time_to_str(val):
+    """MySQL TIME (timedelta), time or string -> 'HH:MM:SS'."""
+    if val is None:
+        return "00:00:00"
+    if hasattr(val, "total_seconds"):
+        total = int(val.total_seconds())
+        return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+    if hasattr(val, "strftime"):
+        return val.strftime("%H:%M:%S")
+    return str(val)[-8:]
+
+
+def time_to_display(hhmmss):
+    """'14:30:00' -> '02:30 PM'."""
+    h, m = int(hhmmss[:2]), int(hhmmss[3:5])
+    return f"{(h - 1) % 12 + 1:02d}:{m:02d} {'AM' if h < 12 else 'PM'}"
+
+
+class Booking:
+    """One booking row. Times are kept as 'HH:MM:SS' strings, which sort and compare correctly."""
+
+    __slots__ = ("id", "room", "day", "start", "end", "agenda", "person", "created_by")
+
+    def __init__(self, id, room, day, start, end, agenda, person, created_by):
+        self.id = id
+        self.room = room
+        self.day = day
+        self.start = start
+        self.end = end
+        self.agenda = agenda
+        self.person = person
+        self.created_by = created_by
+
+    @classmethod
+    def from_row(cls, room, row):
+        return cls(row["Id"], room, row["Day"], time_to_str(row["StartTime"]), time_to_str(row["EndTime"]),
+                   row["Agenda"], row["PersonName"], row["CreatedByUserId"])
+
+    @property
+    def start_display(self):
+        return time_to_display(self.start)
+
+    @property
+    def end_display(self):
+        return time_to_display(self.end)
+
+    @property
+    def label(self):
+        return f"{self.id} | {self.start_display} - {self.end_display} | {self.person} | {self.agenda}"
+
+    @property
+    def dated_label(self):
+        """Label for lists that span rooms and dates."""
+        return f"{self.id} | {self.day:%d-%m-%Y} | {ROOM_NAMES[self.room]} | {self.start_display} - {self.end_display} | {self.agenda}"
+
+    @property
+    def page_key(self):
+        """Position in "my bookings" order, used as the keyset cursor for the next page."""
+        return (self.day, self.start, self.room, self.id)
+
+    def as_row(self):
+        """Same keys as the booking table, e.g. for log_action."""
+        return {
+            "Id": self.id, "Day": self.day, "StartTime": self.start, "EndTime": self.end,
+            "Agenda": self.agenda, "PersonName": self.person, "CreatedByUserId": self.created_by,
+        }
+
+
+class DaySchedule:
+    """Bookings of one day: a list per room (ordered by start) and an id -> Booking index per room."""
+
+    __slots__ = ("day", "rooms", "by_id")
+
+    def __init__(self, day, rooms):
+        self.day = day
+        self.rooms = rooms
+        self.by_id = {n: {b.id: b for b in bookings} for n, bookings in rooms.items()}
+
+    def get(self, room_number, booking_id):
+        return self.by_id[room_number].get(booking_id)
+
+
+def display_rows(bookings):
+    """Rows for st.dataframe; the frame is only built by Streamlit when it renders."""
+    return [
+        {"Start": b.start_display, "End": b.end_display, "Agenda": b.agenda, "Person": b.person}
+        for b in bookings
+    ]
+
+
+# -------------------------
+# Load bookings
+# -------------------------
+def load_bookings(selected_day=None):
+    """
+    Load future/ongoing bookings only, as a DaySchedule:
+    - Past dates return no bookings.
+    - Today's date returns only meetings whose combined Day+EndTime >= NOW().
+    - Future dates return all meetings.
+    """
+    now = datetime.now()
+    now_dt_str = now.strftime("%Y-%m-%d %H:%M:%S")
+    day = selected_day or now.date()
+
+    # --- Decide statement and params ---
+    if day < now.date():
+        # Past date → no data
+        return DaySchedule(day, {n: [] for n in ROOM_TABLES})
+    elif day == now.date():
+        # Today → restrict to Day = today AND EndTime >= now
+        statement = "load_bookings_today"
+        params = (day.strftime("%Y-%m-%d"), now_dt_str)
+    else:  # Future date → restrict to Day exactly
+        statement = "load_bookings_day"
+        params = (day.strftime("%Y-%m-%d"),)
+
+    # --- Queries (prepared once per pooled connection, see db.py) ---
+    conn = get_connection()
+    try:
+        rooms = {
+            n: [Booking.from_row(n, row) for row in run_statement(conn, f"{statement}/{n}", params)[0]]
+            for n in ROOM_TABLES
+        }
+    finally:
+        conn.close()
+
+    return DaySchedule(day, rooms)
+
+
+# -------------------------
+# Load one user's bookings (all dates)
+# -------------------------
+MY_BOOKINGS_PAGE_SIZE = 20
+_MAX_ID = 2**31 - 1
+
+
+def load_my_bookings(user_id, after=None, limit=MY_BOOKINGS_PAGE_SIZE):
+    """
+    One page of a user's upcoming bookings across all rooms and dates, ordered
+    by day, start, room. `after` is the page_key of the last booking on the
+    previous page (None for the first page). Returns (bookings, has_more).
+
+    Keyset pagination: each page is an index range scan on
+    (CreatedByUserId, Day, StartTime), however far into the future it is.
+    """
+    now = datetime.now()
+    today = now.date()
+    if after is None:
+        after = (today - timedelta(days=1), "23:59:59", 0, 0)
+    after_day, after_start, after_room, after_id = after
+
+    params = []
+    for room_number in ROOM_TABLES:
+        # Rows at exactly (after_day, after_start) continue by room, then Id
+        if room_number < after_room:
+            id_floor = _MAX_ID
+        elif room_number == after_room:
+            id_floor = after_id
+        else:
+            id_floor = 0
+        params += [user_id, today, today, now.strftime("%H:%M:%S"),
+                   after_day, after_day, after_start, after_start, id_floor, limit + 1]
+    params.append(limit + 1)
+
+    conn = get_connection()
+    try:
+        rows, _, _ = run_statement(conn, MY_BOOKINGS, tuple(params))
+    finally:
+        conn.close()
+
+    bookings = [Booking.from_row(row["room"], row) for row in rows]
+    return bookings[:limit], len(bookings) > limit
@@ -0,0 +1,169 @@
+"""
+Room closures: close a room for a date range (renovation, maintenance).
+
+close_room() does the whole job in one transaction with a few set-based
+statements, however many bookings are affected:
+
+    1. record the closure in room_closures (this also blocks new bookings,
+       see slots.blocked)
+    2. soft-delete every booking in the closure that hasn't ended (one UPDATE;
+       the row keeps its data with deleted_at/deleted_by/delete_reason set)
+    3. write one DELETE audit row per booking (one INSERT ... SELECT into meeting_logs)
+    4. read back the owners of the cancelled bookings so they can be told
+
+preview_closure() runs the same selection without changing anything.
+"""
+from datetime import datetime
+
+from db import get_connection, room_table
+
+# Audit delta of a DELETE, in the same shape as audit_log.encode(old_row) writes
+_DELETE_DELTA = """JSON_OBJECT(
+    'd', DATEDIFF(Day, '1970-01-01'), 's', TIME_TO_SEC(StartTime), 'e', TIME_TO_SEC(EndTime),
+    'a', Agenda, 'p', PersonName, 'u', CreatedByUserId
+)"""
+
+
+def _affected(start_time, end_time, alias=""):
+    """WHERE clause and params (after day_from, day_to, now) for bookings hit by a closure."""
+    a = alias
+    where = f"{a}Day >= %s AND {a}Day <= %s AND {a}deleted_at IS NULL AND TIMESTAMP({a}Day, {a}EndTime) > %s"
+    if start_time is None:
+        return where, ()
+    return where + f" AND NOT ({a}EndTime <= %s OR {a}StartTime >= %s)", (start_time, end_time)
+
+
+def _tagged(alias=""):
+    """WHERE clause for the rows one close_room() call cancelled."""
+    a = alias
+    return (f"{a}deleted_at = %s AND {a}deleted_by = %s AND {a}delete_reason = %s "
+            f"AND {a}Day >= %s AND {a}Day <= %s")
+
+
+def _owners(cursor, table, where, params):
+    """Owners of the bookings matching `where` (columns prefixed with b.)."""
+    cursor.execute(
+        f"""
+        SELECT b.CreatedByUserId AS user_id, l.username, l.first_name, l.last_name,
+               COUNT(*) AS meetings, MIN(b.Day) AS first_day
+        FROM {table} b
+        LEFT JOIN login l ON l.id = b.CreatedByUserId
+        WHERE {where}
+        GROUP BY b.CreatedByUserId, l.username, l.first_name, l.last_name
+        ORDER BY meetings DESC, l.username
+        """,
+        params
+    )
+    return cursor.fetchall()
+
+
+def preview_closure(room, day_from, day_to, start_time=None, end_time=None):
+    """Owners (with meeting counts) of the bookings a closure would cancel. Changes nothing."""
+    table = room_table(room)
+    where, extra = _affected(start_time, end_time, alias="b.")
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return _owners(cursor, table, where, (day_from, day_to, datetime.now(), *extra))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def close_room(room, day_from, day_to, reason, username, user_id, start_time=None, end_time=None):
+    """
+    Close `room` from day_from to day_to (inclusive), for the whole day or
+    only start_time-end_time ('HH:MM:SS'), cancelling the bookings inside.
+
+    Returns {"closure_id", "cancelled", "owners"}; owners are dicts with
+    user_id, username, first_name, last_name, meetings, first_day.
+    Everything is rolled back if any step fails.
+    """
+    check_window(room, day_from, day_to, start_time, end_time)
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        result = apply_closure(cursor, room, day_from, day_to, reason, username, user_id, start_time, end_time)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def check_window(room, day_from, day_to, start_time=None, end_time=None):
+    """Raise ValueError for an unknown room or an empty date range / time window."""
+    room_table(room)
+    if day_to < day_from:
+        raise ValueError("day_to must be on or after day_from")
+    if (start_time is None) != (end_time is None) or (start_time is not None and end_time <= start_time):
+        raise ValueError("Give both start and end time (start before end), or neither for whole days")
+
+
+def apply_closure(cursor, room, day_from, day_to, reason, username, user_id, start_time=None, end_time=None):
+    """
+    The statements of close_room() on a dictionary cursor, inside the caller's
+    transaction (reassign.move_and_close() runs them after its moves).
+    """
+    table = room_table(room)
+    now = datetime.now().replace(microsecond=0)
+    where, extra = _affected(start_time, end_time)
+
+    cursor.execute(
+        """
+        INSERT INTO room_closures (room, day_from, day_to, start_time, end_time, reason, created_by)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """,
+        (room, day_from, day_to, start_time, end_time, reason, user_id)
+    )
+    closure_id = cursor.lastrowid
+    # The closure id in the reason tags exactly the rows this closure cancelled
+    delete_reason = f"{reason} (room closure #{closure_id})"
+
+    cursor.execute(
+        f"UPDATE {table} SET deleted_at = %s, deleted_by = %s, delete_reason = %s WHERE {where}",
+        (now, user_id, delete_reason, day_from, day_to, now, *extra)
+    )
+    cancelled = cursor.rowcount
+
+    owners = []
+    if cancelled:
+        tagged_params = (now, user_id, delete_reason, day_from, day_to)
+        cursor.execute(
+            f"""
+            INSERT INTO meeting_logs
+                (username, created_by_user_id, action_type, meeting_id, room, delta, reason)
+            SELECT %s, %s, 'DELETE', Id, %s, {_DELETE_DELTA}, %s
+            FROM {table} WHERE {_tagged()}
+            """,
+            (username, user_id, room, delete_reason, *tagged_params)
+        )
+        owners = _owners(cursor, table, _tagged(alias="b."), tagged_params)
+    return {"closure_id": closure_id, "cancelled": cancelled, "owners": owners}
+
+
+def upcoming_closures(limit=50):
+    """Closures that haven't ended yet, soonest first."""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT c.id, c.room, c.day_from, c.day_to, c.start_time, c.end_time, c.reason,
+                   l.username AS created_by, c.created_at
+            FROM room_closures c
+            LEFT JOIN login l ON l.id = c.created_by
+            WHERE c.day_to >= CURDATE()
+            ORDER BY c.day_from, c.room
+            LIMIT %s
+            """,
+            (limit,)
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,530 @@
+import threading
+import time
+import weakref
+
+import streamlit as st
+
+from lazy_imports import LazyModule
+
+# The driver is imported when the first connection is made (see lazy_imports.py)
+mysql = LazyModule("mysql")
+
+# -------------------------
+# Room tables
+# -------------------------
+ROOM_TABLES = {
+    1: "meeting_room1_bookings",
+    2: "meeting_room2_bookings",
+    3: "meeting_room3_bookings",
+}
+
+ROOM_NAMES = {
+    1: "Small Conference",
+    2: "Big Conference",
+    3: "7th Floor Conference",
+}
+
+ARCHIVE_TABLE = "meeting_bookings_archive"
+
+
+def room_table(room_number):
+    """Live booking table for a room number (1, 2 or 3)."""
+    try:
+        return ROOM_TABLES[room_number]
+    except KeyError:
+        raise ValueError("Invalid room number")
+
+
+# -------------------------
+# Query observers
+# -------------------------
+# Callbacks registered with add_query_observer() are called after every statement
+# as callback(sql, params, duration_ms, rows). A callback with an on_connection()
+# method is also told about every connection handed out. Connections are only
+# wrapped while at least one observer is registered, so there is no overhead otherwise.
+_query_observers = []
+_observer_state = threading.local()
+
+
+def add_query_observer(callback):
+    if callback not in _query_observers:
+        _query_observers.append(callback)
+
+
+def remove_query_observer(callback):
+    if callback in _query_observers:
+        _query_observers.remove(callback)
+
+
+def _notify(sql, params, duration_ms, rows):
+    # Queries issued by an observer itself (e.g. EXPLAIN) are not observed again
+    if getattr(_observer_state, "active", False):
+        return
+    _observer_state.active = True
+    try:
+        for callback in list(_query_observers):
+            try:
+                callback(sql, params, duration_ms, rows)
+            except Exception as e:
+                print(f"Query observer error: {e}")
+    finally:
+        _observer_state.active = False
+
+
+class ObservedCursor:
+    """Cursor proxy that times execute + fetch and reports each statement to the observers."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._pending = None  # [sql, params, seconds, rows]
+
+    def execute(self, operation, *args, **kwargs):
+        self._flush()
+        t0 = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, *args, **kwargs)
+        finally:
+            self._pending = [operation, args[0] if args else kwargs.get("params"), time.perf_counter() - t0, 0]
+
+    def _timed_fetch(self, method, *args):
+        t0 = time.perf_counter()
+        result = getattr(self._cursor, method)(*args)
+        if self._pending:
+            self._pending[2] += time.perf_counter() - t0
+            if method == "fetchone":
+                self._pending[3] += result is not None
+            else:
+                self._pending[3] += len(result)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch("fetchone")
+
+    def fetchall(self):
+        return self._timed_fetch("fetchall")
+
+    def fetchmany(self, *args):
+        return self._timed_fetch("fetchmany", *args)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._flush()
+        return self._cursor.close()
+
+    def _flush(self):
+        if self._pending:
+            sql, params, seconds, rows = self._pending
+            self._pending = None
+            if not rows and not self._cursor.description:
+                rows = max(self._cursor.rowcount, 0)  # writes: affected rows
+            _notify(sql, params, seconds * 1000, rows)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ObservedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return ObservedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _observe(conn):
+    if not _query_observers:
+        return conn
+    # Connections an observer opens itself (e.g. for EXPLAIN) are not reported
+    if not getattr(_observer_state, "active", False):
+        for callback in list(_query_observers):
+            on_connection = getattr(callback, "on_connection", None)
+            if on_connection is not None:
+                on_connection()
+    return ObservedConnection(conn)
+
+
+# -------------------------
+# DB connection
+# -------------------------
+def _connect(cfg, **extra):
+    return mysql.connector.connect(
+        host=cfg["host"],
+        port=cfg.get("port", 3306),
+        user=cfg["user"],
+        password=cfg["password"],
+        database=cfg["database"],
+        autocommit=True,
+        **extra
+    )
+
+
+# Primary connections come from a per-process pool (size: mysql.pool_size, default 10).
+# Sessions are not reset when a connection goes back to the pool, so statements
+# prepared on it (see run_statement) stay prepared for the next checkout.
+DEFAULT_POOL_SIZE = 10
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                cfg = st.secrets["mysql"]
+                _pool = mysql.connector.pooling.MySQLConnectionPool(
+                    pool_name="pfepl",
+                    pool_size=cfg.get("pool_size", DEFAULT_POOL_SIZE),
+                    pool_reset_session=False,
+                    host=cfg["host"],
+                    port=cfg.get("port", 3306),
+                    user=cfg["user"],
+                    password=cfg["password"],
+                    database=cfg["database"],
+                    autocommit=True,
+                )
+    return _pool
+
+
+def get_connection():
+    """Primary connection: all writes, clash checks and anything that must be current."""
+    try:
+        conn = _get_pool().get_connection()
+    except mysql.connector.pooling.PoolError:
+        # Pool exhausted under load: use a one-off connection rather than failing the page
+        return _observe(_connect(st.secrets["mysql"]))
+    if conn.in_transaction:
+        # Left open by an error path of the previous user; sessions are not reset on return
+        conn.rollback()
+    return _observe(conn)
+
+
+# -------------------------
+# Read replica routing
+# -------------------------
+# Optional [mysql_replica] section in secrets.toml:
+#   host, port, user, password, database   same keys as [mysql]
+#   max_lag_seconds = 30                    replica is skipped when further behind than this
+#   check_interval_seconds = 10             how often lag is re-checked (per process)
+#   connect_timeout = 3
+REPLICA_DEFAULT_MAX_LAG = 30
+REPLICA_DEFAULT_CHECK_INTERVAL = 10
+
+_replica_state = {"checked_at": None, "healthy": False, "lag": None}
+
+
+def replica_lag_seconds(conn):
+    """
+    Seconds the replica is behind its source, or None when the server is not
+    replicating (not a replica, or the IO/SQL thread is stopped).
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")  # MySQL 8.0.22+
+        except mysql.connector.Error:
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+    finally:
+        cursor.close()
+    if not status:
+        return None
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return int(lag) if lag is not None else None
+
+
+def replica_status():
+    """
+    Last replica health check of this process, for the admin view:
+    {'healthy', 'lag', 'checked_ago'} (seconds; checked_ago is None before the first check).
+    """
+    state = dict(_replica_state)
+    checked_at = state.pop("checked_at")
+    state["checked_ago"] = None if checked_at is None else time.monotonic() - checked_at
+    return state
+
+
+def get_read_connection():
+    """
+    Connection for read-only queries that tolerate a few seconds of staleness
+    (history, deleted meetings, user lists, exports).
+
+    Goes to the [mysql_replica] server when one is configured, reachable and
+    within max_lag_seconds of the primary; otherwise falls back to the primary.
+    Lag is checked at most once per check_interval_seconds, and a replica that
+    failed the last check is not retried until the interval has passed.
+    """
+    if "mysql_replica" not in st.secrets:
+        return get_connection()
+
+    cfg = st.secrets["mysql_replica"]
+    max_lag = cfg.get("max_lag_seconds", REPLICA_DEFAULT_MAX_LAG)
+    interval = cfg.get("check_interval_seconds", REPLICA_DEFAULT_CHECK_INTERVAL)
+
+    now = time.monotonic()
+    checked_at = _replica_state["checked_at"]
+    due = checked_at is None or now - checked_at >= interval
+    if not due and not _replica_state["healthy"]:
+        return get_connection()
+
+    try:
+        conn = _connect(cfg, connection_timeout=cfg.get("connect_timeout", 3))
+    except mysql.connector.Error as e:
+        _replica_state.update(checked_at=now, healthy=False, lag=None)
+        print(f"Replica unavailable, reading from primary: {e.msg}")
+        return get_connection()
+
+    if due:
+        try:
+            lag = replica_lag_seconds(conn)
+        except mysql.connector.Error as e:
+            print(f"Replica status check failed: {e.msg}")
+            lag = None
+        healthy = lag is not None and lag <= max_lag
+        _replica_state.update(checked_at=now, healthy=healthy, lag=lag)
+        if not healthy:
+            conn.close()
+            print(f"Replica lag {lag!r}s over limit {max_lag}s, reading from primary.")
+            return get_connection()
+
+    return _observe(conn)
+
+
+# -------------------------
+# Prepared statements
+# -------------------------
+# Hot queries are registered once by name and executed with the binary protocol
+# through a prepared cursor that is kept per physical connection, so MySQL parses
+# each statement once per pooled connection instead of on every call.
+STATEMENTS = {}
+
+_prepared_cursors = weakref.WeakKeyDictionary()  # raw connection -> {name: cursor}
+statement_stats = {"prepared": 0, "reused": 0}
+
+# Errors after which a cached statement handle is no longer valid. 1243 (unknown handle)
+# means the server never ran the statement, so it is always prepared and sent again. After a
+# lost connection the statement may have run with its reply lost: only a read outside a
+# transaction is sent again, never a write (it could be applied twice) or anything in a
+# transaction (that transaction is gone with the connection).
+_UNKNOWN_STATEMENT_ERRNO = 1243
+_LOST_CONNECTION_ERRNOS = {2006, 2013, 2055}
+
+
+def register_statement(name, sql):
+    """Add a statement to the registry. Use %s placeholders; table names are fixed at registration."""
+    STATEMENTS[name] = sql
+    return name
+
+
+def _prepared_cursor(raw, name):
+    cursors = _prepared_cursors.setdefault(raw, {})
+    cursor = cursors.get(name)
+    if cursor is None:
+        cursor = raw.cursor(prepared=True)
+        cursors[name] = cursor
+        statement_stats["prepared"] += 1
+    else:
+        statement_stats["reused"] += 1
+    return cursor
+
+
+def _retryable(errno, sql, in_transaction):
+    if errno == _UNKNOWN_STATEMENT_ERRNO:
+        return True
+    is_read = sql.lstrip().lstrip("(").lstrip().upper().startswith(("SELECT", "WITH"))
+    return errno in _LOST_CONNECTION_ERRNOS and is_read and not in_transaction
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else value
+
+
+def run_statement(conn, name, params=()):
+    """
+    Execute registered statement `name` on conn.
+    Returns (rows as dicts, rowcount, lastrowid); rows is [] for writes.
+    """
+    if isinstance(conn, ObservedConnection):
+        conn = conn._conn
+    raw = conn._cnx if isinstance(conn, mysql.connector.pooling.PooledMySQLConnection) else conn
+    t0 = time.perf_counter()
+    cursor = _prepared_cursor(raw, name)
+    in_transaction = raw.in_transaction
+    try:
+        cursor.execute(STATEMENTS[name], params)
+    except mysql.connector.Error as e:
+        if not _retryable(e.errno, STATEMENTS[name], in_transaction):
+            raise
+        _prepared_cursors.pop(raw, None)
+        if not raw.is_connected():
+            raw.reconnect()
+        cursor = _prepared_cursor(raw, name)
+        cursor.execute(STATEMENTS[name], params)
+
+    rows = []
+    if cursor.description:
+        columns = cursor.column_names
+        rows = [dict(zip(columns, map(_decode, row))) for row in cursor.fetchall()]
+    if _query_observers:
+        _notify(STATEMENTS[name], params, (time.perf_counter() - t0) * 1000,
+                len(rows) if cursor.description else max(cursor.rowcount, 0))
+    return rows, cursor.rowcount, cursor.lastrowid
+
+
+# -------------------------
+# Registered hot statements
+# -------------------------
+VALIDATE_LOGIN = register_statement(
+    "validate_login",
+    "SELECT id, username, first_name, last_name, role FROM login WHERE username=%s AND password=%s"
+)
+
+BOOKING_COLUMNS = "Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId"
+
+for _room_number, _table in ROOM_TABLES.items():
+    # Id <> 0 when there is nothing to exclude (Ids start at 1).
+    # A room closure, or another session's unexpired slot hold, in the window
+    # counts as a clash (returned as Id 0). Params: day, start, end, exclude_id,
+    # day, day, start, end, day, start, end, own hold token.
+    register_statement(f"has_clash/{_room_number}", f"""
+        (SELECT Id FROM {_table}
+         WHERE Day = %s
+           AND deleted_at IS NULL
+           AND NOT (EndTime <= %s OR StartTime >= %s)
+           AND Id <> %s
+         LIMIT 1)
+        UNION ALL
+        (SELECT 0 FROM room_closures
+         WHERE room = {_room_number} AND day_from <= %s AND day_to >= %s
+           AND (start_time IS NULL OR NOT (end_time <= %s OR start_time >= %s))
+         LIMIT 1)
+        UNION ALL
+        (SELECT 0 FROM slot_holds
+         WHERE room = {_room_number} AND Day = %s AND expires_at > NOW()
+           AND NOT (EndTime <= %s OR StartTime >= %s)
+           AND session_token <> %s
+         LIMIT 1)
+        LIMIT 1
+    """)
+    # The part of has_clash that bookings can't enforce themselves: a closure, or
+    # another session's hold. Overlapping bookings are rejected by booking_slots
+    # (see slots.py). Params: day, day, start, end, day, start, end, own hold token.
+    register_statement(f"closed_or_held/{_room_number}", f"""
+        (SELECT 0 FROM room_closures
+         WHERE room = {_room_number} AND day_from <= %s AND day_to >= %s
+           AND (start_time IS NULL OR NOT (end_time <= %s OR start_time >= %s))
+         LIMIT 1)
+        UNION ALL
+        (SELECT 0 FROM slot_holds
+         WHERE room = {_room_number} AND Day = %s AND expires_at > NOW()
+           AND NOT (EndTime <= %s OR StartTime >= %s)
+           AND session_token <> %s
+         LIMIT 1)
+        LIMIT 1
+    """)
+    register_statement(f"load_bookings_today/{_room_number}", f"""
+        SELECT {BOOKING_COLUMNS}
+        FROM {_table}
+        WHERE Day = %s AND deleted_at IS NULL AND CONCAT(Day,' ',EndTime) >= %s
+        ORDER BY StartTime
+    """)
+    register_statement(f"load_bookings_day/{_room_number}", f"""
+        SELECT {BOOKING_COLUMNS}
+        FROM {_table}
+        WHERE Day = %s AND deleted_at IS NULL
+        ORDER BY StartTime
+    """)
+    register_statement(f"select_booking/{_room_number}", f"""
+        SELECT {BOOKING_COLUMNS} FROM {_table} WHERE Id=%s AND deleted_at IS NULL
+    """)
+    register_statement(f"insert_booking/{_room_number}", f"""
+        INSERT INTO {_table} (Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """)
+    register_statement(f"update_booking/{_room_number}", f"""
+        UPDATE {_table}
+        SET Day=%s, StartTime=%s, EndTime=%s, Agenda=%s, PersonName=%s
+        WHERE Id=%s
+    """)
+    register_statement(f"update_booking_end/{_room_number}", f"""
+        UPDATE {_table}
+        SET EndTime=%s, Agenda=%s, PersonName=%s
+        WHERE Id=%s
+    """)
+    register_statement(f"delete_booking/{_room_number}", f"""
+        UPDATE {_table}
+        SET deleted_at=%s, deleted_by=%s, delete_reason=%s
+        WHERE Id=%s AND deleted_at IS NULL AND TIMESTAMP(Day, EndTime) > %s
+    """)
+    register_statement(f"delete_own_booking/{_room_number}", f"""
+        UPDATE {_table}
+        SET deleted_at=%s, deleted_by=%s, delete_reason=%s
+        WHERE Id=%s AND deleted_at IS NULL AND TIMESTAMP(Day, EndTime) > %s
+          AND CreatedByUserId=%s
+    """)
+
+
+# "My bookings": one user's upcoming bookings across all rooms and dates, in
+# (Day, StartTime, room, Id) order, one keyset page at a time.
+# Params per room: owner, today, today, now_time, after_day, after_day,
+# after_start, after_start, after_id, limit; then limit once more for the
+# outer query. See bookings.load_my_bookings.
+MY_BOOKINGS = register_statement("my_bookings", "SELECT * FROM (" + " UNION ALL ".join(
+    f"""
+    (SELECT {BOOKING_COLUMNS}, {_room_number} AS room
+     FROM {_table}
+     WHERE CreatedByUserId = %s AND deleted_at IS NULL
+       AND (Day > %s OR (Day = %s AND EndTime >= %s))
+       AND (Day > %s OR (Day = %s AND (StartTime > %s OR (StartTime = %s AND Id > %s))))
+     ORDER BY Day, StartTime, Id
+     LIMIT %s)
+    """
+    for _room_number, _table in ROOM_TABLES.items()
+) + ") mine ORDER BY Day, StartTime, room, Id LIMIT %s")
+
+
+# Room recommendation: every room with its metadata and whether it is busy in
+# the window, in one statement (instead of one has_clash call per room).
+# Params: (day, start, end, day, day, start, end) per room, then the minimum
+# capacity. See rooms.py. Closed rooms (room_closures) count as busy.
+ROOM_AVAILABILITY = register_statement("room_availability", """
+    SELECT m.room, m.name, m.capacity, m.equipment, a.busy
+    FROM meeting_rooms m
+    JOIN (""" + " UNION ALL ".join(
+    f"""
+        SELECT {_room_number} AS room, EXISTS(
+            SELECT 1 FROM {_table}
+            WHERE Day = %s AND deleted_at IS NULL
+              AND NOT (EndTime <= %s OR StartTime >= %s)
+        ) OR EXISTS(
+            SELECT 1 FROM room_closures
+            WHERE room = {_room_number} AND day_from <= %s AND day_to >= %s
+              AND (start_time IS NULL OR NOT (end_time <= %s OR start_time >= %s))
+        ) AS busy"""
+    for _room_number, _table in ROOM_TABLES.items()
+) + """
+    ) a ON a.room = m.room
+    WHERE m.capacity >= %s
+    ORDER BY a.busy, m.capacity, m.room
+""")
+
+
+# Slot holds (holds.py): a booking made by the holder replaces its hold.
+RELEASE_HOLD = register_statement("release_hold", "DELETE FROM slot_holds WHERE session_token = %s")
+
+# Idempotent Create Booking (idempotency.py). INSERT fails with a duplicate key
+# if the submission was already saved; the lookup then finds its booking.
+RECORD_REQUEST = register_statement(
+    "record_request",
+    "INSERT INTO booking_requests (idempotency_key, room, booking_id) VALUES (%s, %s, %s)"
+)
+FIND_REQUEST = register_statement(
+    "find_request",
+    "SELECT room, booking_id FROM booking_requests WHERE idempotency_key = %s"
+)
@@ -0,0 +1,310 @@
+"""
+Degraded read-only mode while MySQL is unreachable.
+
+A background thread (one per app process, started by install() on the first
+rerun after a login, so the login page doesn't import mysql.connector)
+refreshes the local schedule snapshot (snapshot.py) every refresh_seconds
+while the database answers.
+
+load_bookings() is the Home page's loader (through the per-process cache in
+schedule_cache.py). When a query fails because the server can't be reached,
+the process is marked down and the day is served from the snapshot, without
+waiting on the database. While down, the database is only tried again every
+retry_seconds, so pages don't each sit through a connect timeout. The
+refresher's next successful query marks it up again.
+
+Create Booking keeps working while down: the submission is checked against
+the snapshot and appended to a local queue file with its idempotency key.
+Once the database is back, the refresher replays the queue. Each entry is
+re-validated (start still in the future, not closed or held since) and
+inserted with its audit row. An overlap with a booking made in the meantime
+is rejected by booking_slots (see slots.py), and duplicates are caught by
+the idempotency key (see idempotency.py). Outcomes are kept next to the
+queue so the user sees what happened. Other writes are refused while down.
+
+Optional settings in secrets.toml:
+
+    [degraded]
+    snapshot_path = "logs/schedule.snapshot"
+    snapshot_days = 14
+    refresh_seconds = 60
+    retry_seconds = 15
+    queue_path = "logs/write_queue.jsonl"
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+import streamlit as st
+
+import audit_log
+import idempotency
+import schedule_cache
+import slots
+import snapshot
+from lazy_imports import LazyModule
+from db import get_connection, run_statement, FIND_REQUEST
+
+mysql = LazyModule("mysql")
+
+DEFAULTS = {
+    "snapshot_path": "logs/schedule.snapshot",
+    "snapshot_days": 14,
+    "refresh_seconds": 60,
+    "retry_seconds": 15,
+    "queue_path": "logs/write_queue.jsonl",
+}
+
+# Client errors meaning "no server": can't connect, server gone away, lost connection
+UNREACHABLE_ERRNOS = {2002, 2003, 2005, 2006, 2013, 2055}
+
+_state = {"down_since": None, "retry_at": 0.0, "error": None}
+_lock = threading.Lock()
+_refresher = None
+
+
+class SnapshotUnavailable(Exception):
+    """The database is unreachable and the snapshot doesn't cover the day asked for."""
+
+
+def settings():
+    try:
+        configured = dict(st.secrets.get("degraded", {}))
+    except Exception:  # no secrets file
+        configured = {}
+    return {k: type(v)(configured.get(k, v)) for k, v in DEFAULTS.items()}
+
+
+# -------------------------
+# Up / down
+# -------------------------
+def unreachable(exc):
+    """True if exc means the database server can't be reached (as opposed to a bad query)."""
+    if isinstance(exc, mysql.connector.errors.PoolError):
+        return True
+    return isinstance(exc, mysql.connector.Error) and exc.errno in UNREACHABLE_ERRNOS
+
+
+def mark_down(exc):
+    with _lock:
+        if _state["down_since"] is None:
+            _state["down_since"] = datetime.now()
+        _state["retry_at"] = time.monotonic() + settings()["retry_seconds"]
+        _state["error"] = str(exc)
+
+
+def mark_up():
+    with _lock:
+        _state["down_since"] = None
+        _state["error"] = None
+
+
+def is_down():
+    return _state["down_since"] is not None
+
+
+def status():
+    """{'down_since', 'error', 'snapshot_at', 'queued'} for the banner."""
+    cfg = settings()
+    snap = snapshot.current(cfg["snapshot_path"])
+    return {
+        "down_since": _state["down_since"],
+        "error": _state["error"],
+        "snapshot_at": snap.generated_at if snap else None,
+        "queued": len(pending()),
+    }
+
+
+def load_bookings(day):
+    """(DaySchedule, None) from the database, or (DaySchedule, snapshot time) while it is unreachable."""
+    if not is_down() or time.monotonic() >= _state["retry_at"]:
+        try:
+            schedule = schedule_cache.load_bookings(day)
+            mark_up()
+            return schedule, None
+        except mysql.connector.Error as e:
+            if not unreachable(e):
+                raise
+            mark_down(e)
+
+    snap = snapshot.current(settings()["snapshot_path"])
+    schedule = snap.schedule(day) if snap else None
+    if schedule is None:
+        raise SnapshotUnavailable(day)
+    return schedule, snap.generated_at
+
+
+def snapshot_schedule(day):
+    """DaySchedule of any day from the local snapshot, or None if it doesn't cover that day."""
+    snap = snapshot.current(settings()["snapshot_path"])
+    return snap.schedule(day) if snap else None
+
+
+# -------------------------
+# Write queue
+# -------------------------
+def _results_path(queue_path):
+    return queue_path + ".results"
+
+
+def _read_lines(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def enqueue(key, room, day, start_24, end_24, agenda, person_name, username, user_id):
+    """Queue a Create Booking for replay. A repeat of the same key is ignored. Returns False for a repeat."""
+    path = settings()["queue_path"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    entry = {
+        "key": key, "room": room, "day": day.isoformat(), "start": start_24, "end": end_24,
+        "agenda": agenda, "person": person_name, "username": username, "user_id": user_id,
+        "queued_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(path, "a+", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        if any(json.loads(line)["key"] == key for line in f if line.strip()):
+            return False
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return True
+
+
+def pending(user_id=None):
+    """Queued Create Booking entries, oldest first (only user_id's when given)."""
+    entries = _read_lines(settings()["queue_path"])
+    return [e for e in entries if user_id is None or e["user_id"] == user_id]
+
+
+def outcomes(user_id, limit=10):
+    """The latest replay outcomes of user_id's queued bookings, newest first."""
+    results = _read_lines(_results_path(settings()["queue_path"]))
+    return [r for r in reversed(results) if r["user_id"] == user_id][:limit]
+
+
+def _replay_one(conn, entry):
+    """Insert one queued booking after re-validating it. Returns (outcome, booking id or reason)."""
+    room, day = entry["room"], date.fromisoformat(entry["day"])
+    start_24, end_24 = entry["start"], entry["end"]
+
+    rows, _, _ = run_statement(conn, FIND_REQUEST, (entry["key"],))
+    if rows:
+        return "saved", rows[0]["booking_id"]
+    if datetime.combine(day, datetime.strptime(start_24, "%H:%M:%S").time()) <= datetime.now():
+        return "rejected", "the start time passed while the database was unreachable"
+
+    conn.start_transaction()
+    try:
+        _, _, new_id = run_statement(
+            conn, f"insert_booking/{room}",
+            (str(day), start_24, end_24, entry["agenda"], entry["person"], entry["user_id"])
+        )
+    except mysql.connector.Error as e:
+        if not slots.is_clash(e):
+            raise
+        conn.rollback()
+        return "rejected", "the slot was booked in the meantime"
+    if slots.blocked(conn, room, day, start_24, end_24):
+        conn.rollback()
+        return "rejected", "the slot was held or closed in the meantime"
+    existing = idempotency.record(conn, entry["key"], room, new_id)
+    if existing is not None:
+        return "saved", existing
+
+    new_data = {"Day": str(day), "StartTime": start_24, "EndTime": end_24, "Agenda": entry["agenda"],
+                "PersonName": entry["person"], "CreatedByUserId": entry["user_id"]}
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            INSERT INTO meeting_logs (username, created_by_user_id, action_type, meeting_id, room, delta, reason)
+            VALUES (%s, %s, 'CREATE', %s, %s, %s, %s)
+            """,
+            (entry["username"], entry["user_id"], new_id, room, audit_log.encode(None, new_data),
+             f"Queued at {entry['queued_at']} while the database was unreachable")
+        )
+    finally:
+        cursor.close()
+    conn.commit()
+    idempotency.remember(entry["key"], new_id)
+    return "saved", new_id
+
+
+def replay():
+    """Replay the queue in order; entries stay queued if the database goes away again. Returns outcomes."""
+    path = settings()["queue_path"]
+    if not os.path.exists(path):
+        return []
+    done = []
+    with open(path, "r+", encoding="utf-8") as f:
+        # One replayer at a time across app processes
+        fcntl.flock(f, fcntl.LOCK_EX)
+        entries = [json.loads(line) for line in f if line.strip()]
+        if not entries:
+            return []
+        remaining = list(entries)
+        conn = get_connection()
+        try:
+            for entry in entries:
+                try:
+                    outcome, detail = _replay_one(conn, entry)
+                except mysql.connector.Error as e:
+                    conn.rollback()
+                    if unreachable(e):
+                        break
+                    outcome, detail = "rejected", f"database error: {e.msg}"
+                remaining.remove(entry)
+                done.append({
+                    "key": entry["key"], "user_id": entry["user_id"], "room": entry["room"], "day": entry["day"],
+                    "start": entry["start"], "end": entry["end"], "agenda": entry["agenda"],
+                    "outcome": outcome, "detail": detail, "at": datetime.now().isoformat(timespec="seconds"),
+                })
+        finally:
+            conn.close()
+            if done:
+                with open(_results_path(path), "a", encoding="utf-8") as results:
+                    results.writelines(json.dumps(r) + "\n" for r in done)
+                f.seek(0)
+                f.truncate()
+                f.writelines(json.dumps(e) + "\n" for e in remaining)
+                f.flush()
+                os.fsync(f.fileno())
+    return done
+
+
+# -------------------------
+# Background refresher
+# -------------------------
+def _refresh_loop():
+    while True:
+        cfg = settings()
+        try:
+            snapshot.refresh(cfg["snapshot_path"], cfg["snapshot_days"])
+            mark_up()
+            replay()
+        except mysql.connector.Error as e:
+            if unreachable(e):
+                mark_down(e)
+            else:
+                print(f"Snapshot refresh failed: {e}")
+        except Exception as e:  # keep the thread alive whatever happens
+            print(f"Snapshot refresh failed: {e}")
+        time.sleep(cfg["refresh_seconds"])
+
+
+def install():
+    """Start the snapshot refresher of this process (idempotent)."""
+    global _refresher
+    with _lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, name="pfepl-snapshot", daemon=True)
+            _refresher.start()
+    return _refresher
@@ -0,0 +1,141 @@
+"""
+Meeting history search for audits.
+
+search_history() looks up bookings in any date range across the live room
+tables and the archive, live and/or soft-deleted, optionally filtered by
+room, person (name prefix) and agenda words. Results come back one page at a
+time in (Day, StartTime, room, Id) order. The page key of the last row is the
+cursor for the next page (keyset pagination), so page 50 of an 18-month
+search costs the same as page 1 and memory stays bounded by the page size.
+
+Indexes are in migrations/004_history_search_indexes.sql. The agenda filter
+uses the FULLTEXT index on the room tables. InnoDB has no FULLTEXT on
+partitioned tables, so archived rows are matched with LIKE inside the date
+range instead (partition pruning keeps that to the months searched).
+"""
+import re
+
+from bookings import time_to_str
+from db import get_read_connection, ROOM_TABLES, ARCHIVE_TABLE
+
+SEARCH_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STATUSES = ("all", "live", "deleted")
+
+HISTORY_COLUMNS = ("Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId, "
+                   "deleted_at, deleted_by, delete_reason")
+
+_RE_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def agenda_words(text):
+    """Words of an agenda search; MySQL's FULLTEXT ignores words under 3 characters."""
+    return [w for w in _RE_WORD.findall(text or "") if len(w) >= 3]
+
+
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _after_clause(room_expr):
+    """Rows strictly after the cursor in (Day, StartTime, room, Id) order."""
+    return (f"(Day > %s OR (Day = %s AND (StartTime > %s OR (StartTime = %s AND "
+            f"({room_expr} > %s OR ({room_expr} = %s AND Id > %s))))))")
+
+
+def _branch(table, room_expr, room_filter, filters, after, fetch):
+    """One SELECT of the UNION with its params; room_filter is (sql, params) or None."""
+    where = ["Day >= %s", "Day <= %s"]
+    params = [filters["day_from"], filters["day_to"]]
+
+    if room_filter:
+        where.append(room_filter[0])
+        params += room_filter[1]
+
+    if filters["status"] == "live":
+        where.append("deleted_at IS NULL")
+    elif filters["status"] == "deleted":
+        where.append("deleted_at IS NOT NULL")
+
+    if filters["person"]:
+        where.append("PersonName LIKE %s")
+        params.append(_like_escape(filters["person"]) + "%")
+
+    if filters["words"]:
+        if table == ARCHIVE_TABLE:
+            for word in filters["words"]:
+                where.append("Agenda LIKE %s")
+                params.append("%" + _like_escape(word) + "%")
+        else:
+            where.append("MATCH(Agenda) AGAINST (%s IN BOOLEAN MODE)")
+            params.append(" ".join("+" + w + "*" for w in filters["words"]))
+
+    if after is not None:
+        a_day, a_start, a_room, a_id = after
+        where.append(_after_clause(room_expr))
+        params += [a_day, a_day, a_start, a_start, a_room, a_room, a_id]
+
+    # A room table holds one room, so its room number is a constant there
+    # (and a bare number in ORDER BY would mean a column position)
+    order = "Day, StartTime, room, Id" if table == ARCHIVE_TABLE else "Day, StartTime, Id"
+    sql = f"""
+        (SELECT {HISTORY_COLUMNS}, {room_expr} AS room
+         FROM {table}
+         WHERE {" AND ".join(where)}
+         ORDER BY {order}
+         LIMIT %s)
+    """
+    params.append(fetch)
+    return sql, params
+
+
+def search_history(day_from, day_to, room=None, person=None, agenda=None,
+                   status="all", after=None, limit=SEARCH_PAGE_SIZE):
+    """
+    One page of history rows with day_from <= Day <= day_to.
+
+    room: room number or None for all rooms. person: start of PersonName.
+    agenda: words that must all appear in the agenda (prefix match).
+    status: "all", "live" or "deleted". after: the cursor returned with the
+    previous page, None for the first page.
+
+    Returns (rows, next_after): rows are dicts with the booking columns,
+    deleted_* and room; next_after is None on the last page.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {STATUSES}")
+    if room is not None and room not in ROOM_TABLES:
+        raise ValueError("Invalid room number")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    fetch = limit + 1
+
+    filters = {
+        "day_from": day_from, "day_to": day_to, "status": status,
+        "person": (person or "").strip(), "words": agenda_words(agenda),
+    }
+
+    branches = []
+    for room_number, table in ROOM_TABLES.items():
+        if room is None or room == room_number:
+            branches.append(_branch(table, str(room_number), None, filters, after, fetch))
+    archive_room = ("room = %s", [room]) if room is not None else None
+    branches.append(_branch(ARCHIVE_TABLE, "room", archive_room, filters, after, fetch))
+
+    sql = ("SELECT * FROM (" + " UNION ALL ".join(b[0] for b in branches)
+           + ") h ORDER BY Day, StartTime, room, Id LIMIT %s")
+    params = [p for b in branches for p in b[1]] + [fetch]
+
+    conn = get_read_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(sql, tuple(params))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, (last["Day"], time_to_str(last["StartTime"]), last["room"], last["Id"])
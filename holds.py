@@ -0,0 +1,125 @@
+"""
+Slot holds: a short lease on (room, day, window) while a booking form is open.
+
+As soon as Create Booking has a room, day and valid times, the session
+places a hold. For the next few minutes every other session treats the window
+as taken: their saves are refused by slots.blocked() (the closed_or_held
+statement in db.py), and their own holds by the has_clash check in
+place_hold(). So whoever is filling in the form keeps the slot, and the
+others find out before they press Save. Saving
+the booking replaces the hold (insert_booking releases it on the same
+connection); closing the form releases it; otherwise it simply expires.
+
+Each session holds at most one slot, identified by its session token. Expiry
+uses the database clock, so all app servers agree on it.
+
+Optional settings in secrets.toml:
+
+    [holds]
+    ttl_seconds = 300
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from lazy_imports import LazyModule
+from db import get_connection, run_statement, room_table, RELEASE_HOLD
+
+mysql = LazyModule("mysql")
+
+DEFAULT_TTL_SECONDS = 300
+
+# Deadlock / lock wait timeout: another session is placing a hold on the same room-day
+_LOCK_ERRNOS = {1205, 1213}
+
+
+def ttl_seconds():
+    try:
+        return int(st.secrets.get("holds", {}).get("ttl_seconds", DEFAULT_TTL_SECONDS))
+    except Exception:  # no secrets file
+        return DEFAULT_TTL_SECONDS
+
+
+def session_token():
+    """This browser session's hold token (created on first use)."""
+    if "hold_token" not in st.session_state:
+        st.session_state.hold_token = uuid.uuid4().hex
+    return st.session_state.hold_token
+
+
+def place_hold(room, day, start_24, end_24, token, user_id, ttl=None):
+    """
+    Hold the window for this session, replacing its previous hold.
+    Returns (True, expires_at) or (False, reason) when the window is already
+    booked, closed or held by someone else.
+    """
+    room_table(room)  # validates the room number
+    ttl = ttl or ttl_seconds()
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        cursor.execute("DELETE FROM slot_holds WHERE session_token = %s", (token,))
+        cursor.execute(
+            "DELETE FROM slot_holds WHERE room = %s AND Day = %s AND expires_at <= NOW()",
+            (room, day)
+        )
+        # Locks the room-day's holds (and the gap around them), so two sessions
+        # can't both see the window free and both hold it
+        cursor.execute(
+            """
+            SELECT StartTime, EndTime, expires_at FROM slot_holds
+            WHERE room = %s AND Day = %s
+            FOR UPDATE
+            """,
+            (room, day)
+        )
+        held = [h for h in cursor.fetchall() if h["StartTime"] < _td(end_24) and h["EndTime"] > _td(start_24)]
+        if held:
+            conn.rollback()
+            return False, f"Someone else is booking this slot (held until {min(h['expires_at'] for h in held):%H:%M})."
+
+        rows, _, _ = run_statement(
+            conn, f"has_clash/{room}",
+            (day, start_24, end_24, 0, day, day, start_24, end_24, day, start_24, end_24, token)
+        )
+        if rows:
+            conn.rollback()
+            return False, "This slot is already booked."
+
+        cursor.execute(
+            """
+            INSERT INTO slot_holds (room, Day, StartTime, EndTime, session_token, holder_user_id, expires_at)
+            VALUES (%s, %s, %s, %s, %s, %s, NOW() + INTERVAL %s SECOND)
+            """,
+            (room, day, start_24, end_24, token, user_id, ttl)
+        )
+        conn.commit()
+        return True, datetime.now() + timedelta(seconds=ttl)
+    except mysql.connector.Error as e:
+        conn.rollback()
+        if e.errno in _LOCK_ERRNOS:
+            return False, "Someone else is booking this slot right now."
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def release_hold(token, conn=None):
+    """Drop this session's hold, if any (on `conn` when given, e.g. inside a booking's transaction)."""
+    if conn is not None:
+        run_statement(conn, RELEASE_HOLD, (token,))
+        return
+    conn = get_connection()
+    try:
+        run_statement(conn, RELEASE_HOLD, (token,))
+    finally:
+        conn.close()
+
+
+def _td(hhmmss):
+    """'HH:MM:SS' -> timedelta, the type MySQL TIME columns come back as."""
+    h, m, s = (int(x) for x in hhmmss.split(":"))
+    return timedelta(hours=h, minutes=m, seconds=s)
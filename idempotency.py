@@ -0,0 +1,117 @@
+"""
+Idempotency keys for Create Booking.
+
+Each opening of the Create Booking form gets a key (form_key()). Saving
+records the key next to the new booking, in the same transaction, in
+booking_requests, whose primary key rejects a second save with the same key
+(migrations/008_idempotency_keys.sql). A double click, a repeated rerun or
+a retry after a slow response therefore returns the booking that already
+exists instead of writing a new one.
+
+Recently saved keys are also kept in a bounded in-process cache, so most
+duplicates are answered before any clash check or database round trip.
+`stats` counts the lookups made at each level and how many found a saved
+booking; repeat checks within one save (peek()) are not counted.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+
+import streamlit as st
+
+from lazy_imports import LazyModule
+from db import get_connection, run_statement, RECORD_REQUEST, FIND_REQUEST
+
+mysql = LazyModule("mysql")
+
+CACHE_SIZE = 10_000
+DUPLICATE_KEY = 1062
+
+stats = {"saved": 0, "cache_lookups": 0, "cache_hits": 0, "db_lookups": 0, "db_hits": 0}
+
+_cache = OrderedDict()  # key -> booking id, least recently used first
+_lock = threading.Lock()
+
+
+def form_key(name):
+    """The idempotency key of the form `name` as currently open in this session."""
+    state_key = f"{name}_idempotency_key"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = uuid.uuid4().hex
+    return st.session_state[state_key]
+
+
+def new_form_key(name):
+    """Start a new submission, e.g. after a successful save."""
+    st.session_state.pop(f"{name}_idempotency_key", None)
+
+
+def peek(key):
+    """cached() without counting a lookup, for checking the same key again within one save."""
+    with _lock:
+        booking_id = _cache.get(key)
+        if booking_id is not None:
+            _cache.move_to_end(key)
+        return booking_id
+
+
+def cached(key):
+    """Booking id already saved under key, from the in-process cache only (the check when Save is pressed)."""
+    booking_id = peek(key)
+    with _lock:
+        stats["cache_lookups"] += 1
+        if booking_id is not None:
+            stats["cache_hits"] += 1
+    return booking_id
+
+
+def remember(key, booking_id):
+    with _lock:
+        _cache[key] = booking_id
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def lookup(key):
+    """Booking id saved under key, from the database (e.g. after a clash with it)."""
+    booking_id = peek(key)
+    if booking_id is not None:
+        return booking_id
+    conn = get_connection()
+    try:
+        rows, _, _ = run_statement(conn, FIND_REQUEST, (key,))
+    finally:
+        conn.close()
+    with _lock:
+        stats["db_lookups"] += 1
+        stats["db_hits"] += bool(rows)
+    if not rows:
+        return None
+    remember(key, rows[0]["booking_id"])
+    return rows[0]["booking_id"]
+
+
+def record(conn, key, room, booking_id):
+    """
+    Record the key for a booking just inserted on conn (before commit).
+    Returns None, or, if the key was already saved, rolls conn back (undoing
+    the caller's insert) and returns the id of the booking saved first.
+    """
+    try:
+        run_statement(conn, RECORD_REQUEST, (key, room, booking_id))
+    except mysql.connector.Error as e:
+        if e.errno != DUPLICATE_KEY:
+            raise
+        conn.rollback()
+        rows, _, _ = run_statement(conn, FIND_REQUEST, (key,))
+        if not rows:
+            raise
+        with _lock:
+            stats["db_lookups"] += 1
+            stats["db_hits"] += 1
+        remember(key, rows[0]["booking_id"])
+        return rows[0]["booking_id"]
+    with _lock:
+        stats["saved"] += 1
+    return None
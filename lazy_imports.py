@@ -0,0 +1,30 @@
+"""
+Deferred imports for heavy dependencies.
+
+    pd = LazyModule("pandas")
+    mysql = LazyModule("mysql")      # mysql.connector.Error etc. still work
+
+The real module is imported the first time an attribute is used, so a
+Streamlit rerun that never touches pandas or the database (the login page
+before the form is submitted) doesn't pay for importing them. After the
+first use it is an ordinary sys.modules lookup.
+"""
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module, imported on first attribute access. Submodules resolve too."""
+
+    def __init__(self, name):
+        self._lazy_name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._lazy_name)
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            # e.g. mysql.connector before anything has imported it
+            return importlib.import_module(f"{self._lazy_name}.{attr}")
+
+    def __repr__(self):
+        return f"<lazy module {self._lazy_name!r}>"
@@ -0,0 +1,263 @@
+"""
+Retention for meeting_logs: keep recent months hot, move older rows to compressed monthly files.
+
+Run daily or monthly (e.g. from cron):
+
+    python log_retention.py
+    python log_retention.py --report
+    python log_retention.py --keep-months 6 --batch-size 2000
+
+Rows logged before the first day of the month keep_months ago are written to
+Parquet files (zstd) under archive_dir, one directory per month
+(month=YYYY-MM), and deleted from meeting_logs. The job works in small
+batches in id order: read a batch (no locks), write its file, then delete
+exactly those ids in a short transaction and pause. Audit rows are never
+updated, and new ones are appended at the end of the primary key, so
+log_action and booking writes are never blocked. If the job stops between
+writing and deleting, the next run writes the same batch again under the
+same file name, and readers drop duplicate ids anyway.
+
+Each batch adds a part file. At the end of a run, months with several parts
+are compacted into one file.
+
+read_archive() reads the files back (e.g. the Audit trail view, see
+audit_log.meeting_history), pruned to the months asked for.
+
+Settings (all optional) in secrets.toml:
+
+    [log_retention]
+    keep_months = 12
+    archive_dir = "logs/archive/meeting_logs"
+    batch_size = 2000
+    pause_seconds = 0.2
+"""
+import argparse
+import os
+import time
+from datetime import date
+
+import streamlit as st
+
+from lazy_imports import LazyModule
+from db import get_connection
+
+pa = LazyModule("pyarrow")
+pq = LazyModule("pyarrow.parquet")
+
+DEFAULTS = {
+    "keep_months": 12,
+    "archive_dir": "logs/archive/meeting_logs",
+    "batch_size": 2000,
+    "pause_seconds": 0.2,
+}
+
+COLUMNS = ("id", "logged_at", "username", "created_by_user_id", "action_type", "meeting_id", "room",
+           "delta", "old_data", "new_data", "reason")
+
+
+def settings():
+    try:
+        configured = dict(st.secrets.get("log_retention", {}))
+    except Exception:  # no secrets file
+        configured = {}
+    return {k: type(v)(configured.get(k, v)) for k, v in DEFAULTS.items()}
+
+
+def _schema():
+    return pa.schema([
+        ("id", pa.int64()), ("logged_at", pa.timestamp("s")), ("username", pa.string()),
+        ("created_by_user_id", pa.int64()), ("action_type", pa.string()), ("meeting_id", pa.int64()),
+        ("room", pa.int16()), ("delta", pa.string()), ("old_data", pa.string()), ("new_data", pa.string()),
+        ("reason", pa.string()),
+    ])
+
+
+# -------------------------
+# Month helpers
+# -------------------------
+def cutoff_for(keep_months, today=None):
+    """First day of the month keep_months before today's month: rows logged before it are archived."""
+    today = today or date.today()
+    months = today.year * 12 + today.month - 1 - keep_months
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def month_dir(archive_dir, month):
+    return os.path.join(archive_dir, f"month={month:%Y-%m}")
+
+
+# -------------------------
+# Writing
+# -------------------------
+def _write(rows, path):
+    """Write rows (dicts) to one Parquet file, atomically."""
+    table = pa.Table.from_pylist([{c: r.get(c) for c in COLUMNS} for r in rows], schema=_schema())
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def write_parts(rows, archive_dir):
+    """Write a batch to its month directories; the file is named after its first id. Returns months touched."""
+    by_month = {}
+    for r in rows:
+        by_month.setdefault(r["logged_at"].date().replace(day=1), []).append(r)
+    for month, month_rows in by_month.items():
+        directory = month_dir(archive_dir, month)
+        os.makedirs(directory, exist_ok=True)
+        _write(month_rows, os.path.join(directory, f"part-{month_rows[0]['id']:012d}.parquet"))
+    return set(by_month)
+
+
+def archive_batch(conn, cutoff, after_id, batch_size, archive_dir):
+    """Archive up to batch_size rows logged before cutoff with id > after_id. Returns (rows, last id, months)."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM meeting_logs WHERE id > %s AND logged_at < %s ORDER BY id LIMIT %s",
+            (after_id, cutoff, batch_size)
+        )
+        rows = cursor.fetchall()
+        conn.commit()  # end the read snapshot before writing files
+        if not rows:
+            return 0, after_id, set()
+
+        months = write_parts(rows, archive_dir)
+
+        ids = [r["id"] for r in rows]
+        conn.start_transaction()
+        cursor.execute(f"DELETE FROM meeting_logs WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        conn.commit()
+        return len(rows), ids[-1], months
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def compact(archive_dir, month):
+    """Merge a month's part files into one (duplicate ids dropped). Returns the number of parts merged."""
+    directory = month_dir(archive_dir, month)
+    parts = sorted(f for f in os.listdir(directory) if f.endswith(".parquet"))
+    if len(parts) < 2:
+        return 0
+    rows = _dedupe(pq.read_table([os.path.join(directory, f) for f in parts], schema=_schema()).to_pylist())
+    # Same name as the first part, so a crash part-way leaves only duplicates behind
+    _write(rows, os.path.join(directory, parts[0]))
+    for f in parts[1:]:
+        os.remove(os.path.join(directory, f))
+    return len(parts)
+
+
+def run_retention(keep_months=None, batch_size=None, archive_dir=None, pause_seconds=None, log=print):
+    """Archive everything older than the retention window, batch by batch. Returns rows archived."""
+    cfg = settings()
+    keep_months = cfg["keep_months"] if keep_months is None else keep_months
+    batch_size = batch_size or cfg["batch_size"]
+    archive_dir = archive_dir or cfg["archive_dir"]
+    pause_seconds = cfg["pause_seconds"] if pause_seconds is None else pause_seconds
+
+    cutoff = cutoff_for(keep_months)
+    conn = get_connection()
+    total, after_id, touched = 0, 0, set()
+    try:
+        while True:
+            n, after_id, months = archive_batch(conn, cutoff, after_id, batch_size, archive_dir)
+            total += n
+            touched |= months
+            if n < batch_size:
+                break
+            log(f"  {total} rows archived (up to id {after_id})")
+            time.sleep(pause_seconds)
+    finally:
+        conn.close()
+
+    for month in sorted(touched):
+        merged = compact(archive_dir, month)
+        if merged:
+            log(f"  {month:%Y-%m}: compacted {merged} parts")
+    return total
+
+
+# -------------------------
+# Reading
+# -------------------------
+def _dedupe(rows):
+    seen, out = set(), []
+    for r in sorted(rows, key=lambda r: r["id"]):
+        if r["id"] not in seen:
+            seen.add(r["id"])
+            out.append(r)
+    return out
+
+
+def read_archive(room=None, meeting_id=None, month_from=None, month_to=None, archive_dir=None):
+    """Archived rows (dicts, oldest first), optionally for one meeting and/or a range of months."""
+    archive_dir = archive_dir or settings()["archive_dir"]
+    if not os.path.isdir(archive_dir):
+        return []
+    paths = []
+    for name in sorted(os.listdir(archive_dir)):
+        if not name.startswith("month="):
+            continue
+        month = name[len("month="):]
+        if (month_from and month < f"{month_from:%Y-%m}") or (month_to and month > f"{month_to:%Y-%m}"):
+            continue
+        directory = os.path.join(archive_dir, name)
+        paths += [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(".parquet")]
+    if not paths:
+        return []
+
+    filters = []
+    if room is not None:
+        filters.append(("room", "=", room))
+    if meeting_id is not None:
+        filters.append(("meeting_id", "=", meeting_id))
+    table = pq.read_table(paths, schema=_schema(), filters=filters or None)
+    return _dedupe(table.to_pylist())
+
+
+def report(archive_dir=None, keep_months=None):
+    """(hot rows, hot rows past the window, archived months, archived bytes)."""
+    cfg = settings()
+    archive_dir = archive_dir or cfg["archive_dir"]
+    cutoff = cutoff_for(cfg["keep_months"] if keep_months is None else keep_months)
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(logged_at < %s), 0) FROM meeting_logs", (cutoff,))
+        hot, due = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    months, size = 0, 0
+    if os.path.isdir(archive_dir):
+        for name in os.listdir(archive_dir):
+            directory = os.path.join(archive_dir, name)
+            if name.startswith("month=") and os.path.isdir(directory):
+                months += 1
+                size += sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+    return hot, int(due), months, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old meeting_logs rows into monthly Parquet archives.")
+    parser.add_argument("--keep-months", type=int, default=None, help="Months kept in the table (default 12).")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--pause-seconds", type=float, default=None, help="Pause between batches.")
+    parser.add_argument("--archive-dir", default=None)
+    parser.add_argument("--report", action="store_true", help="Only print what is hot, due and archived.")
+    args = parser.parse_args()
+
+    if not args.report:
+        n = run_retention(args.keep_months, args.batch_size, args.archive_dir, args.pause_seconds)
+        print(f"Archived {n} rows.")
+    hot, due, months, size = report(args.archive_dir, args.keep_months)
+    print(f"meeting_logs: {hot} rows ({due} past the retention window); "
+          f"archive: {months} months, {size / 1024:,.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
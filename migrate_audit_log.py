@@ -0,0 +1,125 @@
+"""
+Convert existing meeting_logs rows to delta records (see audit_log.py).
+
+Run after migrations/009_audit_delta.sql:
+
+    python migrate_audit_log.py --report      # sizes only, changes nothing
+    python migrate_audit_log.py --batch-size 2000
+
+Rows are converted in id order, one transaction per batch: old_data/new_data
+are encoded into `delta` and set to NULL. An UPDATE row keeps its full
+before state ("b") unless an earlier row of the same meeting was seen in this
+run, so nothing is lost for meetings whose creation was never logged. The job
+can be stopped and re-run; converted rows are skipped (a re-run only stores a
+few more "b" states than one full run would).
+
+A row whose old_data or new_data can't be parsed (neither JSON nor a Python
+dict repr) is left as it is, legacy columns included, and counted as skipped:
+its text is the only copy of that audit record. decode() still reads it.
+"""
+import argparse
+import time
+
+import audit_log
+from db import get_connection
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def convert_batch(conn, after_id, batch_size, seen):
+    """
+    Convert up to batch_size unconverted rows with id > after_id.
+    Returns (rows converted, rows skipped as unparseable, last id).
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        cursor.execute(
+            """
+            SELECT id, action_type, meeting_id, room, old_data, new_data, reason FROM meeting_logs
+            WHERE id > %s AND delta IS NULL AND (old_data IS NOT NULL OR new_data IS NOT NULL)
+            ORDER BY id LIMIT %s FOR UPDATE
+            """,
+            (after_id, batch_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0, 0, after_id
+
+        updates = []
+        for row in rows:
+            old = audit_log.parse_legacy(row["old_data"])
+            new = audit_log.parse_legacy(row["new_data"])
+            if (old and "raw" in old) or (new and "raw" in new):
+                continue  # unparseable: keep the legacy text
+            meeting = (row["room"], row["meeting_id"])
+            rooms = audit_log.room_change(new, row["reason"]) if old and new else None
+            delta = audit_log.encode(old, new, rooms=rooms, base=meeting not in seen)
+            seen.add(meeting)
+            updates.append((delta, row["id"]))
+
+        if updates:
+            cursor.executemany("UPDATE meeting_logs SET delta = %s, old_data = NULL, new_data = NULL WHERE id = %s",
+                               updates)
+        conn.commit()
+        return len(updates), len(rows) - len(updates), rows[-1]["id"]
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def sizes(conn):
+    """(rows, bytes in old_data+new_data, bytes in delta) over the whole table."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT COUNT(*),
+                   COALESCE(SUM(COALESCE(LENGTH(old_data), 0) + COALESCE(LENGTH(new_data), 0)), 0),
+                   COALESCE(SUM(LENGTH(delta)), 0)
+            FROM meeting_logs
+            """
+        )
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert meeting_logs rows to delta records.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--report", action="store_true", help="Only print sizes.")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        rows, legacy, delta = sizes(conn)
+        print(f"{rows} rows: {legacy / 1024:,.0f} KB in old_data/new_data, {delta / 1024:,.0f} KB in delta")
+        if args.report:
+            return
+
+        seen, after_id, total, skipped = set(), 0, 0, 0
+        started = time.perf_counter()
+        while True:
+            n, s, after_id = convert_batch(conn, after_id, args.batch_size, seen)
+            total += n
+            skipped += s
+            if n + s < args.batch_size:
+                break
+            print(f"  {total} rows converted, {skipped} skipped (up to id {after_id})")
+        print(f"Converted {total} rows in {time.perf_counter() - started:.1f} s")
+        if skipped:
+            print(f"Skipped {skipped} rows whose old_data/new_data can't be parsed; they are left unchanged")
+
+        rows, legacy, delta = sizes(conn)
+        print(f"Now: {legacy / 1024:,.0f} KB in old_data/new_data, {delta / 1024:,.0f} KB in delta "
+              f"(run OPTIMIZE TABLE meeting_logs to reclaim the space)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
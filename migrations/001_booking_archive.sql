@@ -0,0 +1,26 @@
+-- Cold storage for past bookings.
+-- One table for all rooms, range-partitioned by month on Day.
+-- archive_bookings.py adds a partition per month before moving rows in,
+-- so only the catch-all pmax partition is created here.
+
+CREATE TABLE IF NOT EXISTS meeting_bookings_archive (
+    room            TINYINT      NOT NULL,
+    Id              INT          NOT NULL,
+    Day             DATE         NOT NULL,
+    StartTime       TIME         NOT NULL,
+    EndTime         TIME         NOT NULL,
+    Agenda          VARCHAR(255),
+    PersonName      VARCHAR(255),
+    CreatedByUserId INT,
+    archived_at     TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Day, room, Id),
+    KEY idx_archive_room_day (room, Day, StartTime)
+)
+PARTITION BY RANGE COLUMNS (Day) (
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- Live tables are filtered by Day on every page load.
+CREATE INDEX idx_room1_day_start ON meeting_room1_bookings (Day, StartTime);
+CREATE INDEX idx_room2_day_start ON meeting_room2_bookings (Day, StartTime);
+CREATE INDEX idx_room3_day_start ON meeting_room3_bookings (Day, StartTime);
@@ -0,0 +1,115 @@
+-- Soft-delete for bookings.
+-- A deleted booking stays in its room table with deleted_at/deleted_by/delete_reason set,
+-- instead of being copied into deleted_meetings and removed.
+
+ALTER TABLE meeting_room1_bookings
+    ADD COLUMN deleted_at    DATETIME     NULL DEFAULT NULL,
+    ADD COLUMN deleted_by    INT          NULL DEFAULT NULL,
+    ADD COLUMN delete_reason VARCHAR(500) NULL DEFAULT NULL;
+ALTER TABLE meeting_room2_bookings
+    ADD COLUMN deleted_at    DATETIME     NULL DEFAULT NULL,
+    ADD COLUMN deleted_by    INT          NULL DEFAULT NULL,
+    ADD COLUMN delete_reason VARCHAR(500) NULL DEFAULT NULL;
+ALTER TABLE meeting_room3_bookings
+    ADD COLUMN deleted_at    DATETIME     NULL DEFAULT NULL,
+    ADD COLUMN deleted_by    INT          NULL DEFAULT NULL,
+    ADD COLUMN delete_reason VARCHAR(500) NULL DEFAULT NULL;
+
+ALTER TABLE meeting_bookings_archive
+    ADD COLUMN deleted_at    DATETIME     NULL DEFAULT NULL,
+    ADD COLUMN deleted_by    INT          NULL DEFAULT NULL,
+    ADD COLUMN delete_reason VARCHAR(500) NULL DEFAULT NULL;
+
+-- MySQL has no partial ("WHERE deleted_at IS NULL") indexes.
+-- Putting deleted_at right after Day gives the same effect: live queries
+-- (Day = ? AND deleted_at IS NULL) resolve both conditions inside the index.
+DROP INDEX idx_room1_day_start ON meeting_room1_bookings;
+DROP INDEX idx_room2_day_start ON meeting_room2_bookings;
+DROP INDEX idx_room3_day_start ON meeting_room3_bookings;
+CREATE INDEX idx_room1_live ON meeting_room1_bookings (Day, deleted_at, StartTime);
+CREATE INDEX idx_room2_live ON meeting_room2_bookings (Day, deleted_at, StartTime);
+CREATE INDEX idx_room3_live ON meeting_room3_bookings (Day, deleted_at, StartTime);
+
+-- Bring existing deleted_meetings rows back as soft-deleted rows.
+-- deleted_meetings never recorded the owner. It is taken from the meeting's CREATE audit row (its
+-- creator), and left NULL (unknown) when there is none, or several because the Id was reused.
+-- A meeting_id may since have been given to another booking (before MySQL 8.0, AUTO_INCREMENT restarts
+-- from MAX(Id) + 1 after a server restart). Such rows can't take their Id back in the room table, nor
+-- can all but the latest of several deleted meetings with one Id. They go to meeting_bookings_archive
+-- instead, which the Deleted Meetings view reads as well.
+
+INSERT INTO meeting_bookings_archive
+    (room, Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId, deleted_at, deleted_by, delete_reason)
+SELECT 1, d.meeting_id, d.Day, d.StartTime, d.EndTime, d.Agenda, d.PersonName,
+    (SELECT MAX(l.created_by_user_id) FROM meeting_logs l
+     WHERE l.room = 1 AND l.meeting_id = d.meeting_id AND l.action_type = 'CREATE' HAVING COUNT(*) = 1),
+    d.deleted_at, d.deleted_by_user_id, d.reason
+FROM deleted_meetings d
+WHERE d.room = 1 AND (EXISTS (SELECT 1 FROM meeting_room1_bookings b WHERE b.Id = d.meeting_id)
+       OR EXISTS (SELECT 1 FROM deleted_meetings d2
+                  WHERE d2.room = 1 AND d2.meeting_id = d.meeting_id AND d2.deleted_at > d.deleted_at));
+INSERT INTO meeting_room1_bookings
+    (Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId, deleted_at, deleted_by, delete_reason)
+SELECT d.meeting_id, d.Day, d.StartTime, d.EndTime, d.Agenda, d.PersonName,
+    (SELECT MAX(l.created_by_user_id) FROM meeting_logs l
+     WHERE l.room = 1 AND l.meeting_id = d.meeting_id AND l.action_type = 'CREATE' HAVING COUNT(*) = 1),
+    d.deleted_at, d.deleted_by_user_id, d.reason
+FROM deleted_meetings d
+WHERE d.room = 1 AND NOT (EXISTS (SELECT 1 FROM meeting_room1_bookings b WHERE b.Id = d.meeting_id)
+       OR EXISTS (SELECT 1 FROM deleted_meetings d2
+                  WHERE d2.room = 1 AND d2.meeting_id = d.meeting_id AND d2.deleted_at > d.deleted_at));
+
+INSERT INTO meeting_bookings_archive
+    (room, Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId, deleted_at, deleted_by, delete_reason)
+SELECT 2, d.meeting_id, d.Day, d.StartTime, d.EndTime, d.Agenda, d.PersonName,
+    (SELECT MAX(l.created_by_user_id) FROM meeting_logs l
+     WHERE l.room = 2 AND l.meeting_id = d.meeting_id AND l.action_type = 'CREATE' HAVING COUNT(*) = 1),
+    d.deleted_at, d.deleted_by_user_id, d.reason
+FROM deleted_meetings d
+WHERE d.room = 2 AND (EXISTS (SELECT 1 FROM meeting_room2_bookings b WHERE b.Id = d.meeting_id)
+       OR EXISTS (SELECT 1 FROM deleted_meetings d2
+                  WHERE d2.room = 2 AND d2.meeting_id = d.meeting_id AND d2.deleted_at > d.deleted_at));
+INSERT INTO meeting_room2_bookings
+    (Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId, deleted_at, deleted_by, delete_reason)
+SELECT d.meeting_id, d.Day, d.StartTime, d.EndTime, d.Agenda, d.PersonName,
+    (SELECT MAX(l.created_by_user_id) FROM meeting_logs l
+     WHERE l.room = 2 AND l.meeting_id = d.meeting_id AND l.action_type = 'CREATE' HAVING COUNT(*) = 1),
+    d.deleted_at, d.deleted_by_user_id, d.reason
+FROM deleted_meetings d
+WHERE d.room = 2 AND NOT (EXISTS (SELECT 1 FROM meeting_room2_bookings b WHERE b.Id = d.meeting_id)
+       OR EXISTS (SELECT 1 FROM deleted_meetings d2
+                  WHERE d2.room = 2 AND d2.meeting_id = d.meeting_id AND d2.deleted_at > d.deleted_at));
+
+INSERT INTO meeting_bookings_archive
+    (room, Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId, deleted_at, deleted_by, delete_reason)
+SELECT 3, d.meeting_id, d.Day, d.StartTime, d.EndTime, d.Agenda, d.PersonName,
+    (SELECT MAX(l.created_by_user_id) FROM meeting_logs l
+     WHERE l.room = 3 AND l.meeting_id = d.meeting_id AND l.action_type = 'CREATE' HAVING COUNT(*) = 1),
+    d.deleted_at, d.deleted_by_user_id, d.reason
+FROM deleted_meetings d
+WHERE d.room = 3 AND (EXISTS (SELECT 1 FROM meeting_room3_bookings b WHERE b.Id = d.meeting_id)
+       OR EXISTS (SELECT 1 FROM deleted_meetings d2
+                  WHERE d2.room = 3 AND d2.meeting_id = d.meeting_id AND d2.deleted_at > d.deleted_at));
+INSERT INTO meeting_room3_bookings
+    (Id, Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId, deleted_at, deleted_by, delete_reason)
+SELECT d.meeting_id, d.Day, d.StartTime, d.EndTime, d.Agenda, d.PersonName,
+    (SELECT MAX(l.created_by_user_id) FROM meeting_logs l
+     WHERE l.room = 3 AND l.meeting_id = d.meeting_id AND l.action_type = 'CREATE' HAVING COUNT(*) = 1),
+    d.deleted_at, d.deleted_by_user_id, d.reason
+FROM deleted_meetings d
+WHERE d.room = 3 AND NOT (EXISTS (SELECT 1 FROM meeting_room3_bookings b WHERE b.Id = d.meeting_id)
+       OR EXISTS (SELECT 1 FROM deleted_meetings d2
+                  WHERE d2.room = 3 AND d2.meeting_id = d.meeting_id AND d2.deleted_at > d.deleted_at));
+
+-- Check the copy: this lists the deleted_meetings rows found in neither place, and should return none.
+SELECT d.* FROM deleted_meetings d
+WHERE NOT EXISTS (SELECT 1 FROM meeting_room1_bookings b
+                  WHERE d.room = 1 AND b.Id = d.meeting_id AND b.deleted_at <=> d.deleted_at)
+  AND NOT EXISTS (SELECT 1 FROM meeting_room2_bookings b
+                  WHERE d.room = 2 AND b.Id = d.meeting_id AND b.deleted_at <=> d.deleted_at)
+  AND NOT EXISTS (SELECT 1 FROM meeting_room3_bookings b
+                  WHERE d.room = 3 AND b.Id = d.meeting_id AND b.deleted_at <=> d.deleted_at)
+  AND NOT EXISTS (SELECT 1 FROM meeting_bookings_archive a
+                  WHERE a.room = d.room AND a.Id = d.meeting_id AND a.deleted_at <=> d.deleted_at);
+
+-- deleted_meetings is no longer written to; keep it until the copy above has been checked.
@@ -0,0 +1,6 @@
+-- "My bookings": a user's upcoming bookings across dates.
+-- Lets the owner query read one user's rows in Day/StartTime order straight from the index.
+
+CREATE INDEX idx_room1_owner_day ON meeting_room1_bookings (CreatedByUserId, Day, StartTime);
+CREATE INDEX idx_room2_owner_day ON meeting_room2_bookings (CreatedByUserId, Day, StartTime);
+CREATE INDEX idx_room3_owner_day ON meeting_room3_bookings (CreatedByUserId, Day, StartTime);
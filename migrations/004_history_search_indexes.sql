@@ -0,0 +1,14 @@
+-- History search (history_search.py): person and agenda filters over any date range.
+
+-- Person name prefix, then date, so "meetings by X in the last 18 months" is one range scan.
+CREATE INDEX idx_room1_person_day ON meeting_room1_bookings (PersonName, Day, StartTime);
+CREATE INDEX idx_room2_person_day ON meeting_room2_bookings (PersonName, Day, StartTime);
+CREATE INDEX idx_room3_person_day ON meeting_room3_bookings (PersonName, Day, StartTime);
+CREATE INDEX idx_archive_person_day ON meeting_bookings_archive (PersonName, Day);
+
+-- Agenda keyword search. InnoDB does not support FULLTEXT on partitioned tables,
+-- so the archive has none; history_search.py matches archived agendas with LIKE
+-- inside the (partition-pruned) date range.
+CREATE FULLTEXT INDEX ft_room1_agenda ON meeting_room1_bookings (Agenda);
+CREATE FULLTEXT INDEX ft_room2_agenda ON meeting_room2_bookings (Agenda);
+CREATE FULLTEXT INDEX ft_room3_agenda ON meeting_room3_bookings (Agenda);
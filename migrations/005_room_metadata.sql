@@ -0,0 +1,16 @@
+-- Room metadata for the room recommender (rooms.py).
+-- equipment is a comma-separated list of tags, e.g. 'projector,video'.
+-- The seeded capacities and equipment are starting values: correct them for the actual rooms.
+
+CREATE TABLE IF NOT EXISTS meeting_rooms (
+    room      TINYINT      NOT NULL PRIMARY KEY,
+    name      VARCHAR(100) NOT NULL,
+    capacity  SMALLINT     NOT NULL,
+    equipment VARCHAR(255) NOT NULL DEFAULT ''
+);
+
+INSERT INTO meeting_rooms (room, name, capacity, equipment) VALUES
+    (1, 'Small Conference',     6,  'tv,whiteboard'),
+    (2, 'Big Conference',       20, 'projector,video,whiteboard,speakerphone'),
+    (3, '7th Floor Conference', 10, 'tv,video')
+ON DUPLICATE KEY UPDATE name = VALUES(name);
@@ -0,0 +1,16 @@
+-- Room closures (renovation, maintenance), written by closures.close_room().
+-- start_time/end_time NULL means the whole day. The clash check and the room
+-- recommender treat a closed room as booked, so nothing can be booked into a closure.
+
+CREATE TABLE IF NOT EXISTS room_closures (
+    id          INT          NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    room        TINYINT      NOT NULL,
+    day_from    DATE         NOT NULL,
+    day_to      DATE         NOT NULL,
+    start_time  TIME         NULL DEFAULT NULL,
+    end_time    TIME         NULL DEFAULT NULL,
+    reason      VARCHAR(255) NOT NULL,
+    created_by  INT          NOT NULL,
+    created_at  TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_closures_room_day (room, day_to, day_from)
+);
@@ -0,0 +1,17 @@
+-- Short-lived holds on a slot while someone fills in Create Booking (holds.py).
+-- A hold counts as a clash for every other session until expires_at; expired rows
+-- are ignored and cleaned up lazily.
+
+CREATE TABLE IF NOT EXISTS slot_holds (
+    id             INT         NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    room           TINYINT     NOT NULL,
+    Day            DATE        NOT NULL,
+    StartTime      TIME        NOT NULL,
+    EndTime        TIME        NOT NULL,
+    session_token  CHAR(32)    NOT NULL,
+    holder_user_id INT         NOT NULL,
+    expires_at     DATETIME    NOT NULL,
+    created_at     TIMESTAMP   NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_holds_session (session_token),
+    KEY idx_holds_room_day (room, Day, expires_at)
+);
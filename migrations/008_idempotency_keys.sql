@@ -0,0 +1,13 @@
+-- One row per saved Create Booking submission (idempotency.py).
+-- The primary key makes a second INSERT with the same key fail, so a double
+-- click or a repeated rerun can never create the booking twice.
+-- Rows are only needed for a short while; delete old ones whenever convenient:
+--   DELETE FROM booking_requests WHERE created_at < NOW() - INTERVAL 7 DAY;
+
+CREATE TABLE IF NOT EXISTS booking_requests (
+    idempotency_key CHAR(32)  NOT NULL PRIMARY KEY,
+    room            TINYINT   NOT NULL,
+    booking_id      INT       NOT NULL,
+    created_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_booking_requests_created (created_at)
+);
@@ -0,0 +1,16 @@
+-- Compact audit records (audit_log.py): one typed delta per meeting_logs row
+-- instead of the full old and new rows as stringified JSON.
+-- New rows write `delta` and leave old_data/new_data NULL. Convert existing
+-- rows afterwards with `python migrate_audit_log.py` (batched, resumable);
+-- until then the audit trail view decodes both kinds.
+
+ALTER TABLE meeting_logs
+    ADD COLUMN delta TEXT NULL AFTER room,
+    MODIFY old_data TEXT NULL,
+    MODIFY new_data TEXT NULL;
+
+-- One meeting's log, oldest first (audit trail view, migrate_audit_log.py)
+CREATE INDEX idx_meeting_logs_meeting ON meeting_logs (room, meeting_id, id);
+
+-- After migrate_audit_log.py has run, reclaim the space:
+--   OPTIMIZE TABLE meeting_logs;
@@ -0,0 +1,11 @@
+-- Retention for meeting_logs (log_retention.py): rows are archived by the
+-- time they were logged.
+-- Existing rows get the time this migration runs. If the table already has a
+-- creation timestamp, copy it over so old rows age out on time:
+--   UPDATE meeting_logs SET logged_at = <existing column>;
+
+ALTER TABLE meeting_logs
+    ADD COLUMN logged_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- Rows due for archiving (log_retention.py --report)
+CREATE INDEX idx_meeting_logs_logged_at ON meeting_logs (logged_at);
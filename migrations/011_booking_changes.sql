@@ -0,0 +1,37 @@
+-- Change sequence for cross-replica cache invalidation (schedule_cache.py).
+-- Every write to a room table appends the (room, Day) it touched; each app
+-- replica tails this table by seq and evicts only those cached schedules.
+-- Triggers do the appending, so every write path is covered (app CRUD,
+-- closures, reassignment, degraded-mode replay, archiving). Rows are only
+-- needed for a little while; schedule_cache.py prunes those older than
+-- [schedule_cache].keep_changes_hours.
+
+CREATE TABLE IF NOT EXISTS booking_changes (
+    seq        BIGINT      NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    room       TINYINT     NOT NULL,
+    Day        DATE        NOT NULL,
+    changed_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    KEY idx_booking_changes_changed_at (changed_at)
+);
+
+CREATE TRIGGER trg_room1_changes_insert AFTER INSERT ON meeting_room1_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) VALUES (1, NEW.Day);
+-- A booking moved to another day invalidates both days (UNION drops the duplicate otherwise)
+CREATE TRIGGER trg_room1_changes_update AFTER UPDATE ON meeting_room1_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) SELECT 1, NEW.Day UNION SELECT 1, OLD.Day;
+CREATE TRIGGER trg_room1_changes_delete AFTER DELETE ON meeting_room1_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) VALUES (1, OLD.Day);
+
+CREATE TRIGGER trg_room2_changes_insert AFTER INSERT ON meeting_room2_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) VALUES (2, NEW.Day);
+CREATE TRIGGER trg_room2_changes_update AFTER UPDATE ON meeting_room2_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) SELECT 2, NEW.Day UNION SELECT 2, OLD.Day;
+CREATE TRIGGER trg_room2_changes_delete AFTER DELETE ON meeting_room2_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) VALUES (2, OLD.Day);
+
+CREATE TRIGGER trg_room3_changes_insert AFTER INSERT ON meeting_room3_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) VALUES (3, NEW.Day);
+CREATE TRIGGER trg_room3_changes_update AFTER UPDATE ON meeting_room3_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) SELECT 3, NEW.Day UNION SELECT 3, OLD.Day;
+CREATE TRIGGER trg_room3_changes_delete AFTER DELETE ON meeting_room3_bookings FOR EACH ROW
+    INSERT INTO booking_changes (room, Day) VALUES (3, OLD.Day);
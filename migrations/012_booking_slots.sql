@@ -0,0 +1,90 @@
+-- Database-enforced non-overlap (slots.py).
+-- Every live booking claims one row per minute it covers in booking_slots, whose
+-- primary key (room, Day, minute) rejects a second claim. Triggers on the room
+-- tables keep the claims in step with every write, in the same statement, so an
+-- overlapping INSERT or UPDATE fails with a duplicate key error (1062) on
+-- booking_slots and nothing is written. Minute n of the day is [n:00, n+1:00);
+-- times are entered to the minute, so back-to-back bookings never share one.
+--
+-- After running this file, claim the slots of existing bookings:
+--   python slots.py --backfill
+
+CREATE TABLE IF NOT EXISTS slot_minutes (
+    minute SMALLINT NOT NULL PRIMARY KEY
+);
+
+SET SESSION cte_max_recursion_depth = 1440;
+INSERT IGNORE INTO slot_minutes (minute)
+WITH RECURSIVE m (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM m WHERE n < 1439)
+SELECT n FROM m;
+
+CREATE TABLE IF NOT EXISTS booking_slots (
+    room       TINYINT  NOT NULL,
+    Day        DATE     NOT NULL,
+    minute     SMALLINT NOT NULL,
+    booking_id INT      NOT NULL,
+    PRIMARY KEY (room, Day, minute),
+    KEY idx_booking_slots_booking (room, booking_id)
+);
+
+-- Claims are released before an UPDATE that moves, resizes, deletes or restores a
+-- booking and taken again after it; edits of agenda or name leave them alone.
+CREATE TRIGGER trg_room1_slots_insert AFTER INSERT ON meeting_room1_bookings FOR EACH ROW
+    INSERT INTO booking_slots (room, Day, minute, booking_id)
+    SELECT 1, NEW.Day, minute, NEW.Id FROM slot_minutes
+    WHERE NEW.deleted_at IS NULL
+      AND minute >= FLOOR(TIME_TO_SEC(NEW.StartTime) / 60) AND minute < CEIL(TIME_TO_SEC(NEW.EndTime) / 60);
+CREATE TRIGGER trg_room1_slots_release BEFORE UPDATE ON meeting_room1_bookings FOR EACH ROW
+    DELETE FROM booking_slots
+    WHERE room = 1 AND booking_id = OLD.Id
+      AND NOT (NEW.Day <=> OLD.Day AND NEW.StartTime <=> OLD.StartTime AND NEW.EndTime <=> OLD.EndTime
+               AND NEW.deleted_at <=> OLD.deleted_at);
+CREATE TRIGGER trg_room1_slots_claim AFTER UPDATE ON meeting_room1_bookings FOR EACH ROW
+    INSERT INTO booking_slots (room, Day, minute, booking_id)
+    SELECT 1, NEW.Day, minute, NEW.Id FROM slot_minutes
+    WHERE NEW.deleted_at IS NULL
+      AND NOT (NEW.Day <=> OLD.Day AND NEW.StartTime <=> OLD.StartTime AND NEW.EndTime <=> OLD.EndTime
+               AND NEW.deleted_at <=> OLD.deleted_at)
+      AND minute >= FLOOR(TIME_TO_SEC(NEW.StartTime) / 60) AND minute < CEIL(TIME_TO_SEC(NEW.EndTime) / 60);
+CREATE TRIGGER trg_room1_slots_delete AFTER DELETE ON meeting_room1_bookings FOR EACH ROW
+    DELETE FROM booking_slots WHERE room = 1 AND booking_id = OLD.Id;
+
+CREATE TRIGGER trg_room2_slots_insert AFTER INSERT ON meeting_room2_bookings FOR EACH ROW
+    INSERT INTO booking_slots (room, Day, minute, booking_id)
+    SELECT 2, NEW.Day, minute, NEW.Id FROM slot_minutes
+    WHERE NEW.deleted_at IS NULL
+      AND minute >= FLOOR(TIME_TO_SEC(NEW.StartTime) / 60) AND minute < CEIL(TIME_TO_SEC(NEW.EndTime) / 60);
+CREATE TRIGGER trg_room2_slots_release BEFORE UPDATE ON meeting_room2_bookings FOR EACH ROW
+    DELETE FROM booking_slots
+    WHERE room = 2 AND booking_id = OLD.Id
+      AND NOT (NEW.Day <=> OLD.Day AND NEW.StartTime <=> OLD.StartTime AND NEW.EndTime <=> OLD.EndTime
+               AND NEW.deleted_at <=> OLD.deleted_at);
+CREATE TRIGGER trg_room2_slots_claim AFTER UPDATE ON meeting_room2_bookings FOR EACH ROW
+    INSERT INTO booking_slots (room, Day, minute, booking_id)
+    SELECT 2, NEW.Day, minute, NEW.Id FROM slot_minutes
+    WHERE NEW.deleted_at IS NULL
+      AND NOT (NEW.Day <=> OLD.Day AND NEW.StartTime <=> OLD.StartTime AND NEW.EndTime <=> OLD.EndTime
+               AND NEW.deleted_at <=> OLD.deleted_at)
+      AND minute >= FLOOR(TIME_TO_SEC(NEW.StartTime) / 60) AND minute < CEIL(TIME_TO_SEC(NEW.EndTime) / 60);
+CREATE TRIGGER trg_room2_slots_delete AFTER DELETE ON meeting_room2_bookings FOR EACH ROW
+    DELETE FROM booking_slots WHERE room = 2 AND booking_id = OLD.Id;
+
+CREATE TRIGGER trg_room3_slots_insert AFTER INSERT ON meeting_room3_bookings FOR EACH ROW
+    INSERT INTO booking_slots (room, Day, minute, booking_id)
+    SELECT 3, NEW.Day, minute, NEW.Id FROM slot_minutes
+    WHERE NEW.deleted_at IS NULL
+      AND minute >= FLOOR(TIME_TO_SEC(NEW.StartTime) / 60) AND minute < CEIL(TIME_TO_SEC(NEW.EndTime) / 60);
+CREATE TRIGGER trg_room3_slots_release BEFORE UPDATE ON meeting_room3_bookings FOR EACH ROW
+    DELETE FROM booking_slots
+    WHERE room = 3 AND booking_id = OLD.Id
+      AND NOT (NEW.Day <=> OLD.Day AND NEW.StartTime <=> OLD.StartTime AND NEW.EndTime <=> OLD.EndTime
+               AND NEW.deleted_at <=> OLD.deleted_at);
+CREATE TRIGGER trg_room3_slots_claim AFTER UPDATE ON meeting_room3_bookings FOR EACH ROW
+    INSERT INTO booking_slots (room, Day, minute, booking_id)
+    SELECT 3, NEW.Day, minute, NEW.Id FROM slot_minutes
+    WHERE NEW.deleted_at IS NULL
+      AND NOT (NEW.Day <=> OLD.Day AND NEW.StartTime <=> OLD.StartTime AND NEW.EndTime <=> OLD.EndTime
+               AND NEW.deleted_at <=> OLD.deleted_at)
+      AND minute >= FLOOR(TIME_TO_SEC(NEW.StartTime) / 60) AND minute < CEIL(TIME_TO_SEC(NEW.EndTime) / 60);
+CREATE TRIGGER trg_room3_slots_delete AFTER DELETE ON meeting_room3_bookings FOR EACH ROW
+    DELETE FROM booking_slots WHERE room = 3 AND booking_id = OLD.Id;
@@ -0,0 +1,35 @@
+-- Order the booking_changes triggers (011) after the slot claims (012).
+-- Triggers for the same event run in creation order, so an INSERT or UPDATE
+-- rejected by booking_slots (1062) had already taken a booking_changes seq.
+-- The statement rolls back, but an AUTO_INCREMENT value is never given back:
+-- every rejected clash left a gap in the change sequence, which each app
+-- replica then looks up again for [schedule_cache].gap_seconds. Recreated with
+-- FOLLOWS, the change row is only appended once the slots are claimed.
+-- Deletes never clash, so their triggers stay as they are.
+
+DROP TRIGGER IF EXISTS trg_room1_changes_insert;
+CREATE TRIGGER trg_room1_changes_insert AFTER INSERT ON meeting_room1_bookings FOR EACH ROW
+    FOLLOWS trg_room1_slots_insert
+    INSERT INTO booking_changes (room, Day) VALUES (1, NEW.Day);
+DROP TRIGGER IF EXISTS trg_room1_changes_update;
+CREATE TRIGGER trg_room1_changes_update AFTER UPDATE ON meeting_room1_bookings FOR EACH ROW
+    FOLLOWS trg_room1_slots_claim
+    INSERT INTO booking_changes (room, Day) SELECT 1, NEW.Day UNION SELECT 1, OLD.Day;
+
+DROP TRIGGER IF EXISTS trg_room2_changes_insert;
+CREATE TRIGGER trg_room2_changes_insert AFTER INSERT ON meeting_room2_bookings FOR EACH ROW
+    FOLLOWS trg_room2_slots_insert
+    INSERT INTO booking_changes (room, Day) VALUES (2, NEW.Day);
+DROP TRIGGER IF EXISTS trg_room2_changes_update;
+CREATE TRIGGER trg_room2_changes_update AFTER UPDATE ON meeting_room2_bookings FOR EACH ROW
+    FOLLOWS trg_room2_slots_claim
+    INSERT INTO booking_changes (room, Day) SELECT 2, NEW.Day UNION SELECT 2, OLD.Day;
+
+DROP TRIGGER IF EXISTS trg_room3_changes_insert;
+CREATE TRIGGER trg_room3_changes_insert AFTER INSERT ON meeting_room3_bookings FOR EACH ROW
+    FOLLOWS trg_room3_slots_insert
+    INSERT INTO booking_changes (room, Day) VALUES (3, NEW.Day);
+DROP TRIGGER IF EXISTS trg_room3_changes_update;
+CREATE TRIGGER trg_room3_changes_update AFTER UPDATE ON meeting_room3_bookings FOR EACH ROW
+    FOLLOWS trg_room3_slots_claim
+    INSERT INTO booking_changes (room, Day) SELECT 3, NEW.Day UNION SELECT 3, OLD.Day;
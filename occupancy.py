@@ -0,0 +1,147 @@
+"""
+Month occupancy heatmap: booked minutes per room per day against the booking window.
+
+load_month() runs one grouped aggregate query over the live room tables and
+the archive for the whole month. Each booking is clipped to the window (by
+default 09:00-21:00), and the result comes back as at most rooms x days
+rows. These go into a rooms x days NumPy matrix of booked minutes (uint16,
+about 200 bytes a month). The page draws the heatmap and its summary from
+that matrix.
+
+Months that have ended no longer change (ended meetings can't be edited or
+deleted), so their matrices are kept in a small per-process LRU and shared
+by every session. The current and future months are queried each time.
+"""
+import calendar
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from lazy_imports import LazyModule
+from db import get_read_connection, ROOM_TABLES, ROOM_NAMES, ARCHIVE_TABLE
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+alt = LazyModule("altair")
+
+ROOMS = list(ROOM_TABLES)
+PAST_MONTHS_CACHED = 60
+SATURATED = 0.9  # share of the window booked from which a room-day counts as saturated
+
+_past = OrderedDict()  # (year, month, window) -> Occupancy, least recently used first
+_lock = threading.Lock()
+
+stats = {"queries": 0, "cache_hits": 0}
+
+
+class Occupancy:
+    """Booked minutes of one month as a rooms x days matrix (rows in ROOMS order)."""
+
+    __slots__ = ("year", "month", "window_minutes", "minutes")
+
+    def __init__(self, year, month, window_minutes, minutes):
+        self.year = year
+        self.month = month
+        self.window_minutes = window_minutes
+        self.minutes = minutes
+
+    @property
+    def days(self):
+        return self.minutes.shape[1]
+
+    def ratio(self):
+        """Share of the window booked, 0..1, same shape as minutes."""
+        return np.minimum(self.minutes / self.window_minutes, 1.0)
+
+    def summary(self):
+        """Per room: average occupancy, busiest day and number of saturated days (working days only)."""
+        ratio = self.ratio()
+        weekdays = np.array([date(self.year, self.month, d + 1).weekday() < 5 for d in range(self.days)])
+        out = []
+        for i, room in enumerate(ROOMS):
+            busiest = int(ratio[i].argmax())
+            out.append({
+                "Room": ROOM_NAMES[room],
+                "Average (working days)": f"{ratio[i][weekdays].mean() * 100:.0f}%" if weekdays.any() else "-",
+                "Busiest day": f"{busiest + 1:02d}-{self.month:02d}-{self.year} ({ratio[i, busiest] * 100:.0f}%)",
+                f"Days ≥ {SATURATED * 100:.0f}%": int((ratio[i] >= SATURATED).sum()),
+                "Booked hours": round(int(self.minutes[i].sum()) / 60, 1),
+            })
+        return out
+
+    def chart(self):
+        """Altair heatmap: one cell per room and day, coloured by the share of the window booked."""
+        ratio = self.ratio()
+        room_idx, day_idx = np.indices(ratio.shape)
+        frame = pd.DataFrame({
+            "Room": [ROOM_NAMES[ROOMS[i]] for i in room_idx.ravel()],
+            "Day": day_idx.ravel() + 1,
+            "Weekday": [calendar.day_abbr[date(self.year, self.month, d + 1).weekday()] for d in day_idx.ravel()],
+            "Booked %": (ratio.ravel() * 100).round(0),
+            "Booked minutes": self.minutes.ravel().astype(int),
+        })
+        return alt.Chart(frame).mark_rect(stroke="white").encode(
+            x=alt.X("Day:O", title=None),
+            y=alt.Y("Room:N", title=None, sort=[ROOM_NAMES[n] for n in ROOMS]),
+            color=alt.Color("Booked %:Q", scale=alt.Scale(domain=[0, 100], scheme="orangered")),
+            tooltip=["Room", "Day", "Weekday", "Booked %", "Booked minutes"],
+        ).properties(height=60 * len(ROOMS))
+
+
+def _query(month_start, next_month_start, window_start, window_end):
+    """One grouped aggregate over all rooms and the archive: rows of (room, Day, booked minutes)."""
+    clipped = ("GREATEST(0, TIME_TO_SEC(LEAST(EndTime, %s)) - TIME_TO_SEC(GREATEST(StartTime, %s))) DIV 60")
+    selects = [
+        f"SELECT {room} AS room, Day, {clipped} AS minutes FROM {table} "
+        f"WHERE Day >= %s AND Day < %s AND deleted_at IS NULL"
+        for room, table in ROOM_TABLES.items()
+    ]
+    selects.append(
+        f"SELECT room, Day, {clipped} AS minutes FROM {ARCHIVE_TABLE} "
+        f"WHERE Day >= %s AND Day < %s AND deleted_at IS NULL"
+    )
+    q = f"SELECT room, Day, SUM(minutes) AS minutes FROM ({' UNION ALL '.join(selects)}) b GROUP BY room, Day"
+    params = (window_end, window_start, month_start, next_month_start) * len(selects)
+
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(q, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def load_month(year, month, min_hour, max_hour, today=None):
+    """Occupancy of a month against the window min_hour:00 to (max_hour + 1):00."""
+    today = today or date.today()
+    key = (year, month, min_hour, max_hour)
+    past = (year, month) < (today.year, today.month)
+    if past:
+        with _lock:
+            cached = _past.get(key)
+            if cached is not None:
+                _past.move_to_end(key)
+                stats["cache_hits"] += 1
+                return cached
+
+    month_start = date(year, month, 1)
+    next_month_start = date(year + month // 12, month % 12 + 1, 1)
+    days = (next_month_start - month_start).days
+    rows = _query(month_start, next_month_start, f"{min_hour:02d}:00:00", f"{max_hour + 1:02d}:00:00")
+    stats["queries"] += 1
+
+    minutes = np.zeros((len(ROOMS), days), dtype=np.uint16)
+    if rows:
+        rooms, days_, booked = zip(*rows)
+        minutes[[ROOMS.index(r) for r in rooms], [d.day - 1 for d in days_]] = \
+            np.minimum(np.array(booked, dtype=np.int64), np.iinfo(np.uint16).max)
+    occupancy = Occupancy(year, month, (max_hour + 1 - min_hour) * 60, minutes)
+
+    if past:
+        with _lock:
+            _past[key] = occupancy
+            while len(_past) > PAST_MONTHS_CACHED:
+                _past.popitem(last=False)
+    return occupancy
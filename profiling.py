@@ -0,0 +1,202 @@
+"""
+On-demand cProfile of one session's reruns.
+
+An admin asks for it on the Profiles page ("profile my next N reruns") or by
+opening the app with ?profile=1 (every rerun of that tab while the parameter
+is there). At the top of app.py, requested() says whether this rerun should
+be profiled. If so, run_profiled() executes the script once more under
+cProfile, on the same thread and script-run context, so every element is
+drawn as usual. The outer run then stops. st.rerun() and st.stop() end the
+inner run with an exception; the profile is saved either way, with that
+outcome. Other sessions are never profiled.
+
+Each profile is a pstats file plus a small JSON sidecar (page, user,
+duration, outcome) in a bounded directory. The oldest are deleted once
+there are more than max_profiles or they take more than max_mb. The Profiles
+page lists them and shows the top functions and a call tree (top_functions,
+call_tree). A file can also be downloaded for snakeviz and similar tools.
+
+Optional settings in secrets.toml:
+
+    [profiling]
+    dir = "logs/profiles"
+    max_profiles = 50
+    max_mb = 50.0
+"""
+import cProfile
+import glob
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import streamlit as st
+
+DEFAULTS = {
+    "dir": "logs/profiles",
+    "max_profiles": 50,
+    "max_mb": 50.0,
+}
+SORTS = {"cumulative": "Cumulative ms", "own time": "Own ms", "calls": "Calls"}
+
+_local = threading.local()  # script runs are one thread per session
+
+
+def settings():
+    try:
+        configured = dict(st.secrets.get("profiling", {}))
+    except Exception:  # no secrets file
+        configured = {}
+    return {k: type(v)(configured.get(k, v)) for k, v in DEFAULTS.items()}
+
+
+# -------------------------
+# Capture
+# -------------------------
+def requested():
+    """True if this rerun of the session should be profiled (admins only)."""
+    if getattr(_local, "active", False) or not st.session_state.get("is_admin"):
+        return False
+    return st.query_params.get("profile") == "1" or st.session_state.get("profile_runs", 0) > 0
+
+
+def run_profiled(script_path):
+    """Run the app script under cProfile, save the profile, then stop this (outer) run."""
+    if st.session_state.get("profile_runs", 0) > 0:
+        st.session_state.profile_runs -= 1
+    page = st.session_state.get("page") or "Login"
+    username = (st.session_state.get("user") or {}).get("username", "")
+
+    # Compiled outside the profile, so it shows the script itself from <module> down
+    with open(script_path, encoding="utf-8") as f:
+        code = compile(f.read(), script_path, "exec")
+    namespace = {"__name__": "__main__", "__file__": script_path}
+
+    profiler = cProfile.Profile()
+    outcome = "completed"
+    _local.active = True
+    t0 = time.perf_counter()
+    try:
+        profiler.enable()
+        exec(code, namespace)
+    except BaseException as e:
+        # RerunException / StopException are how st.rerun() and st.stop() end a run
+        outcome = {"RerunException": "rerun", "StopException": "stopped"}.get(type(e).__name__,
+                                                                             f"error: {type(e).__name__}")
+        raise
+    finally:
+        profiler.disable()
+        _local.active = False
+        try:
+            save(profiler, page, username, outcome, (time.perf_counter() - t0) * 1000)
+        except OSError as e:
+            print(f"Saving profile failed: {e}")
+    st.stop()
+
+
+def save(profiler, page, username, outcome, duration_ms):
+    """Write profile + sidecar, then prune the directory to its limits. Returns the profile path."""
+    cfg = settings()
+    os.makedirs(cfg["dir"], exist_ok=True)
+    now = datetime.now()
+    stem = os.path.join(cfg["dir"], f"{now:%Y%m%d-%H%M%S-%f}-{page.replace(' ', '_')}")
+    profiler.dump_stats(stem + ".prof")
+    with open(stem + ".json", "w", encoding="utf-8") as f:
+        json.dump({"at": now.isoformat(timespec="seconds"), "page": page, "user": username,
+                   "outcome": outcome, "duration_ms": round(duration_ms, 1)}, f)
+    prune(cfg["dir"], cfg["max_profiles"], cfg["max_mb"])
+    return stem + ".prof"
+
+
+def prune(directory, max_profiles, max_mb):
+    """Delete the oldest profiles beyond max_profiles files or max_mb in total."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.prof")))  # names start with the time
+    sizes = [os.path.getsize(p) for p in paths]
+    while paths and (len(paths) > max_profiles or sum(sizes) > max_mb * 1024 * 1024):
+        oldest = paths.pop(0)
+        sizes.pop(0)
+        for path in (oldest, oldest[:-len(".prof")] + ".json"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# -------------------------
+# Reading
+# -------------------------
+def list_profiles(directory=None):
+    """Stored profiles, newest first: sidecar fields plus 'path' and 'kb'."""
+    directory = directory or settings()["dir"]
+    out = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.prof")), reverse=True):
+        try:
+            with open(path[:-len(".prof")] + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {"at": os.path.basename(path)[:15], "page": "?", "user": "", "outcome": "?", "duration_ms": None}
+        out.append(dict(meta, path=path, kb=round(os.path.getsize(path) / 1024, 1)))
+    return out
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-in, e.g. <method 'execute' of ...>
+    parts = filename.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        parts = parts[parts.index("site-packages") + 1:]
+    else:
+        parts = parts[-1:]
+    return f"{name} ({'/'.join(parts)}:{line})"
+
+
+def top_functions(path, sort="cumulative", limit=50):
+    """(rows for st.dataframe, total seconds): the functions with the most time, by `sort` (see SORTS)."""
+    stats = pstats.Stats(path)
+    rows = [
+        {
+            "Function": _label(func),
+            "Calls": nc,
+            "Own ms": round(tt * 1000, 2),
+            "Cumulative ms": round(ct * 1000, 2),
+            "Per call ms": round(ct * 1000 / nc, 3) if nc else 0.0,
+        }
+        for func, (cc, nc, tt, ct, callers) in stats.stats.items()
+    ]
+    rows.sort(key=lambda r: r[SORTS[sort]], reverse=True)
+    return rows[:limit], stats.total_tt
+
+
+def call_tree(path, max_depth=12, min_share=0.01):
+    """
+    The call tree as indented text lines ("cumulative ms  function"), from the
+    script run down. Calls under min_share of the total are left out, and
+    recursion is cut at its first repeat.
+    """
+    stats = pstats.Stats(path)
+    callees = defaultdict(dict)
+    roots = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        if not callers:
+            roots.append((ct, func))
+        for caller, caller_stats in callers.items():
+            callees[caller][func] = caller_stats[3]  # cumulative time of func when called from caller
+    total = max((ct for ct, _ in roots), default=0.0) or stats.total_tt
+    lines = []
+
+    def walk(func, ct, depth, path_):
+        lines.append(f"{'  ' * depth}{ct * 1000:9.1f} ms  {_label(func)}")
+        if depth >= max_depth:
+            return
+        for child, child_ct in sorted(callees[func].items(), key=lambda kv: kv[1], reverse=True):
+            if child_ct >= min_share * total and child not in path_:
+                walk(child, child_ct, depth + 1, path_ | {child})
+
+    for ct, func in sorted(roots, reverse=True):
+        if ct >= min_share * total:
+            walk(func, ct, 0, {func})
+    return lines
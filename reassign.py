@@ -0,0 +1,319 @@
+"""
+Move displaced meetings to other rooms.
+
+When a room becomes unavailable for a date range (see closures.py), its
+meetings keep their day and times and are moved to another room wherever one
+is free, instead of being cancelled.
+
+plan_reassignment() plans every move for the room and range in one pass:
+
+    - load the displaced meetings, and everything already occupying the
+      other rooms over the range (bookings, closures and live slot holds,
+      see holds.py), in one query per room
+    - solve(): per day, the meetings are intervals. Taking them earliest end
+      first, each goes to the room where it fits with the smallest idle gap
+      before it (best fit); ties go to the room closest in size to the
+      original. This is the classic interval-partitioning greedy, which
+      places as many meetings as possible when the other rooms are empty and
+      is a good heuristic around existing bookings.
+
+The returned plan is only a preview. apply_plan() then carries it out in one
+transaction with change_room semantics; move_and_close() does the same and
+closes the room in that transaction. Each booking is inserted into its new
+room and deleted from the old one, with an UPDATE audit row that records the
+room change (see audit_log.py). The plan is re-checked first, and a
+booking that slips in after that is rejected by booking_slots (see slots.py),
+so it aborts the whole plan instead of double-booking.
+"""
+from bisect import bisect_right, insort
+from collections import defaultdict
+from datetime import date, datetime
+
+from lazy_imports import LazyModule
+import audit_log
+import closures
+import slots
+from bookings import Booking, time_to_str
+from db import get_connection, room_table, ROOM_TABLES, ROOM_NAMES, BOOKING_COLUMNS
+
+mysql = LazyModule("mysql")
+
+
+def _seconds(hhmmss):
+    return int(hhmmss[:2]) * 3600 + int(hhmmss[3:5]) * 60 + int(hhmmss[6:8])
+
+
+class Plan:
+    """Moves as (Booking, target room) pairs, and the bookings no room could take."""
+
+    __slots__ = ("room", "day_from", "day_to", "moves", "unplaced")
+
+    def __init__(self, room, day_from, day_to, moves, unplaced):
+        self.room = room
+        self.day_from = day_from
+        self.day_to = day_to
+        self.moves = moves
+        self.unplaced = unplaced
+
+    def rows(self):
+        """Preview rows for st.dataframe."""
+        out = [
+            {"Id": b.id, "Date": b.day.strftime("%d-%m-%Y"), "Start": b.start_display, "End": b.end_display,
+             "Agenda": b.agenda, "Person": b.person, "Move to": ROOM_NAMES[target]}
+            for b, target in self.moves
+        ]
+        out += [
+            {"Id": b.id, "Date": b.day.strftime("%d-%m-%Y"), "Start": b.start_display, "End": b.end_display,
+             "Agenda": b.agenda, "Person": b.person, "Move to": "— no free room —"}
+            for b in self.unplaced
+        ]
+        return out
+
+
+# -------------------------
+# Solver (no database)
+# -------------------------
+def solve(displaced, busy, targets):
+    """
+    displaced: Booking records to place. busy: {(room, day): [(start, end), ...]}
+    of intervals already taken, sorted and disjoint ('HH:MM:SS' strings); it
+    is updated in place with the planned moves. targets: candidate rooms, most
+    preferred first.
+    Returns (moves, unplaced).
+    """
+    moves, unplaced = [], []
+    for b in sorted(displaced, key=lambda b: (b.day, b.end, b.start, b.id)):
+        best = None
+        for rank, room in enumerate(targets):
+            taken = busy.setdefault((room, b.day), [])
+            i = bisect_right(taken, (b.start, "99:99:99"))
+            if i > 0 and taken[i - 1][1] > b.start:
+                continue
+            if i < len(taken) and taken[i][0] < b.end:
+                continue
+            gap = _seconds(b.start) - _seconds(taken[i - 1][1]) if i > 0 else _seconds(b.start)
+            if best is None or (gap, rank) < best[0]:
+                best = ((gap, rank), room)
+        if best is None:
+            unplaced.append(b)
+        else:
+            room = best[1]
+            insort(busy[(room, b.day)], (b.start, b.end))
+            moves.append((b, room))
+    return moves, unplaced
+
+
+# -------------------------
+# Loading
+# -------------------------
+def target_rooms(cursor, room):
+    """Other rooms, those at least as big as `room` first (smallest first), then the rest (largest first)."""
+    cursor.execute("SELECT room, capacity FROM meeting_rooms")
+    capacity = {r["room"]: r["capacity"] for r in cursor.fetchall()}
+    own = capacity.get(room, 0)
+    others = [n for n in ROOM_TABLES if n != room]
+    return sorted(others, key=lambda n: (capacity.get(n, 0) < own, abs(capacity.get(n, 0) - own), n))
+
+
+def _displaced(cursor, room, day_from, day_to, start_time=None, end_time=None):
+    q = f"""
+        SELECT {BOOKING_COLUMNS} FROM {room_table(room)}
+        WHERE Day >= %s AND Day <= %s AND deleted_at IS NULL AND TIMESTAMP(Day, EndTime) > %s
+    """
+    params = [day_from, day_to, datetime.now()]
+    if start_time is not None:
+        q += " AND NOT (EndTime <= %s OR StartTime >= %s)"
+        params += [start_time, end_time]
+    cursor.execute(q, tuple(params))
+    return [Booking.from_row(room, row) for row in cursor.fetchall()]
+
+
+def _busy(cursor, rooms, day_from, day_to):
+    """
+    {(room, day): sorted disjoint intervals} of live bookings, closures and
+    unexpired slot holds in `rooms` over the range. A held window is about to
+    be booked by whoever holds it, so no meeting is moved onto it.
+    """
+    busy = defaultdict(list)
+    for n in rooms:
+        cursor.execute(
+            f"SELECT Day, StartTime, EndTime FROM {room_table(n)} "
+            f"WHERE Day >= %s AND Day <= %s AND deleted_at IS NULL",
+            (day_from, day_to)
+        )
+        for row in cursor.fetchall():
+            busy[(n, row["Day"])].append((time_to_str(row["StartTime"]), time_to_str(row["EndTime"])))
+
+    cursor.execute(
+        f"""
+        SELECT room, day_from, day_to, start_time, end_time FROM room_closures
+        WHERE room IN ({", ".join(["%s"] * len(rooms))}) AND day_from <= %s AND day_to >= %s
+        """,
+        (*rooms, day_to, day_from)
+    )
+    for c in cursor.fetchall():
+        span = (time_to_str(c["start_time"]), time_to_str(c["end_time"])) if c["start_time"] is not None \
+            else ("00:00:00", "23:59:59")
+        d = max(c["day_from"], day_from)
+        while d <= min(c["day_to"], day_to):
+            busy[(c["room"], d)].append(span)
+            d = date.fromordinal(d.toordinal() + 1)
+
+    cursor.execute(
+        f"""
+        SELECT room, Day, StartTime, EndTime FROM slot_holds
+        WHERE room IN ({", ".join(["%s"] * len(rooms))}) AND Day >= %s AND Day <= %s AND expires_at > NOW()
+        """,
+        (*rooms, day_from, day_to)
+    )
+    for h in cursor.fetchall():
+        busy[(h["room"], h["Day"])].append((time_to_str(h["StartTime"]), time_to_str(h["EndTime"])))
+
+    # Merge overlaps (a closure over a booking, say) so each room-day is a sorted list of disjoint intervals
+    for key, intervals in busy.items():
+        merged = []
+        for s, e in sorted(intervals):
+            if merged and s < merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+            else:
+                merged.append((s, e))
+        busy[key] = merged
+    return busy
+
+
+def plan_reassignment(room, day_from, day_to, start_time=None, end_time=None):
+    """Preview: where each unfinished meeting of `room` in the range (and window) would go."""
+    room_table(room)  # validates the room number
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        targets = target_rooms(cursor, room)
+        displaced = _displaced(cursor, room, day_from, day_to, start_time, end_time)
+        busy = _busy(cursor, targets, day_from, day_to) if displaced else {}
+    finally:
+        cursor.close()
+        conn.close()
+    moves, unplaced = solve(displaced, busy, targets)
+    return Plan(room, day_from, day_to, moves, unplaced)
+
+
+# -------------------------
+# Applying
+# -------------------------
+def apply_plan(plan, username, user_id):
+    """
+    Carry out plan.moves in one transaction. Returns (success, error_message).
+    The booking owner is kept; the acting admin is recorded in the audit log.
+    """
+    if not plan.moves:
+        return True, None
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        err = _move(cursor, plan, username, user_id)
+        if err:
+            conn.rollback()
+            return False, err
+        conn.commit()
+        return True, None
+    except mysql.connector.Error as e:
+        conn.rollback()
+        if slots.is_clash(e):
+            return False, "A target room was booked in the meantime. Preview again."
+        return False, f"Failed to move bookings: {e.msg}"
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def move_and_close(plan, reason, username, user_id, start_time=None, end_time=None):
+    """
+    Carry out plan.moves and close plan.room over the plan's range (see
+    closures.close_room) in one transaction, so the moves are never applied
+    without the closure or the other way round.
+    Returns (result, error_message); result is close_room()'s dict plus "moved".
+    """
+    closures.check_window(plan.room, plan.day_from, plan.day_to, start_time, end_time)
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        err = _move(cursor, plan, username, user_id) if plan.moves else None
+        if err:
+            conn.rollback()
+            return None, err
+        result = closures.apply_closure(
+            cursor, plan.room, plan.day_from, plan.day_to, reason, username, user_id, start_time, end_time
+        )
+        conn.commit()
+        result["moved"] = len(plan.moves)
+        return result, None
+    except mysql.connector.Error as e:
+        conn.rollback()
+        if slots.is_clash(e):
+            return None, "A target room was booked in the meantime. Preview again."
+        return None, f"Failed to close the room (nothing was moved or cancelled): {e.msg}"
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _move(cursor, plan, username, user_id):
+    """
+    The statements of apply_plan() inside the caller's transaction. Returns an
+    error message if the plan no longer holds (the caller rolls back), else None.
+    """
+    old_room = plan.room
+    old_table = room_table(old_room)
+    targets = sorted({target for _, target in plan.moves})
+    ids = [b.id for b, _ in plan.moves]
+    placeholders = ", ".join(["%s"] * len(ids))
+
+    # Lock the bookings being moved, then re-check the plan (no lock on the target rooms:
+    # booking_slots rejects an overlapping insert)
+    cursor.execute(
+        f"SELECT Id FROM {old_table} WHERE Id IN ({placeholders}) AND deleted_at IS NULL FOR UPDATE",
+        tuple(ids)
+    )
+    if len(cursor.fetchall()) != len(ids):
+        return "Some bookings were changed or deleted after the preview. Preview again."
+    busy = _busy(cursor, targets, plan.day_from, plan.day_to)
+    for b, target in plan.moves:
+        taken = busy[(target, b.day)]
+        if any(not (b.end <= s or b.start >= e) for s, e in taken):
+            return (f"{ROOM_NAMES[target]} is no longer free on {b.day:%d-%m-%Y} "
+                    f"{b.start_display}. Preview again.")
+        insort(taken, (b.start, b.end))
+
+    log_rows = []
+    for b, target in plan.moves:
+        cursor.execute(
+            f"""
+            INSERT INTO {room_table(target)} (Day, StartTime, EndTime, Agenda, PersonName, CreatedByUserId)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """,
+            (str(b.day), b.start, b.end, b.agenda, b.person, b.created_by)
+        )
+        log_rows.append((
+            username, user_id, "UPDATE", cursor.lastrowid, target,
+            audit_log.encode(b.as_row(), b.as_row(), rooms=(old_room, target)),
+            f"Room changed from {ROOM_NAMES[old_room]} to {ROOM_NAMES[target]}",
+        ))
+
+    cursor.execute(f"DELETE FROM {old_table} WHERE Id IN ({placeholders})", tuple(ids))
+    cursor.executemany(
+        """
+        INSERT INTO meeting_logs (username, created_by_user_id, action_type, meeting_id, room, delta, reason)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """,
+        log_rows
+    )
+    return None
@@ -0,0 +1,64 @@
+"""
+Room metadata and room recommendation.
+
+Capacity and equipment live in the meeting_rooms table
+(migrations/005_room_metadata.sql). recommend_rooms() answers "which room
+should I book for N people at this time": one prepared statement returns
+every room that seats them with a busy flag for the window, and the free
+ones are ranked smallest-fit-first so a 2-person call doesn't take the big
+room.
+"""
+from db import get_connection, run_statement, ROOM_TABLES, ROOM_AVAILABILITY
+
+EQUIPMENT = ("tv", "projector", "video", "whiteboard", "speakerphone")
+
+
+class RoomOption:
+    """A room that seats the group, with whether it is free in the window."""
+
+    __slots__ = ("room", "name", "capacity", "equipment", "free")
+
+    def __init__(self, room, name, capacity, equipment, free):
+        self.room = room
+        self.name = name
+        self.capacity = capacity
+        self.equipment = equipment
+        self.free = free
+
+    @classmethod
+    def from_row(cls, row):
+        equipment = frozenset(t.strip() for t in (row["equipment"] or "").split(",") if t.strip())
+        return cls(row["room"], row["name"], row["capacity"], equipment, not row["busy"])
+
+    @property
+    def label(self):
+        kit = ", ".join(sorted(self.equipment)) or "no equipment"
+        return f"{self.name} ({self.capacity} seats; {kit})"
+
+
+def room_options(attendees, day, start, end):
+    """RoomOption for every room with capacity >= attendees, free rooms first, smallest first."""
+    params = []
+    for _ in ROOM_TABLES:
+        params += [day, start, end, day, day, start, end]
+    params.append(attendees)
+
+    conn = get_connection()
+    try:
+        rows, _, _ = run_statement(conn, ROOM_AVAILABILITY, tuple(params))
+    finally:
+        conn.close()
+    return [RoomOption.from_row(row) for row in rows]
+
+
+def recommend_rooms(attendees, day, start, end, equipment=()):
+    """
+    Free rooms for `attendees` people on `day` between start and end
+    ('HH:MM:SS'), that have all of `equipment`, best fit first: fewest
+    spare seats, then room number.
+    """
+    needed = set(equipment)
+    return [
+        r for r in room_options(attendees, day, start, end)
+        if r.free and needed <= r.equipment
+    ]
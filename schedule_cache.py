@@ -0,0 +1,211 @@
+"""
+Per-process cache of day schedules, kept coherent across app replicas.
+
+Every write to a room table appends (room, Day) to booking_changes. Triggers
+do this (migrations/011_booking_changes.sql), so no write path can forget it:
+the app's CRUD functions, room closures, reassignment, the degraded-mode
+replay and the archive job are all covered. An UPDATE that moves a booking
+to another day appends both days.
+
+Each replica caches one list of bookings per (room, day) and tails the
+sequence: at most every poll_seconds, one primary-key range read of the
+entries after the last one seen. Each entry evicts exactly its (room, day),
+and the next load_bookings() reloads only the rooms that were evicted.
+
+Sequence numbers are allocated at insert time but become visible at commit,
+so a reader can see seq 12 before seq 11. Missing numbers are therefore
+looked up again by seq on later polls, for gap_seconds, before they are given
+up as rolled back; each poll still reads the range after the last seq once.
+A booking write rejected by the slot constraint (slots.py) takes no seq: the
+change triggers run after the slot claims (migrations/013). Other rollbacks,
+such as a failed closure, still leave gaps, which cost one seq IN lookup per
+poll until they expire.
+
+If a replica falls so far behind that it can't trust its position, it drops
+the whole cache. Entries also expire after max_age_seconds as a last safety
+net.
+
+Optional settings in secrets.toml:
+
+    [schedule_cache]
+    poll_seconds = 1.0
+    gap_seconds = 30
+    max_age_seconds = 300
+    keep_changes_hours = 24
+"""
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+
+from bookings import Booking, DaySchedule
+from db import get_connection, run_statement, ROOM_TABLES
+
+DEFAULTS = {
+    "poll_seconds": 1.0,
+    "gap_seconds": 30.0,
+    "max_age_seconds": 300.0,
+    "keep_changes_hours": 24.0,
+}
+POLL_BATCH = 1000
+PRUNE_EVERY_SECONDS = 3600
+
+_lock = threading.Lock()
+_entries = {}  # (room, day) -> (loaded_at, [Booking])
+_changed = {}  # (room, day) -> seq of its latest change seen, so a load racing a change isn't stored
+_tail = {"seq": None, "gaps": {}, "polled_at": 0.0, "pruned_at": 0.0}
+
+stats = {"hits": 0, "misses": 0, "evictions": 0, "flushes": 0, "polls": 0}
+
+
+def settings():
+    try:
+        configured = dict(st.secrets.get("schedule_cache", {}))
+    except Exception:  # no secrets file
+        configured = {}
+    return {k: float(configured.get(k, v)) for k, v in DEFAULTS.items()}
+
+
+# -------------------------
+# Tailing booking_changes
+# -------------------------
+def _evict(room, day, seq):
+    _changed[(room, day)] = seq
+    if _entries.pop((room, day), None) is not None:
+        stats["evictions"] += 1
+
+
+def flush():
+    with _lock:
+        _entries.clear()
+        _changed.clear()
+        stats["flushes"] += 1
+
+
+def _apply(rows, now, gap_seconds):
+    """Evict the (room, day) of each change and track sequence gaps. Called with _lock held."""
+    gaps = _tail["gaps"]
+    for row in rows:
+        seq = row["seq"]
+        if seq <= _tail["seq"] and seq not in gaps:
+            continue  # already applied
+        gaps.pop(seq, None)
+        for missing in range(_tail["seq"] + 1, seq):
+            gaps[missing] = now
+        _tail["seq"] = max(_tail["seq"], seq)
+        _evict(row["room"], row["Day"], seq)
+    for seq, since in list(gaps.items()):
+        if now - since > gap_seconds:
+            del gaps[seq]  # rolled back (or pruned): nothing will ever commit under it
+
+
+def poll(force=False, conn=None):
+    """Apply the changes other writers made since the last poll (rate-limited unless force)."""
+    cfg = settings()
+    now = time.monotonic()
+    if not force and now - _tail["polled_at"] < cfg["poll_seconds"]:
+        return
+    _tail["polled_at"] = now
+    stats["polls"] += 1
+
+    own = conn is None
+    conn = conn or get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if _tail["seq"] is None:
+            # Start from the current end of the sequence with an empty cache
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM booking_changes")
+            with _lock:
+                _tail["seq"] = cursor.fetchone()["seq"]
+                _entries.clear()
+                _changed.clear()
+            return
+
+        with _lock:
+            open_gaps = sorted(_tail["gaps"])
+            after = _tail["seq"]
+        for i in range(0, len(open_gaps), POLL_BATCH):
+            # Sequence numbers skipped earlier: only these are looked up again, not the range after them
+            batch = open_gaps[i:i + POLL_BATCH]
+            cursor.execute(
+                "SELECT seq, room, Day FROM booking_changes WHERE seq IN (%s)" % ", ".join(["%s"] * len(batch)),
+                tuple(batch)
+            )
+            rows = cursor.fetchall()
+            with _lock:
+                _apply(rows, time.monotonic(), cfg["gap_seconds"])
+
+        while True:
+            cursor.execute(
+                "SELECT seq, room, Day FROM booking_changes WHERE seq > %s ORDER BY seq LIMIT %s",
+                (after, POLL_BATCH)
+            )
+            rows = cursor.fetchall()
+            with _lock:
+                if rows and rows[0]["seq"] > _tail["seq"] + POLL_BATCH * 10 and not _tail["gaps"]:
+                    # Far behind (or the changes were pruned past us): start over
+                    _entries.clear()
+                    _changed.clear()
+                    stats["flushes"] += 1
+                _apply(rows, time.monotonic(), cfg["gap_seconds"])
+            if len(rows) < POLL_BATCH:
+                break
+            after = rows[-1]["seq"]
+
+        if now - _tail["pruned_at"] >= PRUNE_EVERY_SECONDS:
+            _tail["pruned_at"] = now
+            cursor.execute(
+                "DELETE FROM booking_changes WHERE changed_at < NOW() - INTERVAL %s HOUR LIMIT 10000",
+                (int(cfg["keep_changes_hours"]),)
+            )
+    finally:
+        cursor.close()
+        if own:
+            conn.close()
+
+
+# -------------------------
+# Cached loading
+# -------------------------
+def load_bookings(selected_day=None):
+    """
+    Same result as bookings.load_bookings(), served from this replica's cache.
+    Only (room, day) lists evicted by a change (or never loaded) are read from the database.
+    """
+    now = datetime.now()
+    day = selected_day or now.date()
+    if day < now.date():
+        return DaySchedule(day, {n: [] for n in ROOM_TABLES})
+
+    max_age = settings()["max_age_seconds"]
+    conn = get_connection()
+    try:
+        poll(conn=conn)
+        rooms = {}
+        t = time.monotonic()
+        for n in ROOM_TABLES:
+            with _lock:
+                hit = _entries.get((n, day))
+            if hit is not None and t - hit[0] <= max_age:
+                stats["hits"] += 1
+                rooms[n] = hit[1]
+                continue
+            stats["misses"] += 1
+            loaded_at = time.monotonic()
+            with _lock:
+                seen = _changed.get((n, day))
+            rows, _, _ = run_statement(conn, f"load_bookings_day/{n}", (day.strftime("%Y-%m-%d"),))
+            rooms[n] = [Booking.from_row(n, row) for row in rows]
+            with _lock:
+                # Another thread applied a change to this room-day meanwhile: ours may predate it
+                if _changed.get((n, day)) == seen:
+                    _entries[(n, day)] = (loaded_at, rooms[n])
+    finally:
+        conn.close()
+
+    if day == now.date():
+        # Cached lists hold the whole day; today only shows meetings that haven't ended
+        now_str = now.strftime("%H:%M:%S")
+        rooms = {n: [b for b in bookings if b.end >= now_str] for n, bookings in rooms.items()}
+    return DaySchedule(day, rooms)
@@ -0,0 +1,248 @@
+"""
+Read-only schedule service for door displays and calendar clients.
+
+Runs next to the Streamlit app and serves per-room, per-day schedules built
+from bookings.load_bookings():
+
+    GET /schedule?date=YYYY-MM-DD                 all rooms, JSON
+    GET /rooms/<room>/schedule?date=YYYY-MM-DD    one room, JSON
+    GET /rooms/<room>/schedule.ics?date=...       one room, iCalendar
+    GET /health
+
+<room> is the room number (1, 2, 3). date defaults to today.
+
+All requests for a day share one snapshot that is refreshed at most every
+--ttl seconds, and every response carries an ETag; a display that sends
+If-None-Match with an unchanged schedule gets an empty 304. Hundreds of
+displays polling therefore cost three queries per day per TTL.
+
+Only today and the next --cache-days days are kept in the snapshot; other
+dates are read for each request, so clients asking for arbitrary dates can't
+grow it. If the database can't be read, the previous snapshot of the day is
+served; without one the response is 503.
+
+    python schedule_service.py --port 8502 --ttl 30 --cache-days 14
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import mysql.connector
+
+from bookings import load_bookings
+from db import ROOM_NAMES
+
+DEFAULT_TTL = 30
+DEFAULT_CACHE_DAYS = 14
+
+
+# -------------------------
+# Rendering
+# -------------------------
+def booking_entries(bookings):
+    """Public fields of one room's Booking records (owner id is left out)."""
+    return [
+        {"id": b.id, "start": b.start[:5], "end": b.end[:5], "agenda": b.agenda, "person": b.person}
+        for b in bookings
+    ]
+
+
+def ics_escape(text):
+    text = "" if text is None else str(text)
+    return (text.replace("\\", "\\\\").replace(";", "\\;")
+                .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def render_ics(room_number, day, entries, stamp):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//PFEPL//Meeting Rooms//EN",
+        f"X-WR-CALNAME:{ics_escape(ROOM_NAMES[room_number])}",
+    ]
+    for e in entries:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:room{room_number}-{e['id']}@pfepl",
+            f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}",
+            f"DTSTART:{day:%Y%m%d}T{e['start'].replace(':', '')}00",
+            f"DTEND:{day:%Y%m%d}T{e['end'].replace(':', '')}00",
+            f"SUMMARY:{ics_escape(e['agenda'])}",
+            f"DESCRIPTION:{ics_escape(e['person'])}",
+            f"LOCATION:{ics_escape(ROOM_NAMES[room_number])}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+
+def render_json(payload):
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+# -------------------------
+# Shared snapshot
+# -------------------------
+class ScheduleSnapshot:
+    """
+    One cached copy of each requested day in the served window (today to
+    today + cache_days), shared by all request threads. Rendered bodies and
+    their ETags are built once per refresh, so a poll is a dict lookup. Only one
+    thread refreshes a given day; the others keep serving the previous snapshot
+    until it is replaced.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, cache_days=DEFAULT_CACHE_DAYS):
+        self.ttl = ttl
+        self.cache_days = cache_days
+        self._days = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    def get(self, day, key):
+        """
+        (body, etag) for key in ('all', 'json', room) / ('ics', room).
+        Raises mysql.connector.Error if the day can't be read and has no previous snapshot.
+        """
+        today = date.today()
+        if not today <= day <= today + timedelta(days=self.cache_days):
+            return self._build(day)["bodies"][key]  # outside the served window: not cached
+
+        entry = self._days.get(day)
+        if entry is None or time.monotonic() - entry["loaded_at"] >= self.ttl:
+            try:
+                entry = self._refresh(day, entry)
+            except mysql.connector.Error:
+                if entry is None:
+                    raise
+                # Database unreachable: keep serving the previous snapshot
+        return entry["bodies"][key]
+
+    def _refresh(self, day, stale):
+        with self._lock:
+            if day in self._refreshing and stale is not None:
+                return stale
+            self._refreshing.add(day)
+        try:
+            entry = self._build(day)
+            with self._lock:
+                self._days[day] = entry
+                # Drop days that have passed
+                for old in [d for d in self._days if d < date.today()]:
+                    del self._days[old]
+            return entry
+        finally:
+            with self._lock:
+                self._refreshing.discard(day)
+
+    def _build(self, day):
+        stamp = datetime.now(timezone.utc)
+        schedule = load_bookings(day)
+        rooms = {n: booking_entries(schedule.rooms[n]) for n in ROOM_NAMES}
+
+        bodies = {}
+
+        def put(key, body):
+            bodies[key] = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+
+        put("all", render_json({
+            "date": day.isoformat(),
+            "rooms": [
+                {"room": n, "name": ROOM_NAMES[n], "bookings": rooms[n]} for n in ROOM_NAMES
+            ],
+        }))
+        for n in ROOM_NAMES:
+            put(("json", n), render_json({
+                "date": day.isoformat(), "room": n, "name": ROOM_NAMES[n], "bookings": rooms[n],
+            }))
+            put(("ics", n), render_ics(n, day, rooms[n], stamp))
+        return {"loaded_at": time.monotonic(), "bodies": bodies}
+
+
+# -------------------------
+# HTTP
+# -------------------------
+class ScheduleHandler(BaseHTTPRequestHandler):
+    snapshot = None  # set by serve()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+
+        if parts == ["health"]:
+            return self._send(200, b"ok", "text/plain")
+
+        try:
+            day = date.fromisoformat(parse_qs(url.query).get("date", [date.today().isoformat()])[0])
+        except ValueError:
+            return self._send(400, b"date must be YYYY-MM-DD", "text/plain")
+
+        if parts == ["schedule"]:
+            key, ctype = "all", "application/json"
+        elif len(parts) == 3 and parts[0] == "rooms" and parts[2] in ("schedule", "schedule.ics"):
+            try:
+                room_number = int(parts[1])
+            except ValueError:
+                room_number = None
+            if room_number not in ROOM_NAMES:
+                return self._send(404, b"unknown room", "text/plain")
+            if parts[2] == "schedule.ics":
+                key, ctype = ("ics", room_number), "text/calendar; charset=utf-8"
+            else:
+                key, ctype = ("json", room_number), "application/json"
+        else:
+            return self._send(404, b"not found", "text/plain")
+
+        try:
+            body, etag = self.snapshot.get(day, key)
+        except mysql.connector.Error:
+            return self._send(503, b"schedule unavailable, try again later", "text/plain")
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            return self._send(304, b"", ctype, etag)
+        return self._send(200, body, ctype, etag)
+
+    def _send(self, status, body, ctype, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={self.snapshot.ttl}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # displays poll constantly; keep stdout quiet
+
+
+def serve(host="0.0.0.0", port=8502, ttl=DEFAULT_TTL, cache_days=DEFAULT_CACHE_DAYS):
+    ScheduleHandler.snapshot = ScheduleSnapshot(ttl, cache_days)
+    server = ThreadingHTTPServer((host, port), ScheduleHandler)
+    print(f"Schedule service on http://{host}:{port} (snapshot TTL {ttl}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only JSON/ICS room schedules.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL, help="Snapshot lifetime in seconds.")
+    parser.add_argument("--cache-days", type=int, default=DEFAULT_CACHE_DAYS,
+                        help="Days after today that are kept in the snapshot.")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.ttl, args.cache_days)
+
+
+if __name__ == "__main__":
+    main()
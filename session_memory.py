@@ -0,0 +1,213 @@
+"""
+Per-session memory accounting and eviction of cached frames.
+
+Every browser tab is a Streamlit session that lives in this process until the
+tab goes away. track() runs at the top of each rerun. It records the session's
+user and last activity, and the approximate size of its session_state.
+
+Large rebuildable objects (the History frames of months that have ended) are
+not kept in session_state. They go in a per-session cache through
+cached(name, build). Those caches are the part that can grow without bound
+across hundreds of tabs, and they can be rebuilt at any time. So once a
+session has been idle for idle_minutes, a sweep (run from whichever session
+reruns next, at most every sweep_seconds) drops its cache. When that session
+comes back, cached() simply rebuilds what the page asks for. Sessions that
+are no longer connected are forgotten altogether.
+
+report() lists sessions by footprint for the admin Sessions page.
+
+Optional settings in secrets.toml:
+
+    [session_memory]
+    idle_minutes = 10
+    sweep_seconds = 60
+"""
+import sys
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+DEFAULT_IDLE_MINUTES = 10
+DEFAULT_SWEEP_SECONDS = 60
+# session_state is re-measured at most this often per session (sizing walks every object)
+MEASURE_SECONDS = 30
+
+_lock = threading.Lock()
+_sessions = {}  # session id -> _Session
+_last_sweep = 0.0
+
+stats = {"evictions": 0, "evicted_bytes": 0, "rebuilds": 0}
+
+
+class _Session:
+    __slots__ = ("username", "last_seen", "measured_at", "state_bytes", "largest", "cache")
+
+    def __init__(self):
+        self.username = ""
+        self.last_seen = 0.0
+        self.measured_at = 0.0
+        self.state_bytes = 0
+        self.largest = []
+        self.cache = {}  # name -> (value, approximate bytes)
+
+
+def _setting(name, default):
+    try:
+        return float(st.secrets.get("session_memory", {}).get(name, default))
+    except Exception:  # no secrets file
+        return default
+
+
+# -------------------------
+# Sizing
+# -------------------------
+def approx_size(obj, _seen=None, _depth=0):
+    """Approximate bytes held by obj: DataFrames via memory_usage(deep=True), containers recursively."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > 8:
+        return 0
+    _seen.add(id(obj))
+
+    memory_usage = getattr(obj, "memory_usage", None)
+    if callable(memory_usage) and hasattr(obj, "columns"):  # DataFrame
+        return int(memory_usage(deep=True).sum())
+    if callable(memory_usage) and hasattr(obj, "dtype"):  # Series
+        return int(memory_usage(deep=True))
+    if hasattr(obj, "nbytes") and hasattr(obj, "dtype"):  # ndarray
+        return int(obj.nbytes)
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(approx_size(k, _seen, _depth + 1) + approx_size(v, _seen, _depth + 1)
+                          for k, v in list(obj.items()))
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(approx_size(v, _seen, _depth + 1) for v in list(obj))
+    if hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), _seen, _depth + 1)
+    for name in getattr(type(obj), "__slots__", ()):
+        size += approx_size(getattr(obj, name, None), _seen, _depth + 1)
+    return size
+
+
+# -------------------------
+# Tracking
+# -------------------------
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def _entry(session_id):
+    with _lock:
+        s = _sessions.get(session_id)
+        if s is None:
+            s = _sessions[session_id] = _Session()
+        return s
+
+
+def track(username=""):
+    """Record this rerun: who the session belongs to, when it was last active and its state size."""
+    session_id = _session_id()
+    if session_id is None:
+        return
+    now = time.monotonic()
+    s = _entry(session_id)
+    s.username = username or ""
+    s.last_seen = now
+
+    if now - s.measured_at >= MEASURE_SECONDS:
+        sizes = {}
+        for key, value in st.session_state.to_dict().items():
+            sizes[key] = approx_size(value)
+        s.state_bytes = sum(sizes.values())
+        s.largest = sorted(sizes.items(), key=lambda kv: kv[1], reverse=True)[:3]
+        s.measured_at = now
+
+    global _last_sweep
+    if now - _last_sweep >= _setting("sweep_seconds", DEFAULT_SWEEP_SECONDS):
+        _last_sweep = now
+        evict_idle()
+
+
+def cached(name, build):
+    """This session's cached value for `name`, built with build() if missing (or evicted)."""
+    session_id = _session_id()
+    if session_id is None:
+        return build()
+    s = _entry(session_id)
+    hit = s.cache.get(name)
+    if hit is not None:
+        return hit[0]
+    value = build()
+    s.cache[name] = (value, approx_size(value))
+    stats["rebuilds"] += 1
+    return value
+
+
+def invalidate(name=None):
+    """Drop one cached value of this session, or all of them when name is None."""
+    session_id = _session_id()
+    with _lock:
+        s = _sessions.get(session_id)
+    if s is None:
+        return
+    if name is None:
+        s.cache.clear()
+    else:
+        s.cache.pop(name, None)
+
+
+# -------------------------
+# Eviction
+# -------------------------
+def _connected(session_id):
+    if not Runtime.exists():  # e.g. headless tests: nothing to ask
+        return True
+    return Runtime.instance().is_active_session(session_id)
+
+
+def evict_idle(idle_seconds=None):
+    """Drop the caches of sessions idle for longer than idle_seconds; forget disconnected sessions. Returns bytes freed."""
+    if idle_seconds is None:
+        idle_seconds = _setting("idle_minutes", DEFAULT_IDLE_MINUTES) * 60
+    now = time.monotonic()
+    freed = 0
+    with _lock:
+        for session_id, s in list(_sessions.items()):
+            if not _connected(session_id):
+                freed += sum(b for _, b in s.cache.values())
+                del _sessions[session_id]
+            elif s.cache and now - s.last_seen > idle_seconds:
+                freed += sum(b for _, b in s.cache.values())
+                s.cache = {}
+                stats["evictions"] += 1
+    stats["evicted_bytes"] += freed
+    return freed
+
+
+def report(limit=20):
+    """The sessions with the largest footprint (session_state plus cache), largest first."""
+    now = time.monotonic()
+    current = _session_id()
+    with _lock:
+        sessions = list(_sessions.items())
+    rows = []
+    for session_id, s in sessions:
+        cache_bytes = sum(b for _, b in list(s.cache.values()))
+        rows.append({
+            "session": session_id[:8] + (" (you)" if session_id == current else ""),
+            "user": s.username,
+            "idle_seconds": int(now - s.last_seen),
+            "state_bytes": s.state_bytes,
+            "cache_bytes": cache_bytes,
+            "total_bytes": s.state_bytes + cache_bytes,
+            "largest": s.largest,
+        })
+    rows.sort(key=lambda r: r["total_bytes"], reverse=True)
+    return rows[:limit], len(rows)
@@ -0,0 +1,137 @@
+"""
+Database-enforced non-overlap: every live booking claims its minutes in booking_slots.
+
+The primary key of booking_slots (room, Day, minute) admits one booking per
+room-minute. Triggers on the room tables claim and release the minutes in the
+same statement as the booking write (migrations/012_booking_slots.sql), so two
+sessions saving overlapping bookings at the same moment can't both succeed:
+the second INSERT or UPDATE fails with a duplicate key on booking_slots and
+writes nothing. is_clash() recognises that error. There is no clash query
+before the write and no table lock.
+
+Closures and other sessions' slot holds are not bookings and claim nothing;
+blocked() checks them inside the write's transaction.
+
+Existing bookings are claimed once after the migration:
+
+    python slots.py --backfill              # live bookings from today on
+    python slots.py --backfill --from 2024-01-01
+    python slots.py --check                 # list bookings whose minutes are taken by another
+"""
+import argparse
+import re
+from datetime import date
+
+from lazy_imports import LazyModule
+from db import get_connection, run_statement, room_table, ROOM_TABLES
+
+mysql = LazyModule("mysql")
+
+DUPLICATE_KEY = 1062
+# The duplicate entry of booking_slots' primary key (room, Day, minute), e.g. '1-2025-06-02-600'. MySQL
+# before 8.0.19 names the key only 'PRIMARY', not 'booking_slots.PRIMARY', so the entry is what is matched.
+_SLOT_ENTRY = re.compile(r"Duplicate entry '\d+-\d{4}-\d{2}-\d{2}-\d+' for key '(booking_slots\.)?PRIMARY'")
+
+# Minutes a booking covers: minute n of the day is [n:00, n+1:00)
+_COVERS = "minute >= FLOOR(TIME_TO_SEC(b.StartTime) / 60) AND minute < CEIL(TIME_TO_SEC(b.EndTime) / 60)"
+
+
+def is_clash(exc):
+    """True if exc is a booking write rejected because another booking holds one of its minutes."""
+    return (isinstance(exc, mysql.connector.Error) and exc.errno == DUPLICATE_KEY
+            and _SLOT_ENTRY.search(exc.msg or "") is not None)
+
+
+def blocked(conn, room, day, start_24, end_24, hold_token=""):
+    """True if the window is closed, or held by a session other than hold_token's (run on the write's conn)."""
+    rows, _, _ = run_statement(
+        conn, f"closed_or_held/{room}",
+        (day, day, start_24, end_24, day, start_24, end_24, hold_token)
+    )
+    return bool(rows)
+
+
+# -------------------------
+# Backfill and check
+# -------------------------
+def backfill(day_from=None, log=print):
+    """Claim the minutes of live bookings from day_from on, one transaction per room. Returns minutes claimed."""
+    day_from = day_from or date.today()
+    conn = get_connection()
+    cursor = conn.cursor()
+    total = 0
+    try:
+        for n in ROOM_TABLES:
+            # Minutes already claimed by another booking are skipped here and reported by conflicts()
+            conn.start_transaction()
+            cursor.execute(
+                f"""
+                INSERT IGNORE INTO booking_slots (room, Day, minute, booking_id)
+                SELECT {n}, b.Day, minute, b.Id
+                FROM {room_table(n)} b JOIN slot_minutes ON {_COVERS}
+                WHERE b.Day >= %s AND b.deleted_at IS NULL
+                ORDER BY b.Day, b.StartTime, b.Id
+                """,
+                (day_from,)
+            )
+            conn.commit()
+            total += cursor.rowcount
+            log(f"  room {n}: {cursor.rowcount} minutes claimed")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return total
+
+
+def conflicts(day_from=None):
+    """Live bookings from day_from on that don't hold all their minutes, i.e. overlap an earlier booking."""
+    day_from = day_from or date.today()
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    out = []
+    try:
+        for n in ROOM_TABLES:
+            cursor.execute(
+                f"""
+                SELECT b.Id, b.Day, b.StartTime, b.EndTime, COUNT(s.minute) AS claimed,
+                       CEIL(TIME_TO_SEC(b.EndTime) / 60) - FLOOR(TIME_TO_SEC(b.StartTime) / 60) AS minutes
+                FROM {room_table(n)} b
+                LEFT JOIN booking_slots s ON s.room = {n} AND s.booking_id = b.Id
+                WHERE b.Day >= %s AND b.deleted_at IS NULL
+                GROUP BY b.Id, b.Day, b.StartTime, b.EndTime
+                HAVING claimed <> minutes
+                ORDER BY b.Day, b.StartTime
+                """,
+                (day_from,)
+            )
+            out += [dict(row, room=n) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Claim booking minutes in booking_slots and list overlaps.")
+    parser.add_argument("--backfill", action="store_true", help="Claim the minutes of existing bookings.")
+    parser.add_argument("--check", action="store_true", help="Only list bookings missing some of their minutes.")
+    parser.add_argument("--from", dest="day_from", type=date.fromisoformat, default=None,
+                        help="First day (YYYY-MM-DD, default today).")
+    args = parser.parse_args()
+    if not args.backfill and not args.check:
+        parser.error("choose --backfill or --check")
+
+    if args.backfill:
+        print(f"Claimed {backfill(args.day_from)} minutes.")
+    found = conflicts(args.day_from)
+    for c in found:
+        print(f"  room {c['room']} booking {c['Id']} on {c['Day']} {c['StartTime']}-{c['EndTime']}: "
+              f"{c['claimed']} of {c['minutes']} minutes held, the rest by an overlapping booking")
+    print(f"{len(found)} overlapping bookings." if found else "No overlapping bookings.")
+
+
+if __name__ == "__main__":
+    main()
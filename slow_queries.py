@@ -0,0 +1,194 @@
+"""
+Slow-query capture.
+
+install() registers an observer on the DB layer (db.add_query_observer). Every
+statement slower than the threshold is written as one JSON line to a rotating
+log: normalized SQL, parameter shape (types only, never values), duration and
+rows. A sampled subset of slow SELECTs also gets an EXPLAIN, run on a separate
+connection. The admin "Slow Queries" page reads the log back and groups it by
+normalized statement.
+
+Settings, all optional, in secrets.toml:
+
+    [slow_query]
+    threshold_ms = 200
+    explain_sample_rate = 0.1
+    log_path = "logs/slow_queries.log"
+    max_bytes = 5000000
+    backup_count = 5
+"""
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+from datetime import datetime
+
+import streamlit as st
+
+import db
+
+DEFAULT_THRESHOLD_MS = 200
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_LOG_PATH = "logs/slow_queries.log"
+DEFAULT_MAX_BYTES = 5_000_000
+DEFAULT_BACKUP_COUNT = 5
+
+_logger = logging.getLogger("pfepl.slow_queries")
+_logger.propagate = False
+_observer = None
+
+
+# -------------------------
+# Normalization
+# -------------------------
+_RE_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)", re.IGNORECASE)
+_RE_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_RE_NUMBER = re.compile(r"\b\d+\b")
+_RE_ROOM_TABLE = re.compile(r"\bmeeting_room\d+_bookings\b")
+_RE_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """
+    Group key for a statement: literals and placeholders become ?, IN lists
+    collapse, and the per-room tables become meeting_roomN_bookings so the
+    same query against each room counts as one statement.
+    """
+    s = _RE_SPACE.sub(" ", str(sql)).strip()
+    s = _RE_ROOM_TABLE.sub("meeting_roomN_bookings", s)
+    s = _RE_IN_LIST.sub("IN (...)", s)
+    s = _RE_STRING.sub("?", s)
+    s = _RE_NUMBER.sub("?", s)
+    return s.replace("%s", "?")
+
+
+def params_shape(params):
+    """Types of the parameters, not their values (which may be passwords)."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: type(v).__name__ for k, v in params.items()}
+    return [type(v).__name__ for v in params]
+
+
+# -------------------------
+# Observer
+# -------------------------
+class SlowQueryObserver:
+    def __init__(self, threshold_ms=DEFAULT_THRESHOLD_MS, sample_rate=DEFAULT_SAMPLE_RATE):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+
+    def __call__(self, sql, params, duration_ms, rows):
+        if duration_ms < self.threshold_ms:
+            return
+        entry = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "statement": normalize_sql(sql),
+            "sql": _RE_SPACE.sub(" ", str(sql)).strip(),
+            "params": params_shape(params),
+            "duration_ms": round(duration_ms, 2),
+            "rows": rows,
+        }
+        if random.random() < self.sample_rate and str(sql).lstrip().upper().startswith("SELECT"):
+            entry["explain"] = explain(sql, params)
+        _logger.warning(json.dumps(entry, default=str))
+
+
+def explain(sql, params):
+    """EXPLAIN rows for a statement (compact), or an error string."""
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + str(sql), params or ())
+        keep = ("table", "type", "possible_keys", "key", "rows", "filtered", "Extra")
+        return [{k: row.get(k) for k in keep} for row in cursor.fetchall()]
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _settings():
+    try:
+        return dict(st.secrets.get("slow_query", {}))
+    except Exception:  # no secrets file
+        return {}
+
+
+def log_path():
+    return _settings().get("log_path", DEFAULT_LOG_PATH)
+
+
+def install():
+    """Start capturing slow queries in this process (idempotent)."""
+    global _observer
+    if _observer is not None:
+        return _observer
+    cfg = _settings()
+    path = cfg.get("log_path", DEFAULT_LOG_PATH)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=cfg.get("max_bytes", DEFAULT_MAX_BYTES),
+        backupCount=cfg.get("backup_count", DEFAULT_BACKUP_COUNT),
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.WARNING)
+
+    _observer = SlowQueryObserver(
+        cfg.get("threshold_ms", DEFAULT_THRESHOLD_MS),
+        cfg.get("explain_sample_rate", DEFAULT_SAMPLE_RATE),
+    )
+    db.add_query_observer(_observer)
+    return _observer
+
+
+# -------------------------
+# Reading the log
+# -------------------------
+def read_entries(path=None):
+    """All entries in the current log and its rotated backups."""
+    path = path or log_path()
+    entries = []
+    for file in sorted(glob.glob(path + "*")):
+        try:
+            with open(file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return entries
+
+
+def top_offenders(entries, limit=20):
+    """Slow entries grouped by normalized statement, worst total time first."""
+    groups = {}
+    for e in entries:
+        g = groups.setdefault(e["statement"], {
+            "statement": e["statement"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "rows": 0, "last_seen": "", "explain": None, "example": e.get("sql"),
+        })
+        g["count"] += 1
+        g["total_ms"] += e["duration_ms"]
+        g["max_ms"] = max(g["max_ms"], e["duration_ms"])
+        g["rows"] += e.get("rows") or 0
+        if e["ts"] >= g["last_seen"]:
+            g["last_seen"] = e["ts"]
+            g["example"] = e.get("sql")
+            if e.get("explain"):
+                g["explain"] = e["explain"]
+    ranked = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)[:limit]
+    for g in ranked:
+        g["avg_ms"] = g["total_ms"] / g["count"]
+        g["avg_rows"] = g["rows"] / g["count"]
+    return ranked
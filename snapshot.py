@@ -0,0 +1,205 @@
+"""
+Local on-disk snapshot of today's and upcoming bookings.
+
+degraded.py refreshes it every minute or so while MySQL is up and reads it
+when MySQL is down. The file is written to a temporary name and renamed into
+place, so readers always see a complete snapshot. It is read through mmap:
+showing a day touches the header, one index entry per room and that day's
+records, however many days the file holds.
+
+Layout (little-endian):
+
+    header   magic "PFSS", version u16, rooms u8, pad u8, generated_at f64 (unix time),
+             first_day u32 (date ordinal), days u16, pad u16, records u32, strings_at u32
+    index    days x rooms entries of (first record u32, count u32), rooms in ROOM_TABLES order
+    records  per day and room, by start time: id u32, start u32 (s), end u32 (s),
+             created_by u32, agenda (offset u32, length u16), person (offset u32, length u16)
+    strings  UTF-8 text of agendas and names, referenced by the records
+
+A file that doesn't match its header (cut short, say) is not used: current()
+returns None, as if there were no snapshot yet.
+"""
+import mmap
+import os
+import struct
+from datetime import date, datetime, timedelta
+
+from bookings import Booking, DaySchedule, time_to_str
+from db import get_connection, room_table, ROOM_TABLES, BOOKING_COLUMNS
+
+MAGIC = b"PFSS"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBdIHHII")
+INDEX = struct.Struct("<II")
+RECORD = struct.Struct("<IIIIIHIH")
+ROOMS = list(ROOM_TABLES)
+
+
+def _seconds(hhmmss):
+    return int(hhmmss[:2]) * 3600 + int(hhmmss[3:5]) * 60 + int(hhmmss[6:8])
+
+
+def _hhmmss(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+# -------------------------
+# Writing
+# -------------------------
+def write(path, first_day, days, bookings, generated_at=None):
+    """Write Booking records with first_day <= day < first_day + days to path, atomically."""
+    grouped = {}
+    for b in bookings:
+        grouped.setdefault(((b.day - first_day).days, ROOMS.index(b.room)), []).append(b)
+
+    index, records, strings = [], [], bytearray()
+    text_at = {}
+
+    def text(value):
+        raw = (value or "").encode("utf-8")[:65535]
+        if raw not in text_at:
+            text_at[raw] = len(strings)
+            strings.extend(raw)
+        return text_at[raw], len(raw)
+
+    for d in range(days):
+        for r in range(len(ROOMS)):
+            group = sorted(grouped.get((d, r), []), key=lambda b: (b.start, b.id))
+            index.append(INDEX.pack(len(records), len(group)))
+            for b in group:
+                records.append(RECORD.pack(b.id, _seconds(b.start), _seconds(b.end), b.created_by or 0,
+                                           *text(b.agenda), *text(b.person)))
+
+    strings_at = HEADER.size + len(index) * INDEX.size + len(records) * RECORD.size
+    header = HEADER.pack(MAGIC, VERSION, len(ROOMS), 0, (generated_at or datetime.now()).timestamp(),
+                         first_day.toordinal(), days, 0, len(records), strings_at)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(b"".join(index))
+        f.write(b"".join(records))
+        f.write(strings)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def refresh(path, days):
+    """Snapshot the live bookings of today and the next days-1 days from the primary. Returns bookings written."""
+    first_day = date.today()
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    bookings = []
+    try:
+        for n in ROOMS:
+            cursor.execute(
+                f"SELECT {BOOKING_COLUMNS} FROM {room_table(n)} "
+                f"WHERE Day >= %s AND Day < %s AND deleted_at IS NULL",
+                (first_day, first_day + timedelta(days=days))
+            )
+            bookings += [Booking.from_row(n, row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+    write(path, first_day, days, bookings)
+    return len(bookings)
+
+
+# -------------------------
+# Reading
+# -------------------------
+class Snapshot:
+    """A snapshot file mapped into memory."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, rooms, _, generated_at, first_day, days, _,
+         self.records, self._strings_at) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or rooms != len(ROOMS):
+            self._map.close()
+            raise ValueError(f"{path} is not a snapshot this version can read")
+        self.generated_at = datetime.fromtimestamp(generated_at)
+        self.first_day = date.fromordinal(first_day)
+        self.days = days
+        if not self._intact():
+            self._map.close()
+            raise ValueError(f"{path} is cut short or damaged")
+
+    def _intact(self):
+        """True if every record the index points to, and every string a record points to, is inside the file."""
+        records_at = HEADER.size + self.days * len(ROOMS) * INDEX.size
+        if self._strings_at != records_at + self.records * RECORD.size or len(self._map) < self._strings_at:
+            return False
+        if any(first + count > self.records for first, count in INDEX.iter_unpack(self._map[HEADER.size:records_at])):
+            return False
+        strings = len(self._map) - self._strings_at
+        return all(
+            agenda_at + agenda_len <= strings and person_at + person_len <= strings
+            for _, _, _, _, agenda_at, agenda_len, person_at, person_len
+            in RECORD.iter_unpack(self._map[records_at:self._strings_at])
+        )
+
+    def covers(self, day):
+        return 0 <= (day - self.first_day).days < self.days
+
+    def _text(self, offset, length):
+        start = self._strings_at + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def schedule(self, day, now=None):
+        """
+        DaySchedule of `day` as load_bookings() would return it (meetings of
+        today that have ended are left out), or None if the snapshot doesn't cover it.
+        """
+        if not self.covers(day):
+            return None
+        now = now or datetime.now()
+        if day < now.date():
+            return DaySchedule(day, {n: [] for n in ROOMS})
+        ended_before = _seconds(time_to_str(now.time())) if day == now.date() else -1
+
+        d = (day - self.first_day).days
+        records_at = HEADER.size + self.days * len(ROOMS) * INDEX.size
+        rooms = {}
+        for r, n in enumerate(ROOMS):
+            first, count = INDEX.unpack_from(self._map, HEADER.size + (d * len(ROOMS) + r) * INDEX.size)
+            out = []
+            for i in range(first, first + count):
+                (booking_id, start, end, created_by, agenda_at, agenda_len,
+                 person_at, person_len) = RECORD.unpack_from(self._map, records_at + i * RECORD.size)
+                if end < ended_before:
+                    continue
+                out.append(Booking(booking_id, n, day, _hhmmss(start), _hhmmss(end),
+                                   self._text(agenda_at, agenda_len), self._text(person_at, person_len),
+                                   created_by))
+            rooms[n] = out
+        return DaySchedule(day, rooms)
+
+    def close(self):
+        self._map.close()
+
+
+_open = {}  # path -> (mtime_ns, Snapshot)
+
+
+def current(path):
+    """The snapshot at path (re-mapped when the file has been replaced), or None if there is none yet."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _open.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        snap = Snapshot(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    # The old mapping is left to the garbage collector: a page may still be reading it
+    _open[path] = (mtime, snap)
+    return snap
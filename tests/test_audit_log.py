@@ -0,0 +1,140 @@
+import json
+from datetime import date, timedelta
+
+import audit_log
+import migrate_audit_log
+
+BOOKING = {
+    "Day": date(2025, 6, 2), "StartTime": timedelta(hours=10), "EndTime": timedelta(hours=11),
+    "Agenda": "Sync", "PersonName": "A B", "CreatedByUserId": 7,
+}
+DECODED = {
+    "Day": date(2025, 6, 2), "StartTime": "10:00:00", "EndTime": "11:00:00",
+    "Agenda": "Sync", "PersonName": "A B", "CreatedByUserId": 7,
+}
+
+
+def row(action_type, delta=None, old_data=None, new_data=None):
+    return {"action_type": action_type, "delta": delta, "old_data": old_data, "new_data": new_data}
+
+
+def test_create_and_delete_round_trip():
+    delta = audit_log.encode(new=BOOKING)
+    assert audit_log.decode("CREATE", delta) == (None, DECODED, True, None)
+    assert audit_log.decode("DELETE", audit_log.encode(old=BOOKING)) == (DECODED, None, True, None)
+
+
+def test_string_values_encode_like_mysql_values():
+    as_strings = dict(BOOKING, Day="2025-06-02", StartTime="10:00:00", EndTime="0 days 11:00:00",
+                      CreatedByUserId="7")
+    assert audit_log.encode(new=as_strings) == audit_log.encode(new=BOOKING)
+
+
+def test_update_stores_only_changed_fields():
+    delta = audit_log.encode(BOOKING, dict(BOOKING, EndTime=timedelta(hours=11, minutes=30)))
+    assert json.loads(delta) == {"e": [39600, 41400]}
+    before, after, full, rooms = audit_log.decode("UPDATE", delta)
+    assert (before, after, full, rooms) == ({"EndTime": "11:00:00"}, {"EndTime": "11:30:00"}, False, None)
+
+
+def test_room_change_carries_the_full_before_state():
+    delta = audit_log.encode(BOOKING, BOOKING, rooms=(1, 2))
+    before, after, full, rooms = audit_log.decode("UPDATE", delta)
+    assert (before, after, full, rooms) == (DECODED, DECODED, True, (1, 2))
+
+
+def test_replay_fills_unchanged_fields_from_earlier_rows():
+    moved = dict(BOOKING, StartTime=timedelta(hours=12), EndTime=timedelta(hours=13))
+    trail = audit_log.replay([
+        row("CREATE", audit_log.encode(new=BOOKING)),
+        row("UPDATE", audit_log.encode(BOOKING, moved)),
+        row("DELETE", audit_log.encode(old=moved)),
+    ])
+    assert [(before, after) for _, before, after in trail] == [
+        (None, DECODED),
+        (DECODED, dict(DECODED, StartTime="12:00:00", EndTime="13:00:00")),
+        (dict(DECODED, StartTime="12:00:00", EndTime="13:00:00"), None),
+    ]
+
+
+def test_legacy_json_and_python_repr_rows_decode():
+    as_json = json.dumps({"Day": "2025-06-02", "StartTime": "10:00:00", "EndTime": "11:00:00",
+                          "Agenda": "Sync", "PersonName": "A B", "CreatedByUserId": 7})
+    as_repr = "{'Day': '2025-06-02', 'StartTime': '10:00:00', 'EndTime': '11:30:00'}"
+    trail = audit_log.replay([
+        row("CREATE", new_data=as_json),
+        row("UPDATE", old_data=as_json, new_data=as_repr),
+    ])
+    assert trail[0][2] == DECODED
+    assert trail[1][2] == {"Day": date(2025, 6, 2), "StartTime": "10:00:00", "EndTime": "11:30:00"}
+
+
+def test_unparseable_legacy_row_is_kept_raw_and_still_replays():
+    assert audit_log.parse_legacy("{not json") == {"raw": "{not json"}
+    assert audit_log.parse_legacy("[1, 2]") == {"raw": "[1, 2]"}
+    assert audit_log.parse_legacy('"raw text"') == {"raw": '"raw text"'}
+    assert audit_log.parse_legacy("null") is None
+    trail = audit_log.replay([
+        row("CREATE", audit_log.encode(new=BOOKING)),
+        row("UPDATE", old_data="{not json", new_data="{not json"),
+    ])
+    assert len(trail) == 2
+    assert trail[1][1] == {} and trail[1][2] == {}
+
+
+def test_malformed_legacy_value_is_kept_as_text():
+    delta = audit_log.encode(new=dict(BOOKING, StartTime="ten o'clock"))
+    assert json.loads(delta)["s"] == "ten o'clock"
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+
+    def execute(self, sql, params=()):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+    def executemany(self, sql, seq):
+        self.updates += list(seq)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+def test_migration_skips_unparseable_rows():
+    legacy = json.dumps({"Day": "2025-06-02", "StartTime": "10:00:00", "EndTime": "11:00:00"})
+    rows = [
+        {"id": 1, "action_type": "CREATE", "meeting_id": 5, "room": 1, "old_data": None,
+         "new_data": legacy, "reason": None},
+        {"id": 2, "action_type": "UPDATE", "meeting_id": 5, "room": 1, "old_data": legacy,
+         "new_data": "{broken", "reason": None},
+        {"id": 3, "action_type": "UPDATE", "meeting_id": 5, "room": 1, "old_data": legacy,
+         "new_data": '["not", "a", "booking"]', "reason": None},
+    ]
+    cursor = FakeCursor(rows)
+    conn = FakeConnection(cursor)
+    assert migrate_audit_log.convert_batch(conn, 0, 10, set()) == (1, 2, 3)
+    assert [row_id for _, row_id in cursor.updates] == [1]
+    assert conn.committed
@@ -0,0 +1,115 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import history_search
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.sql = None
+        self.params = None
+
+    def execute(self, sql, params=()):
+        self.sql, self.params = sql, params
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+    def close(self):
+        pass
+
+
+def result(n, day=date(2025, 6, 2)):
+    return [{"Id": i, "Day": day, "StartTime": timedelta(hours=9, minutes=i), "room": 1 + i % 3}
+            for i in range(1, n + 1)]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(rows):
+        cursor = FakeCursor(rows)
+        monkeypatch.setattr(history_search, "get_read_connection", lambda: FakeConnection(cursor))
+        return cursor
+    return install
+
+
+def test_cursor_is_the_page_key_of_the_last_row_shown(fake):
+    fake(result(4))
+    rows, after = history_search.search_history(date(2025, 6, 1), date(2025, 6, 30), limit=3)
+    assert [r["Id"] for r in rows] == [1, 2, 3]
+    assert after == (date(2025, 6, 2), "09:03:00", 1, 3)
+
+
+def test_last_page_has_no_cursor(fake):
+    fake(result(3))
+    rows, after = history_search.search_history(date(2025, 6, 1), date(2025, 6, 30), limit=3)
+    assert len(rows) == 3 and after is None
+
+
+def test_cursor_is_bound_in_every_branch(fake):
+    cursor = fake([])
+    after = (date(2025, 6, 2), "09:03:00", 2, 17)
+    history_search.search_history(date(2025, 6, 1), date(2025, 6, 30), after=after, limit=10)
+    key = [after[0], after[0], after[1], after[1], after[2], after[2], after[3]]
+    branches = len(history_search.ROOM_TABLES) + 1  # room tables and the archive
+    assert cursor.sql.count(history_search._after_clause("room")) == 1
+    assert list(cursor.params).count(after[3]) == branches
+    assert list(cursor.params[2:9]) == key
+    assert cursor.params[-1] == 11  # one extra row tells whether there is a next page
+
+
+def test_room_filter_queries_one_room_table_and_the_archive(fake):
+    cursor = fake([])
+    history_search.search_history(date(2025, 6, 1), date(2025, 6, 30), room=2)
+    assert "meeting_room2_bookings" in cursor.sql and "meeting_room1_bookings" not in cursor.sql
+    assert history_search.ARCHIVE_TABLE in cursor.sql
+
+
+def test_invalid_arguments_are_rejected():
+    with pytest.raises(ValueError):
+        history_search.search_history(date(2025, 6, 1), date(2025, 6, 30), status="gone")
+    with pytest.raises(ValueError):
+        history_search.search_history(date(2025, 6, 1), date(2025, 6, 30), room=9)
+
+
+def test_after_clause_pages_through_ties_without_gaps_or_repeats():
+    # Same day and start in several rooms, and several ids in one room: every tie-break level is used
+    rows = [(day, start, room, id)
+            for day in ("2025-06-02", "2025-06-03")
+            for start in ("09:00:00", "10:00:00")
+            for room in (1, 2, 3)
+            for id in (1, 2)]
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE h (Day TEXT, StartTime TEXT, room INT, Id INT)")
+    db.executemany("INSERT INTO h VALUES (?, ?, ?, ?)", reversed(rows))
+
+    seen, after = [], None
+    while True:
+        sql, params = "SELECT Day, StartTime, room, Id FROM h", []
+        if after is not None:
+            sql += " WHERE " + history_search._after_clause("room").replace("%s", "?")
+            params = [after[0], after[0], after[1], after[1], after[2], after[2], after[3]]
+        page = db.execute(sql + " ORDER BY Day, StartTime, room, Id LIMIT 5", params).fetchall()
+        if not page:
+            break
+        seen += page
+        after = page[-1]
+    assert seen == rows
+
+
+def test_agenda_words_drop_short_words():
+    assert history_search.agenda_words("Q3 budget, a review of IT") == ["budget", "review"]
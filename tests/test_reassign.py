@@ -0,0 +1,67 @@
+from datetime import date
+
+from bookings import Booking
+from reassign import solve
+
+DAY = date(2025, 6, 2)
+
+
+def meeting(id, start, end, day=DAY):
+    return Booking(id, 1, day, start, end, "Sync", "A B", 7)
+
+
+def test_best_fit_takes_the_room_with_the_smallest_gap_before():
+    busy = {
+        (2, DAY): [("09:00:00", "10:00:00")],
+        (3, DAY): [("09:00:00", "11:30:00")],
+    }
+    moves, unplaced = solve([meeting(1, "12:00:00", "13:00:00")], busy, [2, 3])
+    assert [(b.id, room) for b, room in moves] == [(1, 3)]
+    assert unplaced == []
+    assert busy[(3, DAY)] == [("09:00:00", "11:30:00"), ("12:00:00", "13:00:00")]
+
+
+def test_equal_gaps_go_to_the_more_preferred_room():
+    busy = {
+        (2, DAY): [("09:00:00", "10:00:00")],
+        (3, DAY): [("09:00:00", "10:00:00")],
+    }
+    moves, _ = solve([meeting(1, "10:00:00", "11:00:00")], busy, [3, 2])
+    assert [room for _, room in moves] == [3]
+
+
+def test_empty_rooms_tie_on_the_gap_from_midnight():
+    moves, _ = solve([meeting(1, "10:00:00", "11:00:00")], {}, [2, 3])
+    assert [room for _, room in moves] == [2]
+
+
+def test_meetings_placed_earlier_block_later_ones():
+    displaced = [meeting(1, "10:00:00", "12:00:00"), meeting(2, "11:00:00", "13:00:00")]
+    moves, unplaced = solve(displaced, {}, [2, 3])
+    assert sorted((b.id, room) for b, room in moves) == [(1, 2), (2, 3)]
+    assert unplaced == []
+
+
+def test_meeting_with_no_free_room_is_unplaced():
+    busy = {
+        (2, DAY): [("09:00:00", "12:00:00")],
+        (3, DAY): [("10:30:00", "11:00:00")],
+    }
+    moves, unplaced = solve([meeting(1, "10:00:00", "11:00:00")], busy, [2, 3])
+    assert moves == []
+    assert [b.id for b in unplaced] == [1]
+
+
+def test_back_to_back_meetings_fit():
+    busy = {(2, DAY): [("09:00:00", "10:00:00"), ("11:00:00", "12:00:00")]}
+    moves, _ = solve([meeting(1, "10:00:00", "11:00:00")], busy, [2])
+    assert [room for _, room in moves] == [2]
+    assert busy[(2, DAY)] == [("09:00:00", "10:00:00"), ("10:00:00", "11:00:00"), ("11:00:00", "12:00:00")]
+
+
+def test_days_are_independent():
+    other = date(2025, 6, 3)
+    busy = {(2, DAY): [("09:00:00", "18:00:00")]}
+    moves, unplaced = solve([meeting(1, "10:00:00", "11:00:00", day=other)], busy, [2])
+    assert [(b.day, room) for b, room in moves] == [(other, 2)]
+    assert unplaced == []
@@ -0,0 +1,103 @@
+from datetime import date
+
+import pytest
+
+import schedule_cache
+
+
+class FakeCursor:
+    """Answers schedule_cache's booking_changes reads from a list of committed rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self._result = []
+
+    def execute(self, sql, params=()):
+        self.queries.append((sql, params))
+        if len(self.queries) > 50:
+            raise AssertionError("poll() does not terminate")
+        if "seq IN" in sql:
+            self._result = [r for r in self.rows if r["seq"] in params]
+        elif "seq >" in sql:
+            after, limit = params
+            self._result = [r for r in self.rows if r["seq"] > after][:limit]
+        else:
+            self._result = []
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+
+def change(seq, room=1, day=date(2025, 6, 2)):
+    return {"seq": seq, "room": room, "Day": day}
+
+
+@pytest.fixture(autouse=True)
+def fresh_tail(monkeypatch):
+    monkeypatch.setattr(schedule_cache, "POLL_BATCH", 10)
+    schedule_cache._entries.clear()
+    schedule_cache._changed.clear()
+    schedule_cache._tail.update(seq=0, gaps={}, polled_at=0.0, pruned_at=float("inf"))
+    yield
+    schedule_cache._entries.clear()
+    schedule_cache._changed.clear()
+
+
+def test_apply_tracks_and_fills_gaps():
+    schedule_cache._apply([change(1), change(3)], now=0.0, gap_seconds=30)
+    assert schedule_cache._tail["seq"] == 3
+    assert set(schedule_cache._tail["gaps"]) == {2}
+
+    schedule_cache._apply([change(2, room=2)], now=1.0, gap_seconds=30)
+    assert schedule_cache._tail["gaps"] == {}
+    assert schedule_cache._changed[(2, date(2025, 6, 2))] == 2
+
+
+def test_apply_expires_old_gaps():
+    schedule_cache._apply([change(1), change(3)], now=0.0, gap_seconds=30)
+    schedule_cache._apply([], now=31.0, gap_seconds=30)
+    assert schedule_cache._tail["gaps"] == {}
+
+
+def test_apply_evicts_changed_room_day():
+    day = date(2025, 6, 2)
+    schedule_cache._entries[(1, day)] = (0.0, [])
+    schedule_cache._entries[(2, day)] = (0.0, [])
+    schedule_cache._apply([change(1, room=1, day=day)], now=0.0, gap_seconds=30)
+    assert (1, day) not in schedule_cache._entries
+    assert (2, day) in schedule_cache._entries
+
+
+def test_poll_with_open_gap_and_full_batches_terminates():
+    # seq 1 never committed (e.g. a rejected clash); 25 changes after it: more than two batches
+    schedule_cache._tail["gaps"] = {1: 0.0}
+    cursor = FakeCursor([change(seq) for seq in range(2, 27)])
+    schedule_cache.poll(force=True, conn=FakeConnection(cursor))
+
+    ranges = [params for sql, params in cursor.queries if "seq >" in sql]
+    assert ranges == [(0, 10), (11, 10), (21, 10)]
+    assert sum("seq IN" in sql for sql, _ in cursor.queries) == 1
+    assert schedule_cache._tail["seq"] == 26
+    assert set(schedule_cache._tail["gaps"]) == {1}
+
+
+def test_poll_picks_up_late_commit_in_gap():
+    schedule_cache._apply([change(1), change(3)], now=0.0, gap_seconds=1e9)
+    late = change(2, room=3)
+    cursor = FakeCursor([change(1), late, change(3)])
+    schedule_cache.poll(force=True, conn=FakeConnection(cursor))
+
+    assert schedule_cache._tail["gaps"] == {}
+    assert schedule_cache._changed[(3, date(2025, 6, 2))] == 2
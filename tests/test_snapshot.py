@@ -0,0 +1,93 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import snapshot
+from bookings import Booking
+
+FIRST = date(2025, 6, 2)
+BOOKINGS = [
+    Booking(1, 1, FIRST, "09:00:00", "10:00:00", "Stand-up", "A B", 7),
+    Booking(2, 1, FIRST, "08:00:00", "08:30:00", "Early", "C D", 8),
+    Booking(3, 2, FIRST + timedelta(days=1), "14:00:00", "15:30:00", "Réunion", "É F", 9),
+    Booking(4, 3, FIRST, "16:00:00", "17:00:00", "Stand-up", "A B", 7),
+]
+MORNING = datetime(2025, 6, 2, 7, 0)
+
+
+def as_tuples(schedule):
+    return {n: [(b.id, b.room, b.day, b.start, b.end, b.agenda, b.person, b.created_by) for b in bookings]
+            for n, bookings in schedule.rooms.items()}
+
+
+@pytest.fixture
+def path(tmp_path):
+    p = str(tmp_path / "schedule.snapshot")
+    snapshot.write(p, FIRST, 3, BOOKINGS, generated_at=datetime(2025, 6, 2, 6, 30))
+    return p
+
+
+def test_round_trip(path):
+    snap = snapshot.Snapshot(path)
+    try:
+        assert snap.generated_at == datetime(2025, 6, 2, 6, 30)
+        assert as_tuples(snap.schedule(FIRST, now=MORNING)) == {
+            1: [(2, 1, FIRST, "08:00:00", "08:30:00", "Early", "C D", 8),
+                (1, 1, FIRST, "09:00:00", "10:00:00", "Stand-up", "A B", 7)],
+            2: [],
+            3: [(4, 3, FIRST, "16:00:00", "17:00:00", "Stand-up", "A B", 7)],
+        }
+        next_day = FIRST + timedelta(days=1)
+        assert as_tuples(snap.schedule(next_day, now=MORNING))[2] == [
+            (3, 2, next_day, "14:00:00", "15:30:00", "Réunion", "É F", 9)
+        ]
+        assert snap.schedule(FIRST + timedelta(days=2), now=MORNING).by_id == {1: {}, 2: {}, 3: {}}
+    finally:
+        snap.close()
+
+
+def test_days_outside_the_snapshot_are_not_covered(path):
+    snap = snapshot.Snapshot(path)
+    try:
+        assert snap.schedule(FIRST - timedelta(days=1), now=MORNING - timedelta(days=2)) is None
+        assert snap.schedule(FIRST + timedelta(days=3), now=MORNING) is None
+    finally:
+        snap.close()
+
+
+def test_meetings_that_ended_today_are_left_out(path):
+    snap = snapshot.Snapshot(path)
+    try:
+        rooms = snap.schedule(FIRST, now=datetime(2025, 6, 2, 9, 30)).rooms
+        assert [b.id for b in rooms[1]] == [1]
+    finally:
+        snap.close()
+
+
+def test_current_reopens_a_replaced_file(path):
+    first = snapshot.current(path)
+    assert first is snapshot.current(path)
+    snapshot.write(path, FIRST, 1, BOOKINGS[:1], generated_at=datetime(2025, 6, 2, 6, 31))
+    second = snapshot.current(path)
+    assert second.generated_at == datetime(2025, 6, 2, 6, 31)
+
+
+def test_missing_file_is_no_snapshot(tmp_path):
+    assert snapshot.current(str(tmp_path / "none")) is None
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: b"",
+    lambda data: b"garbage" * 10,
+    lambda data: b"XXXX" + data[4:],
+    lambda data: data[:snapshot.HEADER.size - 3],
+    lambda data: data[:snapshot.HEADER.size + 5],
+    lambda data: data[:len(data) - 20],
+])
+def test_damaged_file_is_no_snapshot(path, damage):
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(damage(data))
+    snapshot._open.pop(path, None)
+    assert snapshot.current(path) is None